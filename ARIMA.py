@@ -1,5 +1,5 @@
 # Standard library imports
-import itertools
+import os
 import warnings
 from datetime import datetime
 
@@ -11,7 +11,6 @@ import numpy as np
 import pandas as pd
 
 # Third-party imports for statistical modeling
-import statsmodels.api as sm
 from statsmodels.tsa.arima.model import ARIMA
 from statsmodels.tsa.statespace.sarimax import SARIMAX
 from statsmodels.tsa.seasonal import seasonal_decompose
@@ -29,23 +28,50 @@ from sklearn.metrics import (
     confusion_matrix,
     median_absolute_error,
 )
-from sklearn.model_selection import train_test_split, TimeSeriesSplit
+from sklearn.model_selection import train_test_split
 
 # Third-party imports for plotting and visualization
 import matplotlib as mpl
-import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
 from matplotlib import pyplot
-from pandas.plotting import register_matplotlib_converters
 from scipy.stats import pearsonr
-from scipy import stats
 from scipy.signal import periodogram
-from statsmodels.graphics.tsaplots import plot_acf, plot_pacf, plot_predict
-import seaborn as sns
 from pylab import rcParams
 from sklearn import metrics
 from statsmodels.tools.sm_exceptions import ConvergenceWarning, ValueWarning
 
+# Local imports
+from archive import BacktestArchive
+from backtest import recursive_forecast_tss, backtest_drift, backtest_orders, best_backtest_order
+from fit_cache import FitCache, fit_model
+from ingest import read_hicp_series
+from figures import (
+    FigureRenderer,
+    plot_distribution,
+    plot_rolling_statistics,
+    plot_decomposition,
+    plot_acf_pacf,
+    plot_periodogram,
+    plot_transformation,
+    plot_forecast,
+    plot_actual_vs_predicted,
+    plot_actual_fitted_predicted,
+    plot_residuals,
+    plot_residual_density,
+)
+from instrumentation import Recorder
+from order_search import (
+    USABLE_STATUSES,
+    make_pdq,
+    search_orders,
+    halving_search,
+    stepwise_search,
+    compare_searches,
+    best_order,
+)
+from serving import export_state
+from stationarity import test_battery
+
 # Plot settings
 plt.style.use('seaborn')
 mpl.rcParams['axes.labelsize'] = 14
@@ -53,9 +79,18 @@ mpl.rcParams['xtick.labelsize'] = 12
 mpl.rcParams['ytick.labelsize'] = 12
 mpl.rcParams['text.color'] = 'k'
 
+# Figures are shown interactively by default. ARIMA_PLOTS=save renders them headless into visualisations/
+# in background worker processes, ARIMA_PLOTS=off skips plotting
+renderer = FigureRenderer(mode=os.environ.get('ARIMA_PLOTS', 'show'))
+
+# Wall time per stage and diagnostics per model fit, written to instrumentation/ at the end of the run
+recorder = Recorder()
+
 # Import data
+# Only the needed columns are parsed; the cleaned monthly series is cached in binary form,
+# so later runs start from the cache instead of the CSV
 file_path = '/Users/apple/Downloads/prc_hicp_manr__custom_7843973_linear.csv'
-data = pd.read_csv(file_path)
+data = read_hicp_series(file_path, cache_dir='.hicp_cache')
 
 data.head()
 data.tail()
@@ -63,100 +98,24 @@ data.tail()
 # See the data types and non-missing values
 data.info()
 
-# Cleaning and Formatting
-data = data.drop(['DATAFLOW', 'LAST UPDATE', 'freq', 'unit', 'geo', 'OBS_FLAG', 'coicop'], axis=1). \
-    rename(columns={'TIME_PERIOD': 'Date', 'OBS_VALUE': 'Rate'})
-
-# Converting the data column into datetime format
-data['Date'] = pd.to_datetime(data['Date'])
-data.set_index('Date', inplace=True)
-data = data.resample('MS').mean()
-
 # Statistics for each column
 data.describe()
 
 # Checking for the missing values
 data.isna().sum()
 
-# Setting up the figure and axes for a 2x2 grid
-fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(nrows=2, ncols=2, figsize=(12, 10))
-
-# Histogram
-ax1.hist(data['Rate'], bins=30, alpha=0.75, color='blue')
-ax1.set_title("Histogram of Rates")
-ax1.set_xlabel("Rate")
-ax1.set_ylabel("Frequency")
-
-# Box Plot
-ax2.boxplot(data['Rate'], vert=False)
-ax2.set_title("Box Plot of Rates")
-ax2.set_xlabel("Rate")
-
-# Q-Q Plot
-stats.probplot(data['Rate'], dist="norm", plot=ax3)
-ax3.set_title("Q-Q Plot")
-
-# Time Series Plot
-data['Date'] = pd.date_range(start='1/1/2020', periods=len(data), freq='D')
-ax4.plot(data['Date'], data['Rate'], marker='', linestyle='-', color='blue')
-ax4.set_title("Time Series Plot of Rates")
-ax4.set_xlabel("Date")
-ax4.set_ylabel("Rate")
-
-plt.tight_layout()  # Adjust layout to prevent overlap
-plt.show()
+# Histogram, box plot, Q-Q plot and time series plot
+renderer.render('distribution', plot_distribution, data['Rate'])
 
 # Visualization
 # Rolling mean and standard deviation
-mean_rolling = data['Rate'].rolling(window=12).mean()
-std_rolling = data['Rate'].rolling(window=12).std()
-
-plt.figure(figsize=(12, 5))
-plt.plot(data.index, data['Rate'], label='Original')
-plt.plot(mean_rolling.index, mean_rolling, color='crimson', label='Rolling Mean')
-plt.plot(std_rolling.index, std_rolling, color='black', label='Rolling Std')
-plt.title('Inflation Rates in Poland')
-plt.grid(which='major', linestyle='--', alpha=0.5)
-
-# Format the x-axis date labels
-date_format = mdates.DateFormatter('%Y-%m-%d')
-plt.gca().xaxis.set_major_formatter(date_format)
-plt.legend(loc='best')
-
-# Get the first and last dates in the dataset
-first_date = data.index[0]
-last_date = data.index[-1]
-
-# Annotate the starting and ending points of the rolling mean
-plt.annotate(f'{data.index[0].strftime("%Y-%m-%d")}',
-             xy=(data.index[0], data['Rate'].iloc[0]),
-             xytext=(data.index[0], data['Rate'].iloc[0] + 2),
-             arrowprops=dict(arrowstyle='->'))
-
-plt.annotate(f'{data.index[-1].strftime("%Y-%m-%d")}',
-             xy=(data.index[-1], data['Rate'].iloc[-1]),
-             xytext=(data.index[-1], data['Rate'].iloc[-1] + 2),
-             arrowprops=dict(arrowstyle='->'))
-# Display the plot
-plt.xticks(rotation=45)
-plt.tight_layout()  # Adjust layout to prevent label cutoff
-plt.show()
+renderer.render('rolling_statistics', plot_rolling_statistics, data['Rate'])
 
 # Seasonal Decomposition
 # Set the frequency of the index to monthly start
 decomp = seasonal_decompose(data['Rate'], model='Adittive')
-fig, axes = plt.subplots(ncols=1, nrows=4, sharex=True, figsize=(12, 5))
-fig.suptitle('Seasonal Decomposition')
-
-decomp.trend.plot(ax=axes[0], legend=False)
-axes[0].set_ylabel('Trend')
-decomp.seasonal.plot(ax=axes[1], legend=False)
-axes[1].set_ylabel('Seasonal')
-decomp.resid.plot(ax=axes[2], legend=False)
-axes[2].set_ylabel('Residual')
-decomp.observed.plot(ax=axes[3], legend=False)
-axes[3].set_ylabel('Original')
-plt.show()
+renderer.render('seasonal_decomposition', plot_decomposition, decomp.trend, decomp.seasonal, decomp.resid,
+                decomp.observed)
 
 df_add = pd.concat([decomp.trend, decomp.seasonal, decomp.resid, decomp.observed], axis=1)
 df_add.columns = ['trend', 'seasoanilty', 'residual', 'actual_values']
@@ -181,11 +140,13 @@ def adf_test(series):
     else:
         print('\nCannot reject the null hypothesis. Data may have a unit root and be non-stationary.')
 
-adf_test(data['Rate'])
+with recorder.stage('adf'):
+    adf_test(data['Rate'])
 
 # KPSS Test
 # Perform the KPSS test on the 'Rate' column
-result = kpss(data['Rate'])
+with recorder.stage('kpss'):
+    result = kpss(data['Rate'])
 
 print('======= Kwiatkowski-Phillips-Schmidt-Shin (KPSS) Test Results =======\n')
 print("KPSS Test Statistic:", result[0])
@@ -203,19 +164,7 @@ else:
     print('\nWeak evidence against rejecting the null hypothesis. Data has no unit root and is stationary.')
 
 # ACF and PACF
-f, ax = plt.subplots(nrows=2, ncols=1, figsize=(12, 8))
-plot_acf(data['Rate'], lags=20, ax=ax[0])
-plot_pacf(data['Rate'], lags=20, ax=ax[1], method='ols')
-
-ax[1].annotate('Strong correlation at lag = 1', xy=(1, 0.36), xycoords='data',
-               xytext=(0.15, 0.7), textcoords='axes fraction',
-               arrowprops=dict(color='red', shrink=0.05, width=1))
-
-ax[1].annotate('Strong correlation at lag = 2', xy=(2.1, -0.5), xycoords='data',
-               xytext=(0.25, 0.1), textcoords='axes fraction',
-               arrowprops=dict(color='red', shrink=0.05, width=1))
-plt.tight_layout()
-plt.show()
+renderer.render('acf_pacf', plot_acf_pacf, data['Rate'])
 
 # Cyclic Behavior Detection: Frequency vs. periodogram
 fs = 1 / 12  # The sampling frequency. For monthly data, it would be 1 sample per month.
@@ -236,46 +185,15 @@ print(f"Peak Frequency: {max_frequency:.4f}")
 print(f"Peak Power: {max_power:.4f}")
 
 # Plot the frequency vs. power periodogram for cyclic behavior
-plt.plot(frequencies, power)
-plt.xlabel('Frequency')
-plt.ylabel('Power')
-plt.title('Frequency vs. Power Periodogram')
-plt.show()
+renderer.render('periodogram', plot_periodogram, frequencies, power)
 
 # Function to transform and check stationarity
 def transformation(series):
     # Differencing the series
     diff_series = series.diff().dropna()
 
-    # Register the converters for matplotlib
-    register_matplotlib_converters()
-
-    # Plot the transformed (differenced) series
-    fig = plt.figure(figsize=(16, 6))
-
-    ax1 = fig.add_subplot(1, 3, 1)
-    ax1.set_title('Transformed Series')
-    ax1.plot(diff_series, label='Differenced Series')
-    ax1.plot(diff_series.rolling(window=12).mean(), color='crimson', label='Rolling Mean')
-    ax1.plot(diff_series.rolling(window=12).std(), color='black', label='Rolling Std')
-    ax1.legend()
-
-    # Autocorrelation Plot
-    ax2 = fig.add_subplot(1, 3, 2)
-    plot_acf(diff_series, ax=ax2, lags=50, title='Autocorrelation')
-    ax2.axhline(y=-1.96 / np.sqrt(len(diff_series)), linestyle='--', color='gray')
-    ax2.axhline(y=1.96 / np.sqrt(len(diff_series)), linestyle='--', color='gray')
-    ax2.set_xlabel('Lags')
-
-    # Partial Autocorrelation Plot
-    ax3 = fig.add_subplot(1, 3, 3)
-    plot_pacf(diff_series, ax=ax3, lags=50, title="Partial Autocorrelation")
-    ax3.axhline(y=-1.96 / np.sqrt(len(diff_series)), linestyle='--', color='gray')
-    ax3.axhline(y=1.96 / np.sqrt(len(diff_series)), linestyle='--', color='gray')
-    ax3.set_xlabel('Lags')
-
-    plt.tight_layout()
-    plt.show()
+    # Plot the transformed (differenced) series with its ACF and PACF
+    renderer.render('transformation', plot_transformation, diff_series)
 
     # ADF Test to check Stationarity
     adf_result = adfuller(diff_series, autolag='AIC')
@@ -302,122 +220,122 @@ def transformation(series):
     return diff_series
 
 # Example usage
-transformation(data['Rate'])
+with recorder.stage('transformation'):
+    transformation(data['Rate'])
+
+# Order of differencing: ADF and KPSS at d = 0, 1, 2, keeping the smallest d both tests call stationary
+with recorder.stage('stationarity_battery'):
+    stationarity_table, suggested_d = test_battery({'Rate': data['Rate']}, workers=1)
+print(stationarity_table[['d', 'test', 'statistic', 'p_value', 'decision']].to_string(index=False))
+print(f"Suggested order of differencing: d = {suggested_d['Rate']}")
 
 # Train Test Split for finding the Optimal Paramaters
 train_data = data[1:len(data) - 12]
 test_data = data[len(data) - 12:]
 
 # Define the range of p, d, and q values for ARIMA parameters
-# Since 'd' is already given as 1 we only define ranges for 'p' and 'q'
+# 'd' comes from the stationarity battery, so we only define ranges for 'p' and 'q'
 p = range(0, 3)
 q = range(0, 7)
-d = 1
-
-# Generate all possible combinations of p, d, and q (with d fixed at 1)
-pdq = list(itertools.product(p, [d], q))
-
-# Initialize variables to store the best parameters and minimum AIC
-best_aic = float('inf')
-best_aic_params = None
-
-# Loop through all combinations of parameters
-for param in pdq:
-    try:
-        mod = sm.tsa.ARIMA(train_data['Rate'],
-                           order=param,
-                           enforce_stationarity=False,
-                           enforce_invertibility=False)
-        results = mod.fit()
-
-        # Check if the current AIC is the best so far
-        if results.aic < best_aic:
-            best_aic = results.aic
-            best_aic_params = param
-
-        print(f'ARIMA{param} - AIC:{results.aic}')
-    except Exception as e:
-        print(f'Error for ARIMA{param}: {str(e)}')
-        continue
-
-# Print the best AIC and corresponding parameters
-print(f'Best AIC: {best_aic}')
-print(f'Best AIC Parameters: {best_aic_params}')
+d = int(suggested_d['Rate'])
 
-# Best BIC
-# Only define ranges for 'p' and 'q' based on ACF and PACF
-p = range(0, 3)
-q = range(0, 7)
-d = 1  # d is already determined to be 1
-
-# Generate all possible combinations of p, d, and q (with d fixed at d=1)
-pdq = list(itertools.product(p, [d], q))
-
-# Initialize variables to store the best parameters and minimum BIC
-best_bic = float('inf')
-best_bic_params = None
-
-# Loop through all combinations of parameters
-for param in pdq:
-    try:
-        mod = sm.tsa.ARIMA(train_data['Rate'],
-                           order=param,
-                           enforce_stationarity=False,
-                           enforce_invertibility=False)
-        results = mod.fit()
-
-        # Check if the current BIC is the best so far
-        if results.bic < best_bic:
-            best_bic = results.bic
-            best_bic_params = param
-
-        print(f'ARIMA{param} - BIC:{results.bic}')
-    except Exception as e:
-        print(f'Error for ARIMA{param}: {str(e)}')
-        continue
-
-# Print the best BIC and corresponding parameters
-print(f'Best BIC: {best_bic}')
-print(f'Best BIC Parameters: {best_bic_params}')
+# Generate all possible combinations of p, d, and q (with d fixed at the suggested order)
+pdq = make_pdq(p, d, q)
 
-# Finding Optimal Parameters using Time Series Split
-tscv = TimeSeriesSplit(n_splits=5)
+# Number of worker processes for the order search (all cores by default)
+n_workers = os.cpu_count()
+
+# On-disk cache of fitted models: re-runs on unchanged data skip estimation
+fit_cache = FitCache('.fit_cache')
+
+# Memory-mapped store of backtest forecasts and residuals, sliced later without re-running any fit
+backtest_archive = BacktestArchive('backtest_archive')
+
+# TimeSeriesSplit CV mode: 'halving' scores every order on the smallest fold first and promotes only the best
+# half to more folds (orders eliminated early get no CV AIC), 'full' fits every order on all 5 folds
+cv_search = 'halving'
 
-best_aic_tss = float('inf')
-best_params_tss = None
+# Start each fit from the best of the default, Hannan-Rissanen and neighbouring-order (q - 1) estimates
+warm_start = True
 
-for param in pdq:
-    try:
-        aic_values = []
-        for train_index, test_index in tscv.split(data):
-            train_data_tss, test_data_tss = data.iloc[train_index], data.iloc[test_index]
-            mod = sm.tsa.ARIMA(train_data_tss['Rate'], order=param, enforce_stationarity=False,
-                               enforce_invertibility=False)
-            results = mod.fit()
-            aic_values.append(results.aic)
+# Per-fit budget of the order search: fits running past the timeout (seconds) are stopped and recorded as
+# 'timeout', fits stopped at maxiter optimizer iterations as 'not_converged'
+fit_budget = {'timeout': 60, 'maxiter': 50}
+
+# Fit every order once on the training data (AIC/BIC) and on the TimeSeriesSplit folds (mean AIC)
+with recorder.stage('order_search'):
+    search_table = search_orders(train_data['Rate'], pdq, n_splits=0, workers=n_workers, cache=fit_cache,
+                                 recorder=recorder, warm_start=warm_start, budget=fit_budget)
+    if cv_search == 'halving':
+        cv_table = halving_search(data['Rate'], pdq, n_splits=5, workers=n_workers, cache=fit_cache,
+                                  recorder=recorder, warm_start=warm_start, budget=fit_budget)
+    else:
+        cv_table = search_orders(data['Rate'], pdq, n_splits=5, full_fit=False, workers=n_workers,
+                                 cache=fit_cache, recorder=recorder, warm_start=warm_start, budget=fit_budget)
+    search_table['cv_aic'] = cv_table['cv_aic'].values
+    search_table['n_fits'] += cv_table['n_fits'].values
+
+for row in search_table.itertuples():
+    if row.status in USABLE_STATUSES:
+        note = '' if row.status == 'ok' else ' (not converged)'
+        print(f'ARIMA{row.order} - AIC:{row.aic} - BIC:{row.bic} - CV AIC:{row.cv_aic}{note}')
+    else:
+        print(f'Error for ARIMA{row.order} ({row.status}): {row.error}')
 
-        mean_aic = np.mean(aic_values)
-        if mean_aic < best_aic_tss:
-            best_aic_tss = mean_aic
-            best_params_tss = param
+# Best AIC and BIC on the train-test split
+best_aic_params, best_aic = best_order(search_table, 'aic')
+best_bic_params, best_bic = best_order(search_table, 'bic')
 
-    except Exception as e:
-        continue
+print(f'Best AIC: {best_aic}')
+print(f'Best AIC Parameters: {best_aic_params}')
+print(f'Best BIC: {best_bic}')
+print(f'Best BIC Parameters: {best_bic_params}')
+
+# Finding Optimal Parameters using Time Series Split
+best_params_tss, best_aic_tss = best_order(search_table, 'cv_aic')
 
 print(f'Best AIC (TimeSeriesSplit): {best_aic_tss}')
 print(f'Best Parameters (TimeSeriesSplit): {best_params_tss}')
 
+# Stepwise (Hyndman-Khandakar) search over the same order space, compared with the CV table of the order search,
+# counting only CV fits on both sides. With cv_search = 'halving' that is the halving table, whose eliminated
+# orders have no CV AIC; compare_with_full_grid refits every order on all 5 folds to compare with the exhaustive
+# grid instead, at the cost of the fits the halving search saves
+compare_with_full_grid = False
+
+# Stepwise scores the same data on the same folds, so the orders it visits that the reference table fitted on all
+# 5 folds are taken from it instead of being refitted; its fit count is still that of a standalone stepwise run
+with recorder.stage('stepwise_search'):
+    if cv_search == 'halving' and compare_with_full_grid:
+        reference_table = search_orders(data['Rate'], pdq, n_splits=5, full_fit=False, workers=n_workers,
+                                        cache=fit_cache, recorder=recorder, warm_start=warm_start, budget=fit_budget)
+    else:
+        reference_table = cv_table
+    stepwise_table = stepwise_search(data['Rate'], d, max(p), max(q), 'cv_aic', n_splits=5, workers=n_workers,
+                                     cache=fit_cache, recorder=recorder, warm_start=warm_start, budget=fit_budget,
+                                     known=reference_table[reference_table['n_fits'] == 5])
+reference_name = 'Halving search:' if reference_table is cv_table and cv_search == 'halving' else 'Grid search:'
+comparison = compare_searches(stepwise_table, reference_table, 'cv_aic')
+print(f"Stepwise search: ARIMA{comparison['stepwise_order']} - CV AIC:{comparison['stepwise_value']} "
+      f"({comparison['stepwise_orders']} orders, {comparison['stepwise_fits']} fits)")
+print(f"{reference_name:<17}ARIMA{comparison['grid_order']} - CV AIC:{comparison['grid_value']} "
+      f"({comparison['grid_orders']} orders, {comparison['grid_fits']} fits)")
+
 # In[124]:
 # AIC with train-test split and AIC of Time Series Split returns the same parameters,
 # therefore I will test the model performance of the best BIC parameters and best AIC parameters
 
 # Fit ARIMA model with the best parameters found using Train-Test Split (BIC parameters)
-model_train_test_split = ARIMA(data['Rate'], order=best_bic_params)
-model_fit_train_test_split = model_train_test_split.fit()
+with recorder.stage('final_fit_bic'):
+    model_fit_train_test_split = recorder.record_fit(fit_model, data['Rate'], best_bic_params, cache=fit_cache)
 
 # Fit ARIMA model with the best parameters found using TimeSeriesSplit (AIC parameters)
-model_time_series_split = ARIMA(data['Rate'], order=best_params_tss)
-model_fit_time_series_split = model_time_series_split.fit()
+with recorder.stage('final_fit_tss'):
+    model_fit_time_series_split = recorder.record_fit(fit_model, data['Rate'], best_params_tss, cache=fit_cache)
+
+# Save the fitted state of both models: serving.serve_forecast() forecasts from it in milliseconds, without a refit
+export_state(model_fit_train_test_split, os.path.join('model_state', 'arima_bic.npz'))
+export_state(model_fit_time_series_split, os.path.join('model_state', 'arima_tss.npz'))
 
 # Forecast for 6 months into the future using both models
 forecast_steps = 6
@@ -453,15 +371,8 @@ print_model_performance(model_fit_train_test_split, "Train-Test Split Model")
 print_model_performance(model_fit_time_series_split, "TimeSeriesSplit Model")
 
 # Plot the forecast
-plt.figure(figsize=(12, 6))
-plt.plot(data.index, data['Rate'], label='Observed')
-plt.plot(forecast_time_series_split_values.index, forecast_time_series_split_values, label='Forecast (TimeSeriesSplit)')
-plt.fill_between(forecast_time_series_split_ci.index,
-                 forecast_time_series_split_ci.iloc[:, 0],
-                 forecast_time_series_split_ci.iloc[:, 1], color='green', alpha=0.2)
-plt.legend()
-plt.title('Forecast: TimeSeriesSplit')
-plt.show()
+renderer.render('forecast_timeseries', plot_forecast, data['Rate'], forecast_time_series_split_values,
+                forecast_time_series_split_ci, label='Forecast (TimeSeriesSplit)', title='Forecast: TimeSeriesSplit')
 
 # Forecasting for 6 months into the future
 forecast_steps = 6
@@ -478,41 +389,24 @@ pred_tss = model_fit_time_series_split.get_prediction(start=pd.to_datetime('2018
 pred_ci_tss = pred_tss.conf_int()
 
 # Plot the actual data and predictions
-fig, ax = plt.subplots()
-data.loc['2018':].plot(ax=ax)  # Actual data
-pred_tss.predicted_mean.plot(ax=ax, style='r--')  # Predicted mean
-ax.fill_between(pred_ci_tss.index, pred_ci_tss.iloc[:, 0], pred_ci_tss.iloc[:, 1], color='pink',
-                alpha=0.3)  # Confidence interval
-ax.set_title('Inflation Rates in Poland: Actual vs Predicted')
-ax.legend(['Actual', 'Predicted'])
-plt.show()
+renderer.render('predictions', plot_actual_vs_predicted, data.loc['2018':, 'Rate'], pred_tss.predicted_mean,
+                pred_ci_tss)
 
 # Plot the actual data, fitted values, and predictions
-fig, ax = plt.subplots(figsize=(14, 7))
-data['Rate'].plot(ax=ax, label='Actual')
-model_fit_time_series_split.fittedvalues.plot(ax=ax, color='red', label='Fitted')
-
-# Predictions
-plot_predict(model_fit_time_series_split, start='2020', end='2025', ax=ax, plot_insample=False)
-ax.set_title('Inflation Rates in Poland: Actual vs Fitted vs Predicted')
-ax.legend(loc='best')
-plt.show()
+pred_2020 = model_fit_time_series_split.get_prediction(start='2020', end='2025')
+renderer.render('actual_vs_fitted_vs_predicted', plot_actual_fitted_predicted, data['Rate'],
+                model_fit_time_series_split.fittedvalues, pred_2020.predicted_mean, pred_2020.conf_int(alpha=0.05))
 
 # Calculate Residuals
 residuals_tss = data['Rate'] - model_fit_time_series_split.fittedvalues
+backtest_archive.add_residuals('Rate', best_params_tss, data['Rate'], model_fit_time_series_split.fittedvalues)
 
 # Plot residuals from TimeSeriesSplit model
-plt.figure(figsize=(14, 7))
-plt.plot(residuals_tss.index, residuals_tss, label='Residuals')
-plt.title('Residuals of the ARIMA Model')
-plt.legend(loc='best')
-plt.show()
+renderer.render('residuals', plot_residuals, residuals_tss)
 print(residuals_tss.describe())
 
 # Density of Residuals from TimeSeriesSplit model
-fig, ax = plt.subplots(figsize=(14, 7))
-residuals_tss.plot(kind='kde', ax=ax, title="Density of Residual Errors ")
-plt.show()
+renderer.render('residual_density', plot_residual_density, residuals_tss)
 
 # Find the date of the maximum residual from TimeSeriesSplit model
 max_residual_date_tss = residuals_tss.nlargest(1).idxmin()
@@ -522,64 +416,6 @@ print(f"The date of the maximum residual is: {max_residual_date_tss}")
 second_max_residual_date_tss = residuals_tss.nlargest(2).idxmin()
 print(f"The date of the second maximum residual is: {second_max_residual_date_tss}")
 
-# Recursive Forecast using TimeSeriesSplit model
-def recursive_forecast_tss(data, start_date, end_date, forecast_horizon, order):
-    """
-       Performs recursive forecasting and calculates forecast errors using TimeSeriesSplit model.
-
-       Parameters:
-       - data: pd.Series, time series data with datetime index.
-       - start_date: str, initial model estimation period end.
-       - end_date: str, last date to include in forecasting.
-       - forecast_horizon: int, number of steps ahead to forecast.
-       - order: tuple, ARIMA model order (p, d, q).
-
-       Returns:
-       - dict: Forecast errors for each horizon (ME, MAE, RMSE).
-       """
-    forecast_errors = {i: [] for i in range(1, forecast_horizon + 1)}
-    naive_forecasts = data.shift(1)
-    naive_errors = np.abs(data - naive_forecasts)
-
-    for current_end in pd.date_range(start=pd.Timestamp(start_date), end=pd.Timestamp(end_date), freq='M'):
-        train_data = data[:current_end]
-        model = ARIMA(train_data, order=order)
-        model_fit = model.fit()
-
-        forecast = model_fit.forecast(steps=forecast_horizon)
-        actual = data[
-                 current_end + pd.offsets.MonthBegin(1):current_end + pd.offsets.MonthBegin(1) + pd.offsets.MonthEnd(
-                     forecast_horizon)]
-
-        for i, (pred, act) in enumerate(zip(forecast, actual), start=1):
-            error = act - pred
-            forecast_errors[i].append(error)
-    # Print model summary
-    print(f"Model summary for training data ending {current_end}:")
-    print(model_fit.summary())
-
-    error_metrics = {}
-    for horizon in range(1, forecast_horizon + 1):
-        errors = forecast_errors[horizon]
-        actuals = data[len(data) - len(errors):]  # Ensuring the same length and alignment
-        me = np.mean(errors)
-        mae = np.mean(np.abs(errors))
-        rmse = np.sqrt(np.mean(np.square(errors)))
-        mape = np.mean(np.abs(np.array(errors) / np.where(np.array(actuals) != 0, np.array(actuals),
-                                                          np.nan))) * 100  # Avoiding division by zero
-        mase = mae / np.mean(naive_errors)
-
-        error_metrics[horizon] = {
-            'ME': me,
-            'MAE': mae,
-            'RMSE': rmse,
-            'MAPE': mape,
-            'MASE': mase
-        }
-
-    return error_metrics
-
-
 # Example usage for recursive forecast:
 start_date = '2006-12-01'  # End of initial 10-year training period
 end_date = '2024-01-01'  # Allows for validation of the last forecast in February 2024
@@ -587,8 +423,47 @@ end_date = '2024-01-01'  # Allows for validation of the last forecast in Februar
 forecast_horizon = 6
 order_tss = best_params_tss
 
-errors_tss = recursive_forecast_tss(train_data['Rate'], start_date, end_date, forecast_horizon, order_tss)
+# Extend the previous origin's results with each new month and re-estimate once a year,
+# instead of a full refit at every origin
+backtest_mode = 'update'
+refit_every = 12
+
+with recorder.stage('recursive_forecast'):
+    errors_tss = recursive_forecast_tss(train_data['Rate'], start_date, end_date, forecast_horizon, order_tss,
+                                        mode=backtest_mode, refit_every=refit_every, cache=fit_cache,
+                                        recorder=recorder, archive=backtest_archive)
 for horizon, metrics in errors_tss.items():
     print(f"Forecast Horizon {horizon} months:")
     print(
         f"ME: {metrics['ME']:.4f}, MAE: {metrics['MAE']:.4f}, RMSE: {metrics['RMSE']:.4f}, MAPE:{metrics['MAPE']:.4F}")
+
+# Score every candidate order on the same rolling origins, spread over the worker pool, and rank the orders by
+# their out-of-sample errors per horizon instead of their in-sample AIC
+rank_orders_by_backtest = True
+if rank_orders_by_backtest:
+    with recorder.stage('backtest_orders'):
+        backtest_table = backtest_orders(train_data['Rate'], start_date, end_date, forecast_horizon, pdq,
+                                         refit_every=refit_every, workers=n_workers, cache=fit_cache,
+                                         archive=backtest_archive, model='arima_candidates', recorder=recorder)
+    print(backtest_table.pivot(index='order', columns='horizon', values='MASE').round(4))
+    best_backtest_params, best_mase = best_backtest_order(backtest_table, 'MASE')
+    print(f'Best mean MASE (backtest): {best_mase:.4f}')
+    print(f'Best Parameters (backtest): {best_backtest_params}')
+    for error in backtest_table.attrs['errors']:
+        print(f"Backtest error for ARIMA{error['order']} from {error['first_origin']:%Y-%m}: {error['error']}")
+
+# Set to True to measure how far the update mode metrics drift from full refitting at every origin
+check_backtest_drift = False
+if check_backtest_drift:
+    drift_tss = backtest_drift(train_data['Rate'], start_date, end_date, forecast_horizon, order_tss,
+                               refit_every=refit_every)
+    print(drift_tss['drift'])
+    print(f"Wall time (s): {drift_tss.attrs['seconds']}")
+
+# Wait for figures still being rendered in the background
+with recorder.stage('render_figures'):
+    renderer.close()
+
+# Write the stage timings and fit diagnostics
+print(recorder.summary())
+recorder.save('instrumentation', prefix='arima')
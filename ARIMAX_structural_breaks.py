@@ -1,30 +1,60 @@
 # Standard library imports
-import itertools
+import os
 
 # Third-party imports for data handling
 import pandas as pd
 import numpy as np
 
 # Third-party imports for plotting and visualization
-import matplotlib.pyplot as plt
-from pandas.plotting import register_matplotlib_converters
 from pylab import rcParams
 
 # Third-party imports for statistical modeling
-import statsmodels.api as sm
 from statsmodels.tsa.arima.model import ARIMA
 from statsmodels.tsa.stattools import adfuller, kpss
-from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
 from scipy.signal import periodogram
-import ruptures as rpt
 
 # Third-party imports for machine learning metrics
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-from sklearn.model_selection import TimeSeriesSplit
+
+# Local imports
+from archive import BacktestArchive
+from fit_cache import FitCache, fit_model
+from ingest import read_hicp_series
+from figures import (
+    FigureRenderer,
+    plot_acf_pacf,
+    plot_periodogram,
+    plot_transformation,
+    plot_breakpoints,
+    plot_change_points,
+    plot_forecast,
+    plot_penalty_path,
+)
+from instrumentation import Recorder
+from order_search import make_pdq, halving_search, search_break_orders, best_order, best_break_order
+from serving import model_state, scenario_forecasts
+from stationarity import test_battery
+from structural_breaks import (
+    penalty_path,
+    breaks_for_penalty,
+    pelt_matches_ruptures,
+    candidate_break_sets,
+    break_design,
+    OnlineBreakDetector,
+)
+
+# Figures are shown interactively by default. ARIMA_PLOTS=save renders them headless into visualisations/
+# in background worker processes, ARIMA_PLOTS=off skips plotting
+renderer = FigureRenderer(mode=os.environ.get('ARIMA_PLOTS', 'show'))
+
+# Wall time per stage and diagnostics per model fit, written to instrumentation/ at the end of the run
+recorder = Recorder()
 
 # Import data
+# Only the needed columns are parsed; the cleaned monthly series is cached in binary form,
+# so later runs start from the cache instead of the CSV
 file_path = '/Users/apple/Downloads/prc_hicp_manr__custom_7843973_linear.csv'
-data = pd.read_csv(file_path)
+data = read_hicp_series(file_path, cache_dir='.hicp_cache')
 
 data.head()
 data.tail()
@@ -32,15 +62,6 @@ data.tail()
 # See the data types and non-missing values
 data.info()
 
-# Cleaning and Formatting
-data = data.drop(['DATAFLOW', 'LAST UPDATE', 'freq', 'unit', 'geo', 'OBS_FLAG', 'coicop'], axis=1). \
-    rename(columns={'TIME_PERIOD': 'Date', 'OBS_VALUE': 'Rate'})
-
-# Converting the data column into datetime format
-data['Date'] = pd.to_datetime(data['Date'])
-data.set_index('Date', inplace=True)
-data = data.resample('MS').mean()
-
 # Stationary Check
 # ADF Test
 def adf_test(series):
@@ -60,11 +81,13 @@ def adf_test(series):
     else:
         print('\nCannot reject the null hypothesis. Data may have a unit root and be non-stationary.')
 
-adf_test(data['Rate'])
+with recorder.stage('adf'):
+    adf_test(data['Rate'])
 
 # KPSS Test
 # Perform the KPSS test on the 'Rate' column
-result = kpss(data['Rate'])
+with recorder.stage('kpss'):
+    result = kpss(data['Rate'])
 
 print('======= Kwiatkowski-Phillips-Schmidt-Shin (KPSS) Test Results =======\n')
 print("KPSS Test Statistic:", result[0])
@@ -82,19 +105,7 @@ else:
     print('\nWeak evidence against rejecting the null hypothesis. Data has no unit root and is stationary.')
 
 # ACF and PACF
-f, ax = plt.subplots(nrows=2, ncols=1, figsize=(12, 8))
-plot_acf(data['Rate'], lags=20, ax=ax[0])
-plot_pacf(data['Rate'], lags=20, ax=ax[1], method='ols')
-
-ax[1].annotate('Strong correlation at lag = 1', xy=(1, 0.36), xycoords='data',
-               xytext=(0.15, 0.7), textcoords='axes fraction',
-               arrowprops=dict(color='red', shrink=0.05, width=1))
-
-ax[1].annotate('Strong correlation at lag = 2', xy=(2.1, -0.5), xycoords='data',
-               xytext=(0.25, 0.1), textcoords='axes fraction',
-               arrowprops=dict(color='red', shrink=0.05, width=1))
-plt.tight_layout()
-plt.show()
+renderer.render('acf_pacf', plot_acf_pacf, data['Rate'])
 
 # Cyclic Behavior Detection: Frequency vs. periodogram
 fs = 1 / 12  # The sampling frequency. For monthly data, it would be 1 sample per month.
@@ -115,46 +126,15 @@ print(f"Peak Frequency: {max_frequency:.4f}")
 print(f"Peak Power: {max_power:.4f}")
 
 # Plot the frequency vs. power periodogram for cyclic behavior
-plt.plot(frequencies, power)
-plt.xlabel('Frequency')
-plt.ylabel('Power')
-plt.title('Frequency vs. Power Periodogram')
-plt.show()
+renderer.render('periodogram', plot_periodogram, frequencies, power)
 
 # Function to transform and check stationarity
 def transformation(series):
     # Differencing the series
     diff_series = series.diff().dropna()
 
-    # Register the converters for matplotlib
-    register_matplotlib_converters()
-
-    # Plot the transformed (differenced) series
-    fig = plt.figure(figsize=(16, 6))
-
-    ax1 = fig.add_subplot(1, 3, 1)
-    ax1.set_title('Transformed Series')
-    ax1.plot(diff_series, label='Differenced Series')
-    ax1.plot(diff_series.rolling(window=12).mean(), color='crimson', label='Rolling Mean')
-    ax1.plot(diff_series.rolling(window=12).std(), color='black', label='Rolling Std')
-    ax1.legend()
-
-    # Autocorrelation Plot
-    ax2 = fig.add_subplot(1, 3, 2)
-    plot_acf(diff_series, ax=ax2, lags=50, title='Autocorrelation')
-    ax2.axhline(y=-1.96 / np.sqrt(len(diff_series)), linestyle='--', color='gray')
-    ax2.axhline(y=1.96 / np.sqrt(len(diff_series)), linestyle='--', color='gray')
-    ax2.set_xlabel('Lags')
-
-    # Partial Autocorrelation Plot
-    ax3 = fig.add_subplot(1, 3, 3)
-    plot_pacf(diff_series, ax=ax3, lags=50, title="Partial Autocorrelation")
-    ax3.axhline(y=-1.96 / np.sqrt(len(diff_series)), linestyle='--', color='gray')
-    ax3.axhline(y=1.96 / np.sqrt(len(diff_series)), linestyle='--', color='gray')
-    ax3.set_xlabel('Lags')
-
-    plt.tight_layout()
-    plt.show()
+    # Plot the transformed (differenced) series with its ACF and PACF
+    renderer.render('transformation', plot_transformation, diff_series)
 
     # ADF Test to check Stationarity
     adf_result = adfuller(diff_series, autolag='AIC')
@@ -182,38 +162,42 @@ def transformation(series):
 
 
 # Example usage
-transformation(data['Rate'])
+with recorder.stage('transformation'):
+    transformation(data['Rate'])
 
-# Finding Optimal Parameters using Time Series Split
-tscv = TimeSeriesSplit(n_splits=5)
+# Order of differencing: ADF and KPSS at d = 0, 1, 2, keeping the smallest d both tests call stationary
+with recorder.stage('stationarity_battery'):
+    stationarity_table, suggested_d = test_battery({'Rate': data['Rate']}, workers=1)
+print(stationarity_table[['d', 'test', 'statistic', 'p_value', 'decision']].to_string(index=False))
+print(f"Suggested order of differencing: d = {suggested_d['Rate']}")
 
+# Finding Optimal Parameters using Time Series Split
 p = range(0, 3)
 q = range(0, 7)
-d = 1
+d = int(suggested_d['Rate'])
 
-# Generate all possible combinations of p, d, and q (with d fixed at 1)
-pdq = list(itertools.product(p, [d], q))
+# Generate all possible combinations of p, d, and q (with d fixed at the suggested order)
+pdq = make_pdq(p, d, q)
 
-best_aic_tss = float('inf')
-best_params_tss = None
+# Number of worker processes for the order search (all cores by default)
+n_workers = os.cpu_count()
 
-for param in pdq:
-    try:
-        aic_values = []
-        for train_index, test_index in tscv.split(data):
-            train_data_tss, test_data_tss = data.iloc[train_index], data.iloc[test_index]
-            mod = sm.tsa.ARIMA(train_data_tss['Rate'], order=param, enforce_stationarity=False,
-                               enforce_invertibility=False)
-            results = mod.fit()
-            aic_values.append(results.aic)
+# On-disk cache of fitted models: re-runs on unchanged data skip estimation
+fit_cache = FitCache('.fit_cache')
 
-        mean_aic = np.mean(aic_values)
-        if mean_aic < best_aic_tss:
-            best_aic_tss = mean_aic
-            best_params_tss = param
+# Memory-mapped store of the model residuals, sliced later without re-running any fit
+backtest_archive = BacktestArchive('backtest_archive')
 
-    except Exception as e:
-        continue
+# Per-fit budget of the order search: fits running past the timeout (seconds) are stopped and recorded as
+# 'timeout', fits stopped at maxiter optimizer iterations as 'not_converged'
+fit_budget = {'timeout': 60, 'maxiter': 50}
+
+# Successive-halving TimeSeriesSplit CV: every order is fitted on the smallest fold, and only the best half
+# is promoted to twice as many folds each round, spread over the worker pool
+with recorder.stage('order_search'):
+    search_table = halving_search(data['Rate'], pdq, n_splits=5, workers=n_workers, cache=fit_cache,
+                                  recorder=recorder, warm_start=True, budget=fit_budget)
+best_params_tss, best_aic_tss = best_order(search_table, 'cv_aic')
 
 print(f'Best AIC (TimeSeriesSplit): {best_aic_tss}')
 print(f'Best Parameters (TimeSeriesSplit): {best_params_tss}')
@@ -223,12 +207,23 @@ print(f'Best Parameters (TimeSeriesSplit): {best_params_tss}')
 data['Date'] = range(len(data))
 
 # Detection
-algo = rpt.Pelt(model="l1").fit(data['Rate'].values)
-result = algo.predict(pen=10)
+# The PELT segmentations for every penalty between 1 and 100 are computed once (CROPS), sharing the segment
+# costs between runs; the breaks for any penalty in that range are then read off the path
+pelt_penalty = 10
+with recorder.stage('pelt'):
+    pelt_path = penalty_path(data['Rate'].values, pen_min=1, pen_max=100, model="l1")
+    result = breaks_for_penalty(pelt_path, pelt_penalty)
+
+# Number of breaks against penalty
+print(pelt_path[['n_breaks', 'cost', 'pen_min', 'pen_max']])
+renderer.render('pelt_penalty_path', plot_penalty_path, pelt_path, pelt_penalty)
+
+# Check against rpt.Pelt(model='l1', min_size=2, jump=5): pelt() should give identical breakpoints; the path can
+# return another segmentation of equal penalised cost where several are optimal
+print(pelt_matches_ruptures(data['Rate'].values, [5, 10, 20, 40], path=pelt_path).to_string(index=False))
 
 # Display results
-rpt.display(data['Rate'].values, result)
-plt.show()
+renderer.render('baiperron', plot_breakpoints, data['Rate'].values, result)
 
 # Print change points
 print("Change points detected at indices:", result)
@@ -238,18 +233,8 @@ change_points = [15, 20, 30, 45, 50, 60, 85, 95, 125, 190, 205, 235, 270, 295, 3
 # Filter out any indices that are out of bounds for the DataFrame's size
 change_points = [cp for cp in change_points if cp < len(data)]
 
-# Plot the time series
-plt.figure(figsize=(14, 7))
-plt.plot(data.index, data['Rate'], label='Rate')
-
-# Mark each change point with a vertical line
-for cp in change_points:
-    plt.axvline(x=data.index[cp], color='r', linestyle='--', label='Change Point' if cp == change_points[0] else "")
-
-# Adding legend only once for Change Point
-plt.legend()
-plt.title('Time Series with Detected Change Points')
-plt.show()
+# Plot the time series with each change point marked
+renderer.render('structural_breaks', plot_change_points, data['Rate'], change_points)
 
 # Retrieve the dates corresponding to these indices
 break_dates = data.index[change_points]
@@ -266,41 +251,34 @@ break_dates = ['1998-04-01', '1998-09-01', '1999-07-01', '2000-10-01',
                '2019-07-01', '2021-08-01', '2022-01-01', '2023-04-01',
                '2023-12-01']  # Example breakpoints
 
-# Create dummy variables for structural breaks
-for i, break_date in enumerate(break_dates):
-    data[f'break_{i + 1}'] = (data.index >= break_date).astype(int)
+# Forecast horizon of the ARIMAX models
+forecast_steps = 6
+
+# Create dummy variables for structural breaks, in-sample and for the forecast horizon
+exog, exog_forecast = break_design(data.index, break_dates, forecast_steps)
 
 # Display the first few rows to check the dummy variables
-print(data.head())
-
-# Define exogenous variables (dummy variables)
-exog = data[[f'break_{i + 1}' for i in range(len(break_dates))]]
+print(exog.head())
 
 # Fit the ARIMAX model
-model_arimax = sm.tsa.ARIMA(data['Rate'], order=best_params_tss, exog=exog)
-results_arimax = model_arimax.fit()
+with recorder.stage('arimax_fit_listed_breaks'):
+    results_arimax = recorder.record_fit(fit_model, data['Rate'], best_params_tss, exog=exog, cache=fit_cache)
 print(results_arimax.summary())
 
 # Forecast future values with ARIMAX
-forecast_steps = 6
-exog_forecast = np.tile([1] * len(break_dates), (forecast_steps, 1))  # Future values for dummy variables
 forecast_arimax = results_arimax.get_forecast(steps=forecast_steps, exog=exog_forecast)
 forecast_arimax_values = forecast_arimax.predicted_mean
 print("ARIMAX Forecasted Values:")
 print(forecast_arimax_values)
 
 # Plot the ARIMAX forecast
-plt.figure(figsize=(12, 6))
-plt.plot(data.index, data['Rate'], label='Observed')
-plt.plot(forecast_arimax_values.index, forecast_arimax_values, label='ARIMAX Forecast')
-plt.fill_between(forecast_arimax.conf_int().index,
-                 forecast_arimax.conf_int().iloc[:, 0],
-                 forecast_arimax.conf_int().iloc[:, 1], color='k', alpha=.15)
-plt.legend()
-plt.show()
+renderer.render('arimax_forecast', plot_forecast, data['Rate'], forecast_arimax_values, forecast_arimax.conf_int(),
+                label='ARIMAX Forecast', color='k', alpha=.15)
 
 # Compute residuals
 residuals_arimax = results_arimax.resid
+backtest_archive.add_residuals('Rate', best_params_tss, data['Rate'], results_arimax.fittedvalues,
+                               model='arimax_listed_breaks')
 
 # Calculate performance metrics for ARIMAX
 mse_arimax = mean_squared_error(data['Rate'], results_arimax.fittedvalues)
@@ -317,75 +295,86 @@ print(f'RMSE: {rmse_arimax}')
 print(f'MAPE: {mape_arimax}')
 print(f'R2: {r2_arimax}')
 
-# Time Series Split
-tscv = TimeSeriesSplit(n_splits=5)
-
-# Initialize variables to store the best parameters and minimum AIC
-best_aic = float('inf')
-best_params = None
-
-# Define the range of p, d, and q values for ARIMA parameters
-p = range(0, 3)
-q = range(0, 7)
-d = 1
-pdq = list(itertools.product(p, [d], q))
-
-# Loop through all combinations of parameters
-for param in pdq:
-    try:
-        aic_values = []
-        for train_index, test_index in tscv.split(data):
-            train_data, test_data = data.iloc[train_index], data.iloc[test_index]
-            mod = sm.tsa.ARIMA(train_data['Rate'], order=param, enforce_stationarity=False, enforce_invertibility=False)
-            results = mod.fit()
-            aic_values.append(results.aic)
-
-        mean_aic = np.mean(aic_values)
-        if mean_aic < best_aic:
-            best_aic = mean_aic
-            best_params = param
-
-    except Exception as e:
-        continue
-
-print(f'Best AIC: {best_aic}')
-print(f'Best Parameters: {best_params}')
-
 data['index'] = range(len(data))
-algo = rpt.Pelt(model="l1").fit(data['Rate'].values)
-result = algo.predict(pen=10)
+with recorder.stage('pelt_rerun'):
+    result = breaks_for_penalty(pelt_path, pelt_penalty)
 
-rpt.display(data['Rate'].values, result)
-plt.show()
+renderer.render('baiperron_pelt', plot_breakpoints, data['Rate'].values, result)
 
 change_points = [cp for cp in result if cp < len(data)]
 break_dates = data.index[change_points]
 print("Dates of detected structural breaks:", break_dates)
 
-for i, break_date in enumerate(break_dates):
-    data[f'break_{i + 1}'] = (data.index >= break_date).astype(int)
-exog = data[[f'break_{i + 1}' for i in range(len(break_dates))]]
+# Online break detection for the monthly updates: the detector state is kept between runs, starting from
+# the PELT breaks on the first run. Later runs only feed it the months added since, at constant cost per
+# month, and the break dates for the dummies below come from its up-to-date list. The state records the input
+# file and first date of the series; a state built from other data is discarded and rebuilt from the history
+breaks_state_path = os.path.join('model_state', 'breaks_state.json')
+series_name = os.path.abspath(file_path)
+with recorder.stage('online_breaks'):
+    detector = None
+    if os.path.exists(breaks_state_path):
+        detector = OnlineBreakDetector.load(breaks_state_path)
+        if not detector.matches(data['Rate'], series_name):
+            print(f'{breaks_state_path} was built from {detector.source}, not this series; rebuilding it')
+            detector = None
+    if detector is not None:
+        new_breaks = detector.update_series(data['Rate'])
+    else:
+        detector = OnlineBreakDetector.from_history(data['Rate'], break_dates, name=series_name)
+        new_breaks = []
+    detector.save(breaks_state_path)
+print("New structural breaks since the last run:", new_breaks)
+break_dates = pd.DatetimeIndex(detector.break_dates)
+
+# Joint search over break sets and orders: the online detector's breaks and the PELT segmentations at
+# several penalties, each fitted with every order and its break dummies attached, in one worker pool
+break_sets = {'online': list(break_dates)}
+for name, dates in candidate_break_sets(pelt_path, data.index, [5, 10, 20, 40]).items():
+    if dates not in break_sets.values():
+        break_sets[name] = dates
+with recorder.stage('arimax_break_order_search'):
+    break_search_table = search_break_orders(data['Rate'], break_sets, pdq, workers=n_workers, cache=fit_cache,
+                                             recorder=recorder, warm_start=True, budget=fit_budget)
+best_breaks, best_params, best_aic = best_break_order(break_search_table, 'aic')
+
+print(break_search_table.pivot(index='order', columns='breaks', values='aic'))
+print(f'Best AIC: {best_aic}')
+print(f'Best Breaks: {best_breaks}')
+print(f'Best Parameters: {best_params}')
 
-model_arimax = sm.tsa.ARIMA(data['Rate'], order=best_params, exog=exog)
-results_arimax = model_arimax.fit()
+break_dates = pd.DatetimeIndex(break_sets[best_breaks])
+exog, exog_forecast = break_design(data.index, break_dates, forecast_steps)
+
+with recorder.stage('arimax_fit_pelt_breaks'):
+    results_arimax = recorder.record_fit(fit_model, data['Rate'], best_params, exog=exog, cache=fit_cache)
 print(results_arimax.summary())
 
-forecast_steps = 6
-exog_forecast = np.tile([1] * len(break_dates), (forecast_steps, 1))
 forecast_arimax = results_arimax.get_forecast(steps=forecast_steps, exog=exog_forecast)
 forecast_arimax_values = forecast_arimax.predicted_mean
 print("ARIMAX Forecasted Values:")
 print(forecast_arimax_values)
 
-plt.figure(figsize=(12, 6))
-plt.plot(data.index, data['Rate'], label='Observed')
-plt.plot(forecast_arimax_values.index, forecast_arimax_values, label='ARIMAX Forecast')
-plt.fill_between(forecast_arimax.conf_int().index, forecast_arimax.conf_int().iloc[:, 0],
-                 forecast_arimax.conf_int().iloc[:, 1], color='k', alpha=.15)
-plt.legend()
-plt.show()
+renderer.render('arimax_forecast_pelt', plot_forecast, data['Rate'], forecast_arimax_values,
+                forecast_arimax.conf_int(), label='ARIMAX Forecast', color='k', alpha=.15)
+
+# Scenarios for the latest regime: it persists over the horizon, it unwinds right away, or it unwinds half-way.
+# All paths are forecast from the fitted state in one pass instead of one get_forecast call per path
+if len(exog_forecast.columns):
+    latest_break = exog_forecast.columns[-1]
+    unwinds_midway = (np.arange(forecast_steps) < forecast_steps // 2).astype(int)
+    scenarios = {
+        'regime_persists': exog_forecast,
+        'regime_unwinds': exog_forecast.assign(**{latest_break: 0}),
+        'regime_unwinds_midway': exog_forecast.assign(**{latest_break: unwinds_midway}),
+    }
+    scenario_table = scenario_forecasts(model_state(results_arimax), scenarios)
+    print("ARIMAX scenario forecasts (latest break):")
+    print(scenario_table['mean'].unstack('scenario'))
 
 residuals_arimax = results_arimax.resid
+backtest_archive.add_residuals('Rate', best_params, data['Rate'], results_arimax.fittedvalues,
+                               model='arimax_pelt_breaks')
 
 mse_arimax = mean_squared_error(data['Rate'], results_arimax.fittedvalues)
 mae_arimax = mean_absolute_error(data['Rate'], results_arimax.fittedvalues)
@@ -399,3 +388,11 @@ print(f'MAE: {mae_arimax}')
 print(f'RMSE: {rmse_arimax}')
 print(f'MAPE: {mape_arimax}')
 print(f'R2: {r2_arimax}')
+
+# Wait for figures still being rendered in the background
+with recorder.stage('render_figures'):
+    renderer.close()
+
+# Write the stage timings and fit diagnostics
+print(recorder.summary())
+recorder.save('instrumentation', prefix='arimax')
@@ -0,0 +1,275 @@
+# Standard library imports
+import json
+import os
+
+# Third-party imports for data handling
+import numpy as np
+import pandas as pd
+
+# Local imports
+from backtest import error_metrics, metrics_by_horizon
+
+# One archived forecast (or in-sample fitted value): series and order are ids into the metadata index.
+# In-sample residuals are stored with horizon 0 and the observation date as origin.
+RECORD_DTYPE = np.dtype([
+    ('series', np.int32),
+    ('order', np.int32),
+    ('origin', 'datetime64[ns]'),
+    ('horizon', np.int16),
+    ('forecast', np.float64),
+    ('actual', np.float64),
+    ('residual', np.float64),
+])
+
+# Fraction of superseded records in the records file above which it is compacted
+COMPACT_THRESHOLD = 0.5
+
+# Columns of the metadata index, one row per archived block
+BLOCK_COLUMNS = ['series', 'model', 'order', 'kind', 'start', 'stop', 'n_origins', 'n_horizons',
+                 'first_origin', 'last_origin', 'scale']
+
+
+class BacktestArchive:
+    """
+    Append-only, memory-mapped store of backtest forecasts, actuals and residuals indexed by
+    (series, order, origin, horizon).
+
+    Records live in one flat binary file of RECORD_DTYPE rows that is read back with np.memmap, so slicing
+    never loads more than the requested rows. A small JSON index maps each block (one backtest run or one
+    residual series) to its row range. Archiving the same (series, model, order, kind) again supersedes the
+    earlier block: in place when its size is unchanged, otherwise by appending and compacting the file once
+    more than COMPACT_THRESHOLD of it is superseded rows.
+
+    Parameters:
+    - directory: str, where records.bin and index.json are stored.
+    """
+
+    def __init__(self, directory='backtest_archive'):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, 'index.json')
+        self.index = self._read_index()
+
+    @property
+    def records_path(self):
+        # Compaction writes a new records file and switches the index to it in one atomic index write
+        return os.path.join(self.directory, self.index.get('records_file', 'records.bin'))
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'series': [], 'orders': [], 'n_records': 0, 'blocks': []}
+
+    def _write_index(self):
+        tmp_path = f'{self.index_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _id(self, field, value):
+        values = self.index[field]
+        if value not in values:
+            values.append(value)
+        return values.index(value)
+
+    def _append(self, series, model, order, kind, origins, forecasts, actuals, scale=None):
+        forecasts = np.atleast_2d(np.asarray(forecasts, dtype=float))
+        actuals = np.atleast_2d(np.asarray(actuals, dtype=float))
+        origins = pd.DatetimeIndex(origins)
+        n_origins, n_horizons = forecasts.shape
+        order = [int(value) for value in order]
+
+        records = np.empty(n_origins * n_horizons, dtype=RECORD_DTYPE)
+        records['series'] = self._id('series', str(series))
+        records['order'] = self._id('orders', order)
+        records['origin'] = np.repeat(origins.to_numpy('datetime64[ns]'), n_horizons)
+        records['horizon'] = np.tile(np.arange(1, n_horizons + 1) if kind == 'backtest' else 0, n_origins)
+        records['forecast'] = forecasts.ravel()
+        records['actual'] = actuals.ravel()
+        records['residual'] = records['actual'] - records['forecast']
+
+        key = (str(series), model, order, kind)
+        previous = [b for b in self.index['blocks'] if (b['series'], b['model'], b['order'], b['kind']) == key]
+        if previous and previous[0]['stop'] - previous[0]['start'] == len(records):
+            # Same size as the block it supersedes: overwrite its rows in place
+            start = previous[0]['start']
+            with open(self.records_path, 'r+b') as f:
+                f.seek(start * RECORD_DTYPE.itemsize)
+                f.write(records.tobytes())
+        else:
+            # Rows past n_records belong to an append that never made it into the index: overwrite them
+            start = self.index['n_records']
+            mode = 'r+b' if os.path.exists(self.records_path) else 'wb'
+            with open(self.records_path, mode) as f:
+                f.seek(start * RECORD_DTYPE.itemsize)
+                f.write(records.tobytes())
+                f.truncate()
+            self.index['n_records'] = start + len(records)
+
+        block = {'series': str(series), 'model': model, 'order': order, 'kind': kind,
+                 'start': start, 'stop': start + len(records), 'n_origins': n_origins, 'n_horizons': n_horizons,
+                 'first_origin': str(origins[0]), 'last_origin': str(origins[-1]),
+                 'scale': None if scale is None else float(scale)}
+        self.index['blocks'] = [b for b in self.index['blocks']
+                                if (b['series'], b['model'], b['order'], b['kind']) != key] + [block]
+        self._write_index()
+        if self.dead_fraction() > COMPACT_THRESHOLD:
+            self.compact()
+            block = self.index['blocks'][-1]
+        return block
+
+    def dead_fraction(self):
+        """
+        Fraction of the records file taken by superseded blocks.
+        """
+        if not self.index['n_records']:
+            return 0.0
+        live = sum(block['stop'] - block['start'] for block in self.index['blocks'])
+        return 1 - live / self.index['n_records']
+
+    def compact(self):
+        """
+        Rewrite the live blocks contiguously into a new records file, dropping superseded rows.
+
+        The index is switched to the new file in one atomic write before the old file is removed, so an
+        interrupted compaction leaves the archive readable.
+        """
+        records = self.records()
+        old_path = self.records_path
+        generation = self.index.get('generation', 0) + 1
+        records_file = f'records.{generation}.bin'
+        start = 0
+        blocks = []
+        with open(os.path.join(self.directory, records_file), 'wb') as f:
+            for block in self.index['blocks']:
+                rows = records[block['start']:block['stop']]
+                f.write(rows.tobytes())
+                blocks.append(dict(block, start=start, stop=start + len(rows)))
+                start += len(rows)
+        del records
+        self.index.update({'blocks': blocks, 'n_records': start, 'records_file': records_file,
+                           'generation': generation})
+        self._write_index()
+        if os.path.exists(old_path) and old_path != self.records_path:
+            os.remove(old_path)
+
+    def add_backtest(self, series, order, origins, forecasts, actuals, scale=None, model='arima'):
+        """
+        Archive the forecasts of one recursive backtest.
+
+        Parameters:
+        - series: str, series label, e.g. 'PL CP00'.
+        - order: tuple, ARIMA model order (p, d, q).
+        - origins: array-like of dates, last training date of each forecast origin.
+        - forecasts: np.ndarray, (origins, horizons) forecasts.
+        - actuals: np.ndarray, (origins, horizons) observed values, NaN beyond the end of the series.
+        - scale: float, MASE denominator of the series (backtest.naive_scale).
+        - model: str, model label, e.g. 'arima' or 'arimax_pelt_breaks'.
+
+        Returns:
+        - dict: the metadata index entry of the block.
+        """
+        return self._append(series, model, order, 'backtest', origins, forecasts, actuals, scale)
+
+    def add_residuals(self, series, order, actuals, fitted, model='arima'):
+        """
+        Archive the in-sample residuals of a fitted model (horizon 0, origin = observation date).
+
+        Parameters:
+        - series: str, series label.
+        - order: tuple, ARIMA model order (p, d, q).
+        - actuals: pd.Series, observed values with a DatetimeIndex.
+        - fitted: pd.Series, fitted values on the same index.
+        - model: str, model label.
+
+        Returns:
+        - dict: the metadata index entry of the block.
+        """
+        fitted = fitted.reindex(actuals.index)
+        return self._append(series, model, order, 'residuals', actuals.index,
+                            fitted.to_numpy()[:, None], actuals.to_numpy()[:, None])
+
+    def records(self):
+        """
+        All archived records as a read-only memory map of RECORD_DTYPE rows.
+        """
+        if not self.index['n_records']:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.records_path, dtype=RECORD_DTYPE, mode='r', shape=(self.index['n_records'],))
+
+    def blocks(self, series=None, model=None, order=None, kind=None):
+        """
+        The metadata index as a DataFrame, optionally filtered on series, model, order and kind.
+        """
+        blocks = [block for block in self.index['blocks']
+                  if (series is None or block['series'] == str(series))
+                  and (model is None or block['model'] == model)
+                  and (order is None or block['order'] == [int(value) for value in order])
+                  and (kind is None or block['kind'] == kind)]
+        table = pd.DataFrame(blocks, columns=BLOCK_COLUMNS)
+        table['order'] = table['order'].map(tuple)
+        return table
+
+    def select(self, series=None, model=None, order=None, kind='backtest', start=None, end=None, horizon=None):
+        """
+        Slice the archive without re-running any fit.
+
+        Parameters:
+        - series, model, order, kind: filters on the metadata index; None keeps all.
+        - start, end: str or pd.Timestamp, inclusive origin range; None is open-ended.
+        - horizon: int or list of int, horizons to keep; None keeps all.
+
+        Returns:
+        - pd.DataFrame: series, model, order, origin, horizon, forecast, actual and residual per record.
+        """
+        records = self.records()
+        frames = []
+        for block in self.blocks(series, model, order, kind).itertuples(index=False):
+            rows = records[block.start:block.stop]
+            keep = np.ones(len(rows), dtype=bool)
+            if start is not None:
+                keep &= rows['origin'] >= np.datetime64(pd.Timestamp(start))
+            if end is not None:
+                keep &= rows['origin'] <= np.datetime64(pd.Timestamp(end))
+            if horizon is not None:
+                keep &= np.isin(rows['horizon'], np.atleast_1d(horizon))
+            rows = rows[keep]
+            frames.append(pd.DataFrame({
+                'series': block.series, 'model': block.model, 'order': [block.order] * len(rows),
+                'origin': rows['origin'], 'horizon': rows['horizon'], 'forecast': rows['forecast'],
+                'actual': rows['actual'], 'residual': rows['residual'],
+            }))
+        columns = ['series', 'model', 'order', 'origin', 'horizon', 'forecast', 'actual', 'residual']
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)[columns]
+
+    def accuracy(self, series, order, model='arima', start=None, end=None):
+        """
+        Forecast error metrics per horizon of an archived backtest, over an optional origin range.
+
+        Parameters:
+        - series: str, series label.
+        - order: tuple, ARIMA model order (p, d, q).
+        - model: str, model label.
+        - start, end: str or pd.Timestamp, inclusive origin range; None is open-ended.
+
+        Returns:
+        - dict: {horizon: {ME, MAE, RMSE, MAPE, MASE}}, as returned by recursive_forecast_tss.
+        """
+        blocks = self.blocks(series, model, order, 'backtest')
+        if blocks.empty:
+            raise KeyError(f'no backtest archived for series={series!r}, model={model!r}, order={order}')
+        block = blocks.iloc[-1]
+        rows = self.records()[block['start']:block['stop']].reshape(block['n_origins'], block['n_horizons'])
+        origins = rows['origin'][:, 0]
+        keep = np.ones(len(origins), dtype=bool)
+        if start is not None:
+            keep &= origins >= np.datetime64(pd.Timestamp(start))
+        if end is not None:
+            keep &= origins <= np.datetime64(pd.Timestamp(end))
+        scale = np.nan if pd.isna(block['scale']) else block['scale']
+        metrics = error_metrics(rows['forecast'][keep], rows['actual'][keep], scale)
+        return metrics_by_horizon(metrics)
@@ -0,0 +1,318 @@
+# Standard library imports
+import time
+
+# Third-party imports for data handling
+import numpy as np
+import pandas as pd
+
+# Local imports
+from fit_cache import fit_model, fit_lean, lean_results
+from instrumentation import Recorder, capture_warnings, describe_warnings
+from order_search import run_jobs
+
+
+def recursive_forecast_tss(data, start_date, end_date, forecast_horizon, order, mode='refit', refit_every=None,
+                           cache=None, recorder=None, low_memory=False, archive=None, name=None):
+    """
+    Performs recursive forecasting and calculates forecast errors using TimeSeriesSplit model.
+
+    In 'refit' mode the model is estimated from scratch at every forecast origin. In 'update' mode the
+    results of the previous origin are extended with the new observation at fixed parameters (a Kalman
+    filter update only), and re-estimated every refit_every origins starting from the previous optimum.
+
+    Parameters:
+    - data: pd.Series, time series data with datetime index.
+    - start_date: str, initial model estimation period end.
+    - end_date: str, last date to include in forecasting.
+    - forecast_horizon: int, number of steps ahead to forecast.
+    - order: tuple, ARIMA model order (p, d, q).
+    - mode: str, 'refit' or 'update'.
+    - refit_every: int, re-estimation interval in months for 'update' mode. None keeps the parameters
+      estimated at the first origin.
+    - cache: FitCache, on-disk cache of the model estimations: every fit in 'refit' mode, the
+      re-estimations in 'update' mode (keyed on their start parameters too). Kalman filter updates are not cached.
+    - recorder: Recorder, receives the diagnostics of every model estimation.
+    - low_memory: bool, lean mode: fits keep only parameters, information criteria, forecasts and residual
+      summaries (fit_cache.lean_results), so peak memory does not grow with the number of origins, and a
+      compact summary replaces the full model summary. In 'update' mode the live results object is still
+      needed to extend it, so only the kept estimate is lean.
+    - archive: BacktestArchive, stores the forecasts and actuals of every (origin, horizon) for later
+      analysis. None discards them.
+    - name: str, series label in the archive. None uses data.name.
+
+    Returns:
+    - dict: Forecast errors for each horizon (ME, MAE, RMSE, MAPE, MASE).
+    """
+    if mode not in ('refit', 'update'):
+        raise ValueError(f"mode must be 'refit' or 'update', got {mode!r}")
+    if recorder is None:
+        recorder = Recorder()
+
+    origins = pd.date_range(start=pd.Timestamp(start_date), end=pd.Timestamp(end_date), freq=pd.offsets.MonthEnd())
+    forecasts = np.full((len(origins), forecast_horizon), np.nan)
+    n_trains = np.zeros(len(origins), dtype=int)
+
+    model_fit = None
+    last_estimate = None
+    estimate_end = None
+    estimate_n = n_train = 0
+    for step, current_end in enumerate(origins):
+        train_data = data[:current_end]
+
+        if mode == 'refit' and low_memory:
+            last_estimate = recorder.record_fit(fit_lean, train_data, order, info={'origin': current_end},
+                                                steps=forecast_horizon, cache=cache)
+            forecasts[step] = last_estimate['forecast']['mean'].to_numpy()
+            n_trains[step] = n_train = len(train_data)
+            continue
+        if mode == 'refit':
+            model_fit = recorder.record_fit(fit_model, train_data, order, info={'origin': current_end}, cache=cache)
+            last_estimate = model_fit
+            estimate_end, estimate_n = current_end, len(train_data)
+        elif model_fit is None or (refit_every and step % refit_every == 0):
+            start_params = None
+            if last_estimate is not None:
+                # As a plain list so the fit cache key holds the start parameters at full precision
+                start_params = np.asarray(last_estimate['params'] if low_memory else last_estimate.params).tolist()
+            model_fit = recorder.record_fit(fit_model, train_data, order, info={'origin': current_end},
+                                            fit_kwargs={'start_params': start_params}, cache=cache)
+            last_estimate = model_fit
+            estimate_end, estimate_n = current_end, len(train_data)
+        elif len(train_data) > n_train:
+            # Filter the new observations through the previous results at fixed parameters
+            model_fit = model_fit.extend(train_data.iloc[n_train:])
+        n_train = len(train_data)
+
+        forecasts[step] = np.asarray(model_fit.forecast(steps=forecast_horizon))
+        n_trains[step] = n_train
+        if low_memory and last_estimate is model_fit:
+            last_estimate = lean_results(model_fit)
+    # Print model summary of the last estimation. In 'update' mode it can precede the final origin, whose forecasts
+    # come from the same parameters with the later observations filtered in
+    if mode == 'update' and n_train > estimate_n:
+        print(f"Final origin {current_end:%Y-%m}: parameters of the last re-estimation below, extended at fixed "
+              f"parameters with the {n_train - estimate_n} observations since")
+    print(f"Model summary for the last estimation, training data ending {estimate_end or current_end}:")
+    if low_memory:
+        print(f"ARIMA{order} - AIC:{last_estimate['aic']:.4f} - BIC:{last_estimate['bic']:.4f} - "
+              f"Log likelihood:{last_estimate['llf']:.4f} - Observations:{last_estimate['nobs']}")
+        print(pd.Series(last_estimate['params'], index=last_estimate['param_names']).to_string())
+    else:
+        print(last_estimate.summary())
+
+    values = np.asarray(data, dtype=float)
+    actuals = align_actuals(values, n_trains, forecast_horizon)
+    scale = naive_scale(values)
+    if archive is not None:
+        archive.add_backtest(data.name if name is None else name, order, data.index[n_trains - 1], forecasts,
+                             actuals, scale)
+    metrics = error_metrics(forecasts, actuals, scale)
+    return metrics_by_horizon(metrics)
+
+
+def align_actuals(values, n_trains, forecast_horizon):
+    """
+    Gather the observed values each forecast is scored against.
+
+    Parameters:
+    - values: np.ndarray, the full series.
+    - n_trains: np.ndarray, number of training observations at each origin; the h-step forecast of
+      an origin targets values[n_train + h - 1].
+    - forecast_horizon: int, number of steps ahead.
+
+    Returns:
+    - np.ndarray: (origins, horizons) actuals, NaN where the target lies beyond the end of the series.
+    """
+    positions = np.asarray(n_trains)[:, None] + np.arange(forecast_horizon)[None, :]
+    padded = np.append(values, np.nan)
+    return padded[np.minimum(positions, len(values))]
+
+
+def naive_scale(values):
+    """
+    Mean absolute error of the one-step naive (random walk) forecast, the MASE denominator.
+    """
+    return np.nanmean(np.abs(np.diff(values)))
+
+
+def error_metrics(forecasts, actuals, scale):
+    """
+    Forecast error metrics per horizon, computed in one vectorized pass.
+
+    Forecasts and actuals are aligned arrays whose last two axes are (origins, horizons); leading axes,
+    e.g. one per candidate order, are kept. Pairs with a missing actual are left out of every metric.
+
+    Parameters:
+    - forecasts: np.ndarray, (..., origins, horizons) forecasts.
+    - actuals: np.ndarray, actual values with the same shape.
+    - scale: float or np.ndarray, MASE denominator (broadcast against the leading axes).
+
+    Returns:
+    - dict: ME, MAE, RMSE, MAPE and MASE arrays of shape (..., horizons).
+    """
+    errors = actuals - forecasts
+    valid = ~np.isnan(errors)
+    counts = valid.sum(axis=-2)
+    errors = np.where(valid, errors, 0.0)
+    # Avoiding division by zero: zero actuals are left out of the MAPE
+    nonzero = valid & (actuals != 0)
+    ratios = np.divide(errors, actuals, out=np.zeros_like(errors), where=nonzero)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        me = errors.sum(axis=-2) / counts
+        mae = np.abs(errors).sum(axis=-2) / counts
+        rmse = np.sqrt(np.square(errors).sum(axis=-2) / counts)
+        mape = np.abs(ratios).sum(axis=-2) / nonzero.sum(axis=-2) * 100
+        mase = mae / np.asarray(scale)[..., None]
+    return {'ME': me, 'MAE': mae, 'RMSE': rmse, 'MAPE': mape, 'MASE': mase}
+
+
+def metrics_by_horizon(metrics):
+    """
+    Convert the (horizons,) metric arrays of error_metrics to {horizon: {metric: value}}.
+    """
+    n_horizons = len(next(iter(metrics.values())))
+    return {horizon: {name: float(values[horizon - 1]) for name, values in metrics.items()}
+            for horizon in range(1, n_horizons + 1)}
+
+
+def backtest_block(job):
+    """
+    Forecast one order from a run of consecutive origins: estimated at the first origin, then extended with
+    each later origin's new observations at fixed parameters.
+
+    Parameters:
+    - job: tuple, (data, order, n_trains, forecast_horizon, cache) with n_trains the number of training
+      observations at each origin of the run.
+
+    Returns:
+    - dict: 'forecasts' (origins, horizons) array, NaN where the fit failed, the 'error' message or None, and
+      the Recorder 'fits' record of the estimation (wall time, iterations, convergence, status and warnings,
+      including those of the later extensions), for the parent process to add to its own recorder.
+    """
+    data, order, n_trains, forecast_horizon, cache = job
+    forecasts = np.full((len(n_trains), forecast_horizon), np.nan)
+    recorder = Recorder()
+    info = {'origin': data.index[n_trains[0] - 1]}
+    error = None
+    # Warnings are recorded with the fit instead of printed by every worker
+    with capture_warnings() as caught:
+        try:
+            if len(n_trains) == 1:
+                estimate = recorder.record_fit(fit_lean, data.iloc[:n_trains[0]], order, info=info,
+                                               steps=forecast_horizon, cache=cache)
+                forecasts[0] = estimate['forecast']['mean'].to_numpy()
+            else:
+                model_fit = recorder.record_fit(fit_model, data.iloc[:n_trains[0]], order, info=info, cache=cache)
+                for step, n_train in enumerate(n_trains):
+                    if step and n_train > n_trains[step - 1]:
+                        model_fit = model_fit.extend(data.iloc[n_trains[step - 1]:n_train])
+                    forecasts[step] = np.asarray(model_fit.forecast(steps=forecast_horizon))
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+    for record in recorder.fits:
+        messages = [record['warnings']] if record['warnings'] else []
+        record['warnings'] = '; '.join(dict.fromkeys(messages + describe_warnings(caught)))
+    return {'forecasts': forecasts, 'error': error, 'fits': recorder.fits}
+
+
+def backtest_orders(data, start_date, end_date, forecast_horizon, pdq, refit_every=None, workers=None, cache=None,
+                    archive=None, name=None, model='arima', progress=None, recorder=None):
+    """
+    Recursive out-of-sample backtest of every candidate order, with (order, origin) jobs spread over a process
+    pool, and the orders ranked by their forecast errors at each horizon.
+
+    With refit_every=None every (order, origin) is a separate lean fit, as recursive_forecast_tss(mode='refit',
+    low_memory=True). With refit_every=k the origins are split into runs of k months; each (order, run) job is
+    estimated at the first origin of the run and extended at fixed parameters over the rest, as
+    recursive_forecast_tss(mode='update', refit_every=k) except that each run starts from default start values.
+
+    Parameters:
+    - data, start_date, end_date, forecast_horizon: as for recursive_forecast_tss.
+    - pdq: list, candidate ARIMA orders.
+    - refit_every: int, re-estimation interval in months. None re-estimates at every origin.
+    - workers: int, number of worker processes. None uses every core.
+    - cache: FitCache, on-disk cache of the estimations.
+    - archive: BacktestArchive, stores the forecasts and actuals of every order. None discards them.
+    - name: str, series label in the archive. None uses data.name.
+    - model: str, model label in the archive.
+    - progress: callable, progress(done, total, result) after each job. None disables reporting.
+    - recorder: Recorder, receives the diagnostics of every estimation, timed in the workers.
+
+    Returns:
+    - pd.DataFrame: one row per (order, horizon) with ME, MAE, RMSE, MAPE and MASE, the number of origins whose
+      fit failed and the rank of the order at that horizon by MAE, RMSE and MASE (1 is best). The errors of
+      failed jobs are listed in the frame's attrs['errors'].
+    """
+    origins = pd.date_range(start=pd.Timestamp(start_date), end=pd.Timestamp(end_date), freq=pd.offsets.MonthEnd())
+    n_trains = np.array([len(data[:origin]) for origin in origins])
+    run_length = refit_every or 1
+    runs = [n_trains[start:start + run_length] for start in range(0, len(n_trains), run_length)]
+    jobs = [(data, order, run, forecast_horizon, cache) for order in pdq for run in runs]
+    results = run_jobs(backtest_block, jobs, workers, progress=progress)
+    if recorder is not None:
+        recorder.add_fits([fit for result in results for fit in result['fits']])
+
+    forecasts = np.stack([np.vstack([result['forecasts'] for result in results[i * len(runs):(i + 1) * len(runs)]])
+                          for i in range(len(pdq))])
+    values = np.asarray(data, dtype=float)
+    actuals = align_actuals(values, n_trains, forecast_horizon)
+    scale = naive_scale(values)
+    if archive is not None:
+        for order, order_forecasts in zip(pdq, forecasts):
+            archive.add_backtest(data.name if name is None else name, order, data.index[n_trains - 1],
+                                 order_forecasts, actuals, scale, model=model)
+
+    metrics = error_metrics(forecasts, actuals[None], scale)
+    failed = np.isnan(forecasts).all(axis=-1).sum(axis=-1)
+    table = pd.DataFrame([{'order': order, 'horizon': horizon + 1, 'failed_origins': failed[i],
+                           **{metric: values[i, horizon] for metric, values in metrics.items()}}
+                          for i, order in enumerate(pdq) for horizon in range(forecast_horizon)])
+    for metric in ('MAE', 'RMSE', 'MASE'):
+        table[f'rank_{metric}'] = table.groupby('horizon')[metric].rank(method='min')
+    table.attrs['errors'] = [{'order': job[1], 'first_origin': origins[np.searchsorted(n_trains, job[2][0])],
+                              'error': result['error']} for job, result in zip(jobs, results) if result['error']]
+    return table
+
+
+def best_backtest_order(table, metric='MASE', horizon=None):
+    """
+    Return the order with the lowest backtest error in a backtest_orders table, and that error.
+
+    Parameters:
+    - table: pd.DataFrame, as returned by backtest_orders().
+    - metric: str, 'MAE', 'RMSE' or 'MASE'.
+    - horizon: int, horizon to rank on. None averages the metric over all horizons.
+    """
+    rows = table if horizon is None else table[table['horizon'] == horizon]
+    scores = rows.groupby('order', sort=False)[metric].mean()
+    if scores.isna().all():
+        return None, float('inf')
+    return scores.idxmin(), scores.min()
+
+
+def backtest_drift(data, start_date, end_date, forecast_horizon, order, refit_every=None):
+    """
+    Runs the recursive forecast in 'refit' and 'update' mode and reports how far the error metrics drift.
+
+    Parameters:
+    - data, start_date, end_date, forecast_horizon, order: as for recursive_forecast_tss.
+    - refit_every: int, re-estimation interval for the 'update' mode run.
+
+    Returns:
+    - pd.DataFrame: one row per horizon with the refit and update metrics and their difference
+      (update - refit), plus the wall time of both runs in the frame's attrs.
+    """
+    timings = {}
+    metrics = {}
+    for mode in ('refit', 'update'):
+        start = time.perf_counter()
+        metrics[mode] = pd.DataFrame(recursive_forecast_tss(data, start_date, end_date, forecast_horizon, order,
+                                                            mode=mode, refit_every=refit_every)).T
+        timings[mode] = time.perf_counter() - start
+
+    drift = pd.concat({'refit': metrics['refit'], 'update': metrics['update'],
+                       'drift': metrics['update'] - metrics['refit']}, axis=1)
+    drift.index.name = 'horizon'
+    drift.attrs['seconds'] = timings
+    return drift
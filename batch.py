@@ -0,0 +1,256 @@
+# Standard library imports
+import argparse
+import os
+import time
+
+# Third-party imports for data handling
+import numpy as np
+import pandas as pd
+
+# Local imports
+from batched_arima import batch_fit_models, batch_search_orders
+from features import panel_features, save_features
+from fit_cache import FitCache, fit_model, lean_results
+from ingest import read_hicp_panel, iter_series
+from order_search import make_pdq, search_orders, stepwise_search, best_order, run_jobs
+from serving import export_state
+from stationarity import suggest_d
+
+# Default settings of the per-series chain, matching the single-series scripts
+BATCH_CONFIG = {
+    'p': range(0, 3),
+    'q': range(0, 7),
+    'max_d': 2,
+    'n_splits': 5,
+    # 'grid' fits every (p, d, q) in the p and q ranges, 'stepwise' walks from (2, d, 2) to better neighbours
+    'search': 'grid',
+    # Seed each fit with Hannan-Rissanen estimates and the optimum of its neighbouring order
+    'warm_start': True,
+    # Per-fit limits: a fit running past fit_timeout seconds is abandoned, maxiter caps the optimizer
+    'fit_timeout': 60,
+    'maxiter': 50,
+    'criterion': 'cv_aic',
+    'forecast_steps': 6,
+    'min_obs': 36,
+    'cache': None,
+    # Directory for the fitted state of every series (see serving.py); None skips saving it
+    'state_dir': None,
+    # 'statsmodels' fits each series on its own; 'batched' estimates d = 1 series that share an index together
+    # with the vectorized engine of batched_arima.py (grid search only, no fit cache or timeout)
+    'engine': 'statsmodels',
+}
+
+# Columns of the consolidated forecast table
+FORECAST_COLUMNS = ['geo', 'coicop', 'Date', 'forecast', 'lower', 'upper', 'order', 'status', 'error']
+
+
+def forecast_series(job):
+    """
+    Run the stationarity -> order search -> forecast chain for one series.
+
+    Any exception is caught and reported in the returned rows, so one bad series does not stop the batch.
+
+    Parameters:
+    - job: tuple, ((geo, coicop), series, config).
+
+    Returns:
+    - list: one dict per forecast step (or a single failure row) with geo, coicop, Date, forecast,
+      lower, upper, order, status and error.
+    """
+    key, series, config = job
+    try:
+        series = series.rename('Rate')
+        if series.count() < config['min_obs']:
+            raise ValueError(f'only {series.count()} observations, need {config["min_obs"]}')
+
+        d = suggest_d(series, max_d=config['max_d'])
+        budget = {'timeout': config['fit_timeout'], 'maxiter': config['maxiter']}
+        if config['search'] == 'stepwise':
+            search_table = stepwise_search(series, d, max(config['p']), max(config['q']), config['criterion'],
+                                           n_splits=config['n_splits'], workers=1, cache=config['cache'],
+                                           warm_start=config['warm_start'], budget=budget)
+        else:
+            pdq = make_pdq(config['p'], d, config['q'])
+            search_table = search_orders(series, pdq, n_splits=config['n_splits'], workers=1, cache=config['cache'],
+                                         warm_start=config['warm_start'], budget=budget)
+        order, _ = best_order(search_table, config['criterion'])
+        if order is None:
+            raise ValueError('no candidate order could be fitted')
+
+        # Lean final fit: only the forecast (and the saved state) outlive it
+        model_fit = fit_model(series, order, fit_kwargs={'method_kwargs': {'maxiter': config['maxiter']}},
+                              cache=config['cache'], timeout=config['fit_timeout'], low_memory=True)
+        if config['state_dir'] is not None:
+            geo, coicop = key
+            export_state(model_fit, os.path.join(config['state_dir'], f'{geo}_{coicop}.npz'))
+        forecast = lean_results(model_fit, config['forecast_steps'])['forecast']
+        del model_fit
+    except Exception as e:
+        return failure_rows(key, e)
+    return forecast_rows(key, order, forecast)
+
+
+def forecast_rows(key, order, forecast):
+    """
+    Rows of the forecast table for one series from a forecast_from_state() frame.
+    """
+    geo, coicop = key
+    return [{'geo': geo, 'coicop': coicop, 'Date': date, 'forecast': row['mean'], 'lower': row['lower'],
+             'upper': row['upper'], 'order': str(order), 'status': 'ok', 'error': None}
+            for date, row in forecast.iterrows()]
+
+
+def failure_rows(key, error):
+    """
+    The single row of the forecast table reporting a failed series.
+    """
+    geo, coicop = key
+    return [{'geo': geo, 'coicop': coicop, 'Date': pd.NaT, 'forecast': np.nan, 'lower': np.nan, 'upper': np.nan,
+             'order': None, 'status': 'failed', 'error': f'{type(error).__name__}: {error}'}]
+
+
+def print_progress(done, total, rows):
+    """
+    Print one line per finished series.
+    """
+    row = rows[0]
+    status = row['status'] if row['status'] == 'ok' else f"failed ({row['error']})"
+    print(f"[{done}/{total}] {row['geo']} {row['coicop']} {row['order'] or ''}: {status}", flush=True)
+
+
+def series_d(job):
+    """
+    Order of differencing of one series for the batched engine, or None when it is too short.
+    """
+    key, series, config = job
+    if series.count() < config['min_obs']:
+        return None
+    return suggest_d(series, max_d=config['max_d'])
+
+
+def forecast_batched(jobs, workers=None, progress=print_progress):
+    """
+    Run the chain of forecast_series with the batched engine: series with d = 1, no gaps and the same index
+    are searched over the (p, 1, q) grid and fitted together (batched_arima.batch_search_orders and
+    batch_fit_models), one vectorized fit per order and fold instead of one statsmodels fit per series.
+    Every other series, and every series of a group the engine fails on, goes through forecast_series.
+
+    Parameters:
+    - jobs: list, ((geo, coicop), series, config) tuples as for forecast_series.
+    - workers: int, worker processes of the differencing tests and the per-series fallback.
+    - progress: callable, progress(done, total, rows) after each series. None disables reporting.
+
+    Returns:
+    - list: the rows of forecast_series for every job, in the order of jobs.
+    """
+    config = jobs[0][2] if jobs else BATCH_CONFIG
+    results = [None] * len(jobs)
+    done = 0
+
+    def report(i, rows):
+        nonlocal done
+        results[i] = rows
+        done += 1
+        if progress is not None:
+            progress(done, len(jobs), rows)
+
+    # Group the d = 1 series without gaps by their index
+    groups = {}
+    for i, ((_, series, _), d) in enumerate(zip(jobs, run_jobs(series_d, jobs, workers))):
+        if d == 1 and not series.isna().any():
+            groups.setdefault((series.index[0], len(series)), []).append(i)
+
+    pdq = make_pdq(config['p'], 1, config['q'])
+    grouped = {i for members in groups.values() for i in members}
+    fallback = [i for i in range(len(jobs)) if i not in grouped]
+    for (first_date, _), members in groups.items():
+        frame = pd.DataFrame({i: jobs[i][1].to_numpy() for i in members}, index=jobs[members[0]][1].index)
+        try:
+            tables = batch_search_orders(frame, pdq, n_splits=config['n_splits'], maxiter=config['maxiter'])
+            orders = {i: best_order(tables[i], config['criterion'])[0] for i in members}
+            for i in [i for i in members if orders[i] is None]:
+                report(i, failure_rows(jobs[i][0], ValueError('no candidate order could be fitted')))
+            for order in {order for order in orders.values() if order is not None}:
+                columns = [i for i in members if orders[i] == order]
+                fits = batch_fit_models(frame[columns], order, maxiter=config['maxiter'], low_memory=True)
+                for i, model_fit in fits.items():
+                    geo, coicop = jobs[i][0]
+                    if config['state_dir'] is not None:
+                        export_state(model_fit, os.path.join(config['state_dir'], f'{geo}_{coicop}.npz'))
+                    forecast = lean_results(model_fit, config['forecast_steps'])['forecast']
+                    report(i, forecast_rows(jobs[i][0], order, forecast))
+        except Exception as e:
+            print(f'Batched engine failed on the {len(members)} series starting {first_date:%Y-%m}: {e}; '
+                  f'fitting them one by one')
+            fallback += [i for i in members if results[i] is None]
+
+    for i, rows in zip(fallback, run_jobs(forecast_series, [jobs[i] for i in fallback], workers)):
+        report(i, rows)
+    return results
+
+
+def run_batch(file_path, output_path=None, workers=None, config=None, progress=print_progress, cache_dir=None,
+              features_path=None):
+    """
+    Forecast every (geo, coicop) series of a Eurostat HICP extract across a process pool.
+
+    Parameters:
+    - file_path: str, long-format prc_hicp_manr CSV extract.
+    - output_path: str, where to write the consolidated forecast table as CSV. None skips writing.
+    - workers: int, number of worker processes. None uses every core.
+    - config: dict, overrides for BATCH_CONFIG.
+    - progress: callable, progress(done, total, rows) after each series. None disables reporting.
+    - cache_dir: str, directory of the binary cache of the cleaned panel. None always parses the CSV.
+    - features_path: str, .npz file for the ACF/PACF/periodogram/rolling features of every series, computed
+      on the first differences. None skips feature extraction.
+
+    Returns:
+    - pd.DataFrame: consolidated forecast table with one row per (geo, coicop, Date).
+    """
+    config = dict(BATCH_CONFIG, **(config or {}))
+    panel = read_hicp_panel(file_path, cache_dir=cache_dir)
+    if features_path is not None:
+        save_features(panel_features(panel, d=1), features_path)
+    jobs = [(key, series, config) for key, series in iter_series(panel)]
+
+    start = time.perf_counter()
+    if config['engine'] == 'batched':
+        results = forecast_batched(jobs, workers, progress=progress)
+    else:
+        results = run_jobs(forecast_series, jobs, workers, progress=progress)
+    forecasts = pd.DataFrame([row for rows in results for row in rows], columns=FORECAST_COLUMNS)
+
+    n_failed = (forecasts.groupby(['geo', 'coicop'])['status'].first() != 'ok').sum()
+    print(f'Forecasted {len(jobs) - n_failed}/{len(jobs)} series in {time.perf_counter() - start:.1f}s')
+
+    if output_path is not None:
+        forecasts.to_csv(output_path, index=False)
+    return forecasts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Batch HICP forecasts for every (geo, coicop) series.')
+    parser.add_argument('file_path', help='long-format Eurostat prc_hicp_manr CSV extract')
+    parser.add_argument('output_path', help='CSV file for the consolidated forecast table')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--steps', type=int, default=BATCH_CONFIG['forecast_steps'], help='forecast horizon')
+    parser.add_argument('--search', choices=['grid', 'stepwise'], default=BATCH_CONFIG['search'],
+                        help='order search strategy')
+    parser.add_argument('--engine', choices=['statsmodels', 'batched'], default=BATCH_CONFIG['engine'],
+                        help='estimate each series on its own or same-index d = 1 series together')
+    parser.add_argument('--fit-timeout', type=float, default=BATCH_CONFIG['fit_timeout'],
+                        help='wall-clock budget of a single model fit in seconds')
+    parser.add_argument('--cache-dir', default=None,
+                        help='directory of the panel and fit caches (default: no caching)')
+    parser.add_argument('--state-dir', default=None,
+                        help='directory for the fitted model state of every series (default: not saved)')
+    parser.add_argument('--features', default=None,
+                        help='.npz file for the ACF/PACF/periodogram features of every series (default: skip)')
+    args = parser.parse_args()
+
+    fit_cache = FitCache(os.path.join(args.cache_dir, 'fits')) if args.cache_dir else None
+    panel_cache = os.path.join(args.cache_dir, 'hicp') if args.cache_dir else None
+    run_batch(args.file_path, args.output_path, workers=args.workers,
+              config={'forecast_steps': args.steps, 'search': args.search, 'fit_timeout': args.fit_timeout,
+                      'cache': fit_cache, 'state_dir': args.state_dir, 'engine': args.engine},
+              cache_dir=panel_cache, features_path=args.features)
@@ -0,0 +1,520 @@
+# Third-party imports for data handling
+import numpy as np
+import pandas as pd
+
+# Third-party imports for statistical modeling
+import statsmodels.api as sm
+from sklearn.model_selection import TimeSeriesSplit
+
+# Local imports
+from instrumentation import fit_status
+from order_search import MODEL_KWARGS, order_table
+
+# Initial variance of the approximately diffuse states, as in statsmodels
+APPROX_DIFFUSE_VARIANCE = 1e6
+
+# Step of the complex-step derivatives: exact to machine precision, no subtractive cancellation
+COMPLEX_STEP = 1e-20
+
+# Relative change of the state covariance at which the filter switches to its steady state
+STEADY_STATE_TOLERANCE = 1e-15
+
+# Stopping rules of statsmodels' default L-BFGS fit: projected gradient tolerance and factr * machine epsilon
+GTOL = 1e-5
+FTOL = 1e7 * np.finfo(float).eps
+
+
+def _check_order(order):
+    p, d, q = order
+    if d != 1:
+        raise ValueError(f'the batched engine handles ARIMA(p, 1, q) models only, got order {order}')
+    return p, q
+
+
+def param_names(order):
+    """
+    Parameter names of an ARIMA(p, 1, q) model, in statsmodels' order (AR, MA, sigma2).
+    """
+    p, q = _check_order(order)
+    return [f'ar.L{i}' for i in range(1, p + 1)] + [f'ma.L{i}' for i in range(1, q + 1)] + ['sigma2']
+
+
+def _constrain_stationary(unconstrained):
+    # Monahan (1984) transform of statsmodels' constrain_stationary_univariate, along the last axis
+    n = unconstrained.shape[-1]
+    r = unconstrained / np.sqrt(1 + unconstrained ** 2)
+    y = np.zeros(unconstrained.shape[:-1] + (n, n), dtype=unconstrained.dtype)
+    for k in range(n):
+        for i in range(k):
+            y[..., k, i] = y[..., k - 1, i] + r[..., k] * y[..., k - 1, k - i - 1]
+        y[..., k, k] = r[..., k]
+    return -y[..., n - 1, :]
+
+
+def _unconstrain_stationary(constrained):
+    # Inverse of _constrain_stationary (statsmodels' unconstrain_stationary_univariate), along the last axis
+    n = constrained.shape[-1]
+    y = np.zeros(constrained.shape[:-1] + (n, n), dtype=constrained.dtype)
+    y[..., n - 1, :] = -constrained
+    for k in range(n - 1, 0, -1):
+        for i in range(k):
+            y[..., k - 1, i] = ((y[..., k, i] - y[..., k, k] * y[..., k, k - i - 1])
+                                / (1 - y[..., k, k] ** 2))
+    r = np.diagonal(y, axis1=-2, axis2=-1)
+    return r / np.sqrt(1 - r ** 2)
+
+
+def transform_params(unconstrained, order, enforce_stationarity=True, enforce_invertibility=True):
+    """
+    Map optimizer (unconstrained) parameters to model parameters for a batch, like SARIMAX.transform_params.
+
+    Parameters:
+    - unconstrained: np.ndarray, (n_series, k) parameters.
+    - order: tuple, (p, 1, q) order.
+    - enforce_stationarity, enforce_invertibility: bool, as for statsmodels' ARIMA.
+
+    Returns:
+    - np.ndarray: (n_series, k) AR, MA and sigma2 parameters.
+    """
+    p, q = _check_order(order)
+    constrained = unconstrained.copy()
+    if p and enforce_stationarity:
+        constrained[:, :p] = _constrain_stationary(unconstrained[:, :p])
+    if q and enforce_invertibility:
+        constrained[:, p:p + q] = -_constrain_stationary(unconstrained[:, p:p + q])
+    constrained[:, -1] = unconstrained[:, -1] ** 2
+    return constrained
+
+
+def untransform_params(constrained, order, enforce_stationarity=True, enforce_invertibility=True):
+    """
+    Inverse of transform_params() (arguments are the same).
+    """
+    p, q = _check_order(order)
+    unconstrained = constrained.copy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if p and enforce_stationarity:
+            unconstrained[:, :p] = _unconstrain_stationary(constrained[:, :p])
+        if q and enforce_invertibility:
+            unconstrained[:, p:p + q] = _unconstrain_stationary(-constrained[:, p:p + q])
+    unconstrained[:, -1] = np.sqrt(constrained[:, -1])
+    return unconstrained
+
+
+def state_space(params, order):
+    """
+    Batched state-space matrices of ARIMA(p, 1, q) in statsmodels' layout: the level y[t-1] first, then the
+    ARMA states in companion form; the observation is their sum and has no measurement error.
+
+    Parameters:
+    - params: np.ndarray, (n_series, k) AR, MA and sigma2 parameters (real or complex).
+    - order: tuple, (p, 1, q) order.
+
+    Returns:
+    - tuple: (transition (n_series, m, m), selection (n_series, m), sigma2 (n_series,)).
+    """
+    p, q = _check_order(order)
+    n_series = params.shape[0]
+    r = max(p, q + 1)
+    m = r + 1
+    transition = np.zeros((n_series, m, m), dtype=params.dtype)
+    transition[:, 0, :2] = 1
+    transition[:, 1:p + 1, 1] = params[:, :p]
+    transition[:, np.arange(1, r), np.arange(2, m)] = 1
+    selection = np.zeros((n_series, m), dtype=params.dtype)
+    selection[:, 1] = 1
+    selection[:, 2:q + 2] = params[:, p:p + q]
+    return transition, selection, params[:, -1]
+
+
+def _initial_state_cov(transition, selection, sigma2, stationary):
+    n_series, m, _ = transition.shape
+    cov = np.zeros((n_series, m, m), dtype=transition.dtype)
+    cov[:, 0, 0] = APPROX_DIFFUSE_VARIANCE
+    if not stationary:
+        cov[:, 1:, 1:] = APPROX_DIFFUSE_VARIANCE * np.eye(m - 1)
+        return cov
+    # Unconditional covariance of the ARMA block: vec(P) = (I - T kron T)^-1 vec(R R' sigma2)
+    r = m - 1
+    arma = transition[:, 1:, 1:]
+    kron = np.einsum('bij,bkl->bikjl', arma, arma).reshape(n_series, r * r, r * r)
+    rhs = (selection[:, 1:, None] * selection[:, None, 1:] * sigma2[:, None, None]).reshape(n_series, r * r)
+    cov[:, 1:, 1:] = np.linalg.solve(np.eye(r * r) - kron, rhs[..., None]).reshape(n_series, r, r)
+    return cov
+
+
+def _predict(matrix, ar):
+    # Transition times a batch of state vectors (n_series, m) or matrices (n_series, m, m), using the sparsity of
+    # T: the level adds the first ARMA state, the ARMA states are in companion form
+    predicted = np.empty_like(matrix)
+    ar = ar if matrix.ndim == 2 else ar[:, :, None]
+    predicted[:, 0] = matrix[:, 0] + matrix[:, 1]
+    predicted[:, 1:] = ar * matrix[:, 1:2]
+    predicted[:, 1:-1] += matrix[:, 2:]
+    return predicted
+
+
+def _converged(cov, previous):
+    # Series whose state covariance changed by less than STEADY_STATE_TOLERANCE (relative), separately for the
+    # value (real part) and the complex-step derivative (imaginary part, relative to the step where it vanishes)
+    change = np.max(np.abs(cov.real - previous.real), axis=(1, 2))
+    scale = np.max(np.abs(cov.real), axis=(1, 2))
+    converged = change <= STEADY_STATE_TOLERANCE * scale
+    if np.iscomplexobj(cov):
+        change = np.max(np.abs(cov.imag - previous.imag), axis=(1, 2))
+        converged &= change <= STEADY_STATE_TOLERANCE * (np.max(np.abs(cov.imag), axis=(1, 2)) + COMPLEX_STEP * scale)
+    return converged
+
+
+def batch_loglike(params, endog, order, enforce_stationarity=True, enforce_invertibility=True):
+    """
+    Log-likelihood of ARIMA(p, 1, q) for a batch of same-length series, with one vectorized Kalman filter.
+
+    Matches ARIMA(endog, order, enforce_stationarity=..., enforce_invertibility=...).loglike(params): the level
+    starts approximately diffuse; the ARMA block starts at its stationary distribution when stationarity is
+    enforced, approximately diffuse (with the first m observations left out of the likelihood) otherwise.
+    Missing values (NaN) are skipped, as in statsmodels. Complex parameters are supported (complex-step
+    derivatives).
+
+    Parameters:
+    - params: np.ndarray, (n_series, k) AR, MA and sigma2 parameters.
+    - endog: np.ndarray, (n_series, n_obs) series.
+    - order: tuple, (p, 1, q) order.
+    - enforce_stationarity, enforce_invertibility: bool, as for statsmodels' ARIMA.
+
+    Returns:
+    - np.ndarray: (n_series,) log-likelihoods.
+    """
+    params = np.atleast_2d(params)
+    endog = np.atleast_2d(np.asarray(endog, dtype=float))
+    transition, selection, sigma2 = state_space(params, order)
+    n_series, m, _ = transition.shape
+    burn = 1 if enforce_stationarity else m
+    ar = transition[:, 1:, 1]
+    missing = np.isnan(endog)
+    any_missing = missing.any()
+
+    selected_cov = selection[:, :, None] * selection[:, None, :] * sigma2[:, None, None]
+    state = np.zeros((n_series, m), dtype=params.dtype)
+    cov = _initial_state_cov(transition, selection, sigma2, enforce_stationarity)
+    llf = np.zeros(n_series, dtype=params.dtype)
+    f = np.empty(n_series, dtype=params.dtype)
+    gain = np.empty((n_series, m), dtype=params.dtype)
+    # Series whose covariance is still being updated; once it has converged the gain is constant and only the
+    # state recursion is left, as in statsmodels' steady-state filter (never for series with missing values)
+    live = np.arange(n_series)
+    can_settle = ~missing.any(axis=1)
+    live_ar, live_selected_cov = ar, selected_cov
+    with np.errstate(all='ignore'):
+        for t in range(endog.shape[1]):
+            if len(live):
+                # Design [1, 1, 0, ...]: the observation is the level plus the first ARMA state
+                cov_z = cov[:, :, 0] + cov[:, :, 1]
+                f[live] = cov_z[:, 0] + cov_z[:, 1]
+                gain[live] = cov_z / f[live, None]
+            v = endog[:, t] - state[:, 0] - state[:, 1]
+            step_gain = gain
+            if any_missing:
+                observed = ~missing[:, t]
+                step_gain = np.where(observed[:, None], gain, 0)
+                v = np.where(observed, v, 0)
+                if t >= burn:
+                    llf += np.where(observed, -0.5 * (np.log(2 * np.pi * f) + v ** 2 / f), 0)
+            elif t >= burn:
+                llf -= 0.5 * (np.log(2 * np.pi * f) + v ** 2 / f)
+            state = _predict(state + step_gain * v[:, None], ar)
+            if not len(live):
+                continue
+
+            predicted = cov - step_gain[live, :, None] * cov_z[:, None, :]
+            # T P T' = T (T P)' for symmetric P
+            predicted = _predict(np.swapaxes(_predict(predicted, live_ar), 1, 2), live_ar) + live_selected_cov
+            predicted = 0.5 * (predicted + np.swapaxes(predicted, 1, 2))
+            if t >= burn:
+                settled = can_settle[live] & _converged(predicted, cov)
+                if settled.any():
+                    keep = ~settled
+                    live, predicted = live[keep], predicted[keep]
+                    live_ar, live_selected_cov = live_ar[keep], live_selected_cov[keep]
+            cov = predicted
+    return llf
+
+
+def _complex_step(func, x):
+    # Gradient of a batched scalar function along every parameter, one complex-step evaluation per parameter
+    n_series, k = x.shape
+    steps = np.repeat(x[:, None, :].astype(complex), k, axis=1)
+    steps[:, np.arange(k), np.arange(k)] += COMPLEX_STEP * 1j
+    return func(steps.reshape(n_series * k, k), np.repeat(np.arange(n_series), k)).imag.reshape(n_series, k) \
+        / COMPLEX_STEP
+
+
+def batch_score(params, endog, order, enforce_stationarity=True, enforce_invertibility=True):
+    """
+    Gradient of batch_loglike() with respect to the AR, MA and sigma2 parameters, by complex-step
+    differentiation of the vectorized filter (arguments are the same).
+
+    Returns:
+    - np.ndarray: (n_series, k) gradients.
+    """
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    endog = np.atleast_2d(np.asarray(endog, dtype=float))
+    return _complex_step(lambda x, rows: batch_loglike(x, endog[rows], order, enforce_stationarity,
+                                                       enforce_invertibility), params)
+
+
+def _lags(values, first, lags):
+    # (n_series, n_rows, lags) regressor matrix: column j - 1 holds values lagged j periods, rows from first on
+    n = values.shape[1]
+    return np.stack([values[:, first - j:n - j] for j in range(1, lags + 1)], axis=-1)
+
+
+def _least_squares(regressors, target):
+    # Batched OLS: (n_series, n_rows, k) regressors, (n_series, n_rows) target -> coefficients and residuals
+    coefficients = np.einsum('bkn,bn->bk', np.linalg.pinv(regressors), target)
+    return coefficients, target - np.einsum('bnk,bk->bn', regressors, coefficients)
+
+
+def batch_start_params(endog, order, enforce_stationarity=True, enforce_invertibility=True):
+    """
+    Starting parameters for every series of a batch with statsmodels' conditional sum of squares method
+    (SARIMAX.start_params), vectorized over series: an AR(2q) regression on the differenced series supplies
+    residuals for the MA lags of a second regression. AR (MA) starts that are not stationary (invertible) while
+    that is enforced are reset to zero, as statsmodels does.
+
+    Parameters:
+    - endog: np.ndarray, (n_series, n_obs) series.
+    - order: tuple, (p, 1, q) order.
+    - enforce_stationarity, enforce_invertibility: bool, as for statsmodels' ARIMA.
+
+    Returns:
+    - np.ndarray: (n_series, k) AR, MA and sigma2 parameters.
+    """
+    p, q = _check_order(order)
+    endog = np.atleast_2d(np.asarray(endog, dtype=float))
+    if np.isnan(endog).any():
+        # Conditional sum of squares needs complete series: estimate those with gaps one by one
+        return np.vstack([batch_start_params(series[None, ~np.isnan(series)], order, enforce_stationarity,
+                                             enforce_invertibility) for series in endog])
+
+    diffed = np.diff(endog, axis=1)
+    n_series, n = diffed.shape
+    k, r = 2 * q, max(3 * q, p)
+    starts = np.zeros((n_series, p + q + 1))
+    if p + q == 0:
+        starts[:, -1] = np.sum(diffed ** 2, axis=1) / endog.shape[1]
+    elif n - r > p + q:
+        regressors = []
+        if p:
+            regressors.append(_lags(diffed, r, p))
+        if q:
+            _, residuals = _least_squares(_lags(diffed, k, k), diffed[:, k:])
+            regressors.append(_lags(residuals, r - k, q))
+        starts[:, :-1], residuals = _least_squares(np.concatenate(regressors, axis=-1), diffed[:, r:])
+        starts[:, -1] = np.mean(residuals[:, q:] ** 2, axis=1)
+    else:
+        # Too few observations for the regressions: zero ARMA parameters, as statsmodels does
+        starts[:, -1] = np.var(diffed, axis=1)
+    starts[:, -1] = np.maximum(starts[:, -1], 1e-10)
+
+    for i in range(n_series):
+        if p and enforce_stationarity and np.any(np.abs(np.roots(np.r_[1, -starts[i, :p]])) >= 1):
+            starts[i, :p] = 0
+        if q and enforce_invertibility and np.any(np.abs(np.roots(np.r_[1, starts[i, p:p + q]])) >= 1):
+            starts[i, p:p + q] = 0
+    return starts
+
+
+def fit_batch(endog, order, start_params=None, maxiter=50, enforce_stationarity=True, enforce_invertibility=True):
+    """
+    Maximum likelihood estimates of ARIMA(p, 1, q) for a batch of same-length series at once.
+
+    A BFGS optimizer runs on every series in lockstep (one vectorized likelihood and complex-step gradient
+    evaluation per iteration for the whole batch) in statsmodels' unconstrained parameterization, with the
+    stopping rules of its default L-BFGS fit. Series stop independently once converged.
+
+    Parameters:
+    - endog: np.ndarray, (n_series, n_obs) series.
+    - order: tuple, (p, 1, q) order.
+    - start_params: np.ndarray, (n_series, k) starting parameters. None uses batch_start_params().
+    - maxiter: int, maximum number of optimizer iterations (statsmodels' default is 50).
+    - enforce_stationarity, enforce_invertibility: bool, as for statsmodels' ARIMA.
+
+    Returns:
+    - dict: params (n_series, k), param_names, llf, aic, bic, hqic, nobs, iterations and converged arrays.
+    """
+    endog = np.atleast_2d(np.asarray(endog, dtype=float))
+    if start_params is None:
+        start_params = batch_start_params(endog, order, enforce_stationarity, enforce_invertibility)
+    n_series, n_obs = endog.shape
+    n_effective = (~np.isnan(endog)).sum(axis=1) - (1 if enforce_stationarity else max(order[0], order[2] + 1) + 1)
+
+    def objective(x, rows):
+        params = transform_params(x, order, enforce_stationarity, enforce_invertibility)
+        llf = batch_loglike(params, endog[rows], order, enforce_stationarity, enforce_invertibility)
+        return -llf / n_obs
+
+    def gradient(x, rows):
+        return _complex_step(lambda steps, sub: objective(steps, rows[sub]), x)
+
+    x = untransform_params(np.asarray(start_params, dtype=float), order, enforce_stationarity,
+                           enforce_invertibility)
+    rows = np.arange(n_series)
+    f = objective(x, rows).real
+    g = gradient(x, rows)
+    k = x.shape[1]
+    inverse_hessian = np.repeat(np.eye(k)[None], n_series, axis=0)
+    iterations = np.zeros(n_series, dtype=int)
+    converged = np.max(np.abs(g), axis=1) <= GTOL
+    active = np.isfinite(f) & np.all(np.isfinite(g), axis=1) & ~converged
+
+    for _ in range(maxiter):
+        rows = np.flatnonzero(active)
+        if not len(rows):
+            break
+        direction = -np.einsum('bij,bj->bi', inverse_hessian[rows], g[rows])
+        slope = np.sum(g[rows] * direction, axis=1)
+        # Fall back to steepest descent where the quasi-Newton direction is not a descent direction
+        uphill = ~(slope < 0)
+        direction[uphill] = -g[rows][uphill]
+        slope[uphill] = -np.sum(g[rows][uphill] ** 2, axis=1)
+        first = iterations[rows] == 0
+        direction[first] /= np.maximum(1, np.linalg.norm(direction[first], axis=1))[:, None]
+        slope[first] = np.sum(g[rows][first] * direction[first], axis=1)
+
+        # Backtracking (Armijo) line search, vectorized over the series still searching
+        step = np.ones(len(rows))
+        accepted = np.zeros(len(rows), dtype=bool)
+        f_new = f[rows].copy()
+        for _ in range(30):
+            todo = np.flatnonzero(~accepted)
+            if not len(todo):
+                break
+            trial = objective(x[rows[todo]] + step[todo, None] * direction[todo], rows[todo]).real
+            ok = np.isfinite(trial) & (trial <= f[rows[todo]] + 1e-4 * step[todo] * slope[todo])
+            accepted[todo[ok]] = True
+            f_new[todo[ok]] = trial[ok]
+            step[todo[~ok]] *= 0.5
+
+        # Series whose line search failed cannot make progress: stop them unconverged
+        active[rows[~accepted]] = False
+        rows, step, direction, f_new = rows[accepted], step[accepted], direction[accepted], f_new[accepted]
+        if not len(rows):
+            break
+        s = step[:, None] * direction
+        x_new = x[rows] + s
+        g_new = gradient(x_new, rows)
+        y = g_new - g[rows]
+        sy = np.sum(s * y, axis=1)
+
+        # BFGS update of the inverse Hessian, skipped where the curvature condition fails
+        update = sy > 1e-10
+        h = inverse_hessian[rows]
+        first = (iterations[rows] == 0) & update
+        h[first] = (sy[first] / np.sum(y[first] ** 2, axis=1))[:, None, None] * np.eye(k)
+        rho = np.where(update, 1 / np.where(update, sy, 1), 0)
+        left = np.eye(k) - rho[:, None, None] * s[:, :, None] * y[:, None, :]
+        updated = left @ h @ np.swapaxes(left, 1, 2) + rho[:, None, None] * s[:, :, None] * s[:, None, :]
+        inverse_hessian[rows] = np.where(update[:, None, None], updated, h)
+
+        reduction = (f[rows] - f_new) / np.maximum(np.maximum(np.abs(f[rows]), np.abs(f_new)), 1)
+        x[rows], f[rows], g[rows] = x_new, f_new, g_new
+        iterations[rows] += 1
+        done = (np.max(np.abs(g_new), axis=1) <= GTOL) | (reduction <= FTOL)
+        converged[rows[done]] = True
+        active[rows[done]] = False
+
+    params = transform_params(x, order, enforce_stationarity, enforce_invertibility)
+    llf = batch_loglike(params, endog, order, enforce_stationarity, enforce_invertibility)
+    k_params = params.shape[1]
+    return {
+        'params': params,
+        'param_names': param_names(order),
+        'llf': llf,
+        'aic': -2 * llf + 2 * k_params,
+        'bic': -2 * llf + np.log(n_effective) * k_params,
+        'hqic': -2 * llf + 2 * np.log(np.log(n_effective)) * k_params,
+        'nobs': np.full(n_series, n_obs),
+        'iterations': iterations,
+        'converged': converged,
+    }
+
+
+def _panel_frame(panel):
+    frame = pd.DataFrame(dict(panel)) if isinstance(panel, dict) else panel
+    return frame, frame.to_numpy(dtype=float).T
+
+
+def batch_search_orders(panel, pdq, n_splits=5, full_fit=True, model_kwargs=None, maxiter=50):
+    """
+    Order search for every series of a same-index panel with the batched engine: each (order, fold) is
+    estimated for all series in one fit_batch() call. Drop-in for search_orders on each series.
+
+    Parameters:
+    - panel: pd.DataFrame (one column per series, shared index) or dict of name -> pd.Series.
+    - pdq: list, candidate (p, 1, q) orders.
+    - n_splits: int, number of TimeSeriesSplit folds for the CV AIC. 0 skips cross-validation.
+    - full_fit: bool, whether to fit each order on the full series for AIC/BIC.
+    - model_kwargs: dict, enforce_stationarity / enforce_invertibility. None uses order_search.MODEL_KWARGS.
+    - maxiter: int, maximum number of optimizer iterations per fit.
+
+    Returns:
+    - dict: series name -> pd.DataFrame with the columns of search_orders (order, aic, bic, cv_aic, n_fits,
+      status and error).
+    """
+    model_kwargs = MODEL_KWARGS if model_kwargs is None else model_kwargs
+    frame, endog = _panel_frame(panel)
+    samples = [(None, slice(None))] if full_fit else []
+    if n_splits:
+        samples += [(fold, train_index) for fold, (train_index, _) in
+                    enumerate(TimeSeriesSplit(n_splits=n_splits).split(frame))]
+
+    fits = {name: [] for name in frame.columns}
+    for order in pdq:
+        for fold, rows in samples:
+            try:
+                result = fit_batch(endog[:, rows], order, maxiter=maxiter, **model_kwargs)
+            except Exception as e:
+                for name in frame.columns:
+                    fits[name].append({'order': order, 'fold': fold, 'aic': np.nan, 'bic': np.nan,
+                                       'status': 'failed', 'error': str(e)})
+                continue
+            for i, name in enumerate(frame.columns):
+                usable = np.isfinite(result['aic'][i])
+                fits[name].append({'order': order, 'fold': fold, 'aic': result['aic'][i], 'bic': result['bic'][i],
+                                   'status': fit_status(bool(result['converged'][i])) if usable else 'failed',
+                                   'error': None if usable else 'non-finite log-likelihood'})
+    return {name: order_table(pdq, name_fits) for name, name_fits in fits.items()}
+
+
+def batch_fit_models(panel, order, model_kwargs=None, maxiter=50, low_memory=False):
+    """
+    Estimate one order on every series of a same-index panel with the batched engine and return statsmodels
+    results at the estimates, as a drop-in for ARIMA(series, order=order).fit() on each series.
+
+    The results come from running each statsmodels model through the Kalman filter (low_memory) or smoother
+    at the batched parameters, as for a fit cache hit: no per-series likelihood optimisation runs.
+
+    Parameters:
+    - panel: pd.DataFrame (one column per series, shared index) or dict of name -> pd.Series.
+    - order: tuple, (p, 1, q) order.
+    - model_kwargs: dict, extra ARIMA arguments (enforce_stationarity / enforce_invertibility).
+    - maxiter: int, maximum number of optimizer iterations.
+    - low_memory: bool, filter with low_memory instead of smoothing (see fit_cache.fit_model).
+
+    Returns:
+    - dict: series name -> statsmodels ARIMA results.
+    """
+    model_kwargs = model_kwargs or {}
+    frame, endog = _panel_frame(panel)
+    estimates = fit_batch(endog, order, maxiter=maxiter,
+                          enforce_stationarity=model_kwargs.get('enforce_stationarity', True),
+                          enforce_invertibility=model_kwargs.get('enforce_invertibility', True))
+    results = {}
+    for i, name in enumerate(frame.columns):
+        model = sm.tsa.ARIMA(frame[name], order=order, **model_kwargs)
+        if low_memory:
+            results[name] = model.filter(estimates['params'][i], low_memory=True)
+        else:
+            results[name] = model.smooth(estimates['params'][i])
+    return results
@@ -0,0 +1,252 @@
+# Standard library imports
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+# Third-party imports for data handling
+import numpy as np
+import pandas as pd
+
+# Third-party imports for statistical modeling
+import statsmodels
+import ruptures as rpt
+
+# Local imports
+from backtest import recursive_forecast_tss
+from fit_cache import fit_model
+from order_search import make_pdq, search_orders
+from structural_breaks import penalty_path
+
+# Series lengths benchmarked by default: from the current ~330 monthly points up to 100k points
+DEFAULT_SIZES = [330, 1000, 10_000, 100_000]
+
+# Largest series length each stage is run on by default, so a full run finishes in reasonable time
+STAGE_MAX_SIZE = {
+    'order_grid': 10_000,
+    'tss_cv': 10_000,
+    'recursive_forecast': 5_000,
+    'pelt': 100_000,
+    'pelt_path': 10_000,
+    'arimax': 100_000,
+}
+
+# Workload of each stage, kept fixed so runs are comparable with the baseline
+BENCH_CONFIG = {
+    'pdq': make_pdq(range(0, 3), 1, range(0, 7)),
+    'n_splits': 5,
+    'order': (2, 1, 2),
+    'forecast_horizon': 6,
+    'n_origins': 24,
+    'backtest_mode': 'refit',
+    'pelt_pen': 10,
+    'pelt_pen_range': (1, 100),
+    'n_breaks': 5,
+    'seed': 0,
+}
+
+# Monthly dates run out of the pandas Timestamp range beyond this length; longer series use a RangeIndex
+MAX_DATED_SIZE = 6_000
+
+
+def make_series(n, n_breaks=5, seed=0):
+    """
+    Generate a synthetic ARIMA(1,1,1) series with level shifts at known positions.
+
+    Parameters:
+    - n: int, number of observations.
+    - n_breaks: int, number of level shifts, spread roughly evenly over the series.
+    - seed: int, random seed.
+
+    Returns:
+    - tuple: (pd.Series with a monthly DatetimeIndex, or a RangeIndex for very long series,
+      list of break positions).
+    """
+    rng = np.random.default_rng(seed)
+    shocks = rng.normal(0, 0.3, n + 1)
+    diff = np.empty(n)
+    previous = 0.0
+    for t in range(n):
+        previous = 0.5 * previous + shocks[t + 1] + 0.3 * shocks[t]
+        diff[t] = previous
+    values = 3 + 0.1 * np.cumsum(diff)
+
+    spacing = n // (n_breaks + 1)
+    breaks = spacing * np.arange(1, n_breaks + 1) + rng.integers(-spacing // 4, spacing // 4 + 1, n_breaks)
+    for position in breaks:
+        values[position:] += rng.choice([-1, 1]) * rng.uniform(1, 3)
+
+    if n <= MAX_DATED_SIZE:
+        index = pd.date_range('1700-01-01', periods=n, freq='MS')
+    else:
+        index = pd.RangeIndex(n)
+    return pd.Series(values, index=index, name='Rate'), [int(b) for b in breaks]
+
+
+def _stage_order_grid(series, breaks, config, workers):
+    search_orders(series, config['pdq'], n_splits=0, workers=workers)
+
+
+def _stage_tss_cv(series, breaks, config, workers):
+    search_orders(series, config['pdq'], n_splits=config['n_splits'], full_fit=False, workers=workers)
+
+
+def _stage_recursive_forecast(series, breaks, config, workers):
+    horizon = config['forecast_horizon']
+    start_date = series.index[-config['n_origins'] - horizon]
+    end_date = series.index[-horizon - 1]
+    # recursive_forecast_tss prints the last model summary; keep it out of the benchmark output
+    with contextlib.redirect_stdout(io.StringIO()):
+        recursive_forecast_tss(series, start_date, end_date, horizon, config['order'], mode=config['backtest_mode'])
+
+
+def _stage_pelt(series, breaks, config, workers):
+    rpt.Pelt(model="l1").fit(series.values).predict(pen=config['pelt_pen'])
+
+
+def _stage_pelt_path(series, breaks, config, workers):
+    penalty_path(series.values, *config['pelt_pen_range'])
+
+
+def _stage_arimax(series, breaks, config, workers):
+    positions = np.arange(len(series))
+    exog = pd.DataFrame({f'break_{i + 1}': (positions >= b).astype(int) for i, b in enumerate(breaks)},
+                        index=series.index)
+    fit_model(series, config['order'], exog=exog)
+
+
+STAGES = {
+    'order_grid': _stage_order_grid,
+    'tss_cv': _stage_tss_cv,
+    'recursive_forecast': _stage_recursive_forecast,
+    'pelt': _stage_pelt,
+    'pelt_path': _stage_pelt_path,
+    'arimax': _stage_arimax,
+}
+
+
+def run_benchmarks(sizes=None, stages=None, repeats=1, workers=1, stage_max_size=None, config=None):
+    """
+    Time every stage of the modelling pipeline on synthetic series of the given sizes.
+
+    Parameters:
+    - sizes: list, series lengths. Defaults to DEFAULT_SIZES.
+    - stages: list, stage names (keys of STAGES). Defaults to all stages.
+    - repeats: int, runs per (stage, size); the fastest is kept.
+    - workers: int, worker processes for the order grid stages. The default of 1 keeps the
+      memory measurement in-process.
+    - stage_max_size: dict, overrides for STAGE_MAX_SIZE.
+    - config: dict, overrides for BENCH_CONFIG.
+
+    Returns:
+    - pd.DataFrame: one row per (stage, size) with seconds, observations per second, peak traced
+      memory in MB and status ('ok', 'skipped' or 'failed').
+    """
+    sizes = sizes or DEFAULT_SIZES
+    stages = stages or list(STAGES)
+    stage_max_size = dict(STAGE_MAX_SIZE, **(stage_max_size or {}))
+    config = dict(BENCH_CONFIG, **(config or {}))
+
+    rows = []
+    for size in sizes:
+        series, breaks = make_series(size, config['n_breaks'], config['seed'])
+        for stage in stages:
+            row = {'stage': stage, 'size': size, 'seconds': np.nan, 'obs_per_second': np.nan,
+                   'peak_mb': np.nan, 'status': 'ok', 'error': None}
+            if size > stage_max_size[stage]:
+                row['status'] = 'skipped'
+            elif stage == 'recursive_forecast' and not isinstance(series.index, pd.DatetimeIndex):
+                row['status'] = 'skipped'
+            else:
+                try:
+                    seconds = []
+                    peaks = []
+                    for _ in range(repeats):
+                        tracemalloc.start()
+                        start = time.perf_counter()
+                        STAGES[stage](series, breaks, config, workers)
+                        seconds.append(time.perf_counter() - start)
+                        peaks.append(tracemalloc.get_traced_memory()[1] / 1024 ** 2)
+                        tracemalloc.stop()
+                    row['seconds'] = min(seconds)
+                    row['obs_per_second'] = size / row['seconds']
+                    row['peak_mb'] = max(peaks)
+                except Exception as e:
+                    tracemalloc.stop()
+                    row['status'] = 'failed'
+                    row['error'] = f'{type(e).__name__}: {e}'
+            print(f"{stage:>20} n={size:>7}: {row['status']:>7} {row['seconds']:10.3f}s {row['peak_mb']:10.1f}MB",
+                  flush=True)
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def save_baseline(results, path, config=None):
+    """
+    Write benchmark results and the environment they were measured in to a JSON baseline file.
+    """
+    baseline = {
+        'environment': {'python': sys.version.split()[0], 'platform': platform.platform(),
+                        'numpy': np.__version__, 'pandas': pd.__version__, 'statsmodels': statsmodels.__version__},
+        'config': {key: str(value) for key, value in dict(BENCH_CONFIG, **(config or {})).items()},
+        'results': json.loads(results.to_json(orient='records')),
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+
+
+def compare_to_baseline(results, path, time_tolerance=0.25, memory_tolerance=0.25, min_seconds=0.1, min_mb=1.0):
+    """
+    Compare benchmark results with a baseline file.
+
+    A (stage, size) regresses when it is slower or uses more peak memory than the baseline by more than
+    the given relative tolerance, or when it failed now but ran in the baseline. Differences below
+    min_seconds and min_mb are treated as measurement noise.
+
+    Returns:
+    - pd.DataFrame: baseline and current seconds/peak_mb, their ratios and a regression flag.
+    """
+    with open(path) as f:
+        baseline = pd.DataFrame(json.load(f)['results'])
+    merged = results.merge(baseline, on=['stage', 'size'], suffixes=('', '_baseline'))
+    merged = merged[merged['status_baseline'] == 'ok']
+    merged['time_ratio'] = merged['seconds'] / merged['seconds_baseline']
+    merged['memory_ratio'] = merged['peak_mb'] / merged['peak_mb_baseline']
+    merged['regression'] = ((merged['status'] == 'failed')
+                            | ((merged['time_ratio'] > 1 + time_tolerance)
+                               & (merged['seconds'] - merged['seconds_baseline'] > min_seconds))
+                            | ((merged['memory_ratio'] > 1 + memory_tolerance)
+                               & (merged['peak_mb'] - merged['peak_mb_baseline'] > min_mb)))
+    return merged[['stage', 'size', 'seconds_baseline', 'seconds', 'time_ratio', 'peak_mb_baseline', 'peak_mb',
+                   'memory_ratio', 'regression']]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the modelling pipeline on synthetic series.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='series lengths')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES), help='stages to run')
+    parser.add_argument('--repeats', type=int, default=1, help='runs per stage and size (fastest is kept)')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes for the order grid stages')
+    parser.add_argument('--max-size', nargs='+', default=[], metavar='STAGE=SIZE',
+                        help='override the largest size a stage is run on, e.g. pelt=20000')
+    parser.add_argument('--save-baseline', metavar='PATH', help='write the results as a new baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare the results against a baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown / memory growth')
+    args = parser.parse_args()
+
+    overrides = {stage: int(size) for stage, size in (item.split('=') for item in args.max_size)}
+    results = run_benchmarks(args.sizes, args.stages, args.repeats, args.workers, overrides)
+
+    if args.save_baseline:
+        save_baseline(results, args.save_baseline)
+        print(f'Baseline written to {args.save_baseline}')
+    if args.compare:
+        comparison = compare_to_baseline(results, args.compare, args.tolerance, args.tolerance)
+        print(comparison.to_string(index=False))
+        if comparison['regression'].any():
+            print('Performance regression detected')
+            sys.exit(1)
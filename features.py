@@ -0,0 +1,220 @@
+# Third-party imports for data handling
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.fft import next_fast_len, rfft, irfft, rfftfreq
+
+# Default settings of the feature extraction, matching the single-series plots
+FEATURE_CONFIG = {
+    'nlags': 20,
+    'window': 12,
+    'season': 12,
+    'max_p': 5,
+    'max_q': 5,
+}
+
+
+def panel_matrix(panel, d=0):
+    """
+    Stack a panel of series into a (n_series, n_obs) array, each row starting at the series' first observation.
+
+    The ACF, PACF and periodogram do not depend on where a series starts, so left-aligning the rows lets series
+    of different spans share one array; shorter rows are padded with NaN at the end.
+
+    Parameters:
+    - panel: pd.Series long-format panel indexed by (geo, coicop, Date) as returned by read_hicp_panel, or a
+      pd.DataFrame with one column per series.
+    - d: int, order of differencing applied to every series.
+
+    Returns:
+    - tuple: (list of series keys, np.ndarray values, np.ndarray number of observations per series).
+    """
+    if isinstance(panel, pd.Series):
+        panel = panel.unstack(['geo', 'coicop']).sort_index()
+    keys = list(panel.columns)
+    values = panel.to_numpy(dtype=float).T
+    if d:
+        values = np.diff(values, n=d, axis=1)
+
+    rows = np.full(values.shape, np.nan)
+    n_obs = np.zeros(len(keys), dtype=int)
+    for i, row in enumerate(values):
+        valid = np.flatnonzero(~np.isnan(row))
+        if len(valid):
+            span = row[valid[0]:valid[-1] + 1]
+            rows[i, :len(span)] = span
+            n_obs[i] = len(span)
+    return keys, rows, n_obs
+
+
+def _centred(values):
+    # Demean each row and zero the padding, so that it drops out of the FFT products
+    centred = values - np.nanmean(values, axis=1, keepdims=True)
+    return np.nan_to_num(centred, nan=0.0)
+
+
+def panel_acf(values, n_obs, nlags=20):
+    """
+    Autocorrelations of every row of a panel array at once, via the FFT.
+
+    Matches statsmodels' acf(x, nlags, fft=True) for rows without interior gaps.
+
+    Parameters:
+    - values: np.ndarray, (n_series, n_obs) panel array from panel_matrix().
+    - n_obs: np.ndarray, number of observations per row.
+    - nlags: int, number of lags.
+
+    Returns:
+    - np.ndarray: (n_series, nlags + 1) autocorrelations, lag 0 first.
+    """
+    centred = _centred(values)
+    n_fft = next_fast_len(2 * centred.shape[1] - 1, real=True)
+    spectrum = rfft(centred, n=n_fft, axis=1)
+    acov = irfft(spectrum.real ** 2 + spectrum.imag ** 2, n=n_fft, axis=1)[:, :nlags + 1]
+    acov /= np.maximum(n_obs, 1)[:, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return acov / acov[:, :1]
+
+
+def panel_pacf(acf):
+    """
+    Partial autocorrelations of every row from its autocorrelations, with a Levinson-Durbin recursion
+    vectorized across series (the Yule-Walker estimate, method='ywm' in statsmodels).
+
+    Parameters:
+    - acf: np.ndarray, (n_series, nlags + 1) autocorrelations from panel_acf().
+
+    Returns:
+    - np.ndarray: (n_series, nlags + 1) partial autocorrelations, lag 0 first.
+    """
+    n_series, n_lags = acf.shape
+    pacf = np.ones((n_series, n_lags))
+    phi = np.zeros((n_series, n_lags))
+    sigma = np.ones(n_series)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for k in range(1, n_lags):
+            reflection = (acf[:, k] - np.sum(phi[:, 1:k] * acf[:, k - 1:0:-1], axis=1)) / sigma
+            phi[:, 1:k] = phi[:, 1:k] - reflection[:, None] * phi[:, k - 1:0:-1]
+            phi[:, k] = reflection
+            sigma = sigma * (1 - reflection ** 2)
+            pacf[:, k] = reflection
+    return pacf
+
+
+def panel_periodogram(values, n_obs, fs=1.0):
+    """
+    One-sided periodogram (power spectral density) of every row of a panel array, via the FFT.
+
+    Matches scipy.signal.periodogram(x, fs) for full-length rows; shorter rows are zero-padded to the panel
+    length, which evaluates their spectrum on the panel's (finer) frequency grid.
+
+    Parameters:
+    - values: np.ndarray, (n_series, n_obs) panel array from panel_matrix().
+    - n_obs: np.ndarray, number of observations per row.
+    - fs: float, sampling frequency.
+
+    Returns:
+    - tuple: (np.ndarray frequencies, np.ndarray (n_series, n_frequencies) power).
+    """
+    n = values.shape[1]
+    spectrum = rfft(_centred(values), axis=1)
+    power = (spectrum.real ** 2 + spectrum.imag ** 2) / (fs * np.maximum(n_obs, 1)[:, None])
+    # Fold the negative frequencies in, except for the DC and (even n) Nyquist terms
+    power[:, 1:n // 2 + n % 2] *= 2
+    return rfftfreq(n, d=1 / fs), power
+
+
+def rolling_stats(values, window=12):
+    """
+    Rolling mean and standard deviation of every row of a panel array, like pd.Series.rolling(window).
+
+    Parameters:
+    - values: np.ndarray, (n_series, n_obs) panel array.
+    - window: int, window length; the first window - 1 values of each row are NaN.
+
+    Returns:
+    - tuple: (np.ndarray rolling mean, np.ndarray rolling standard deviation), both shaped like values.
+    """
+    mean = np.full(values.shape, np.nan)
+    std = np.full(values.shape, np.nan)
+    if values.shape[1] >= window:
+        windows = sliding_window_view(values, window, axis=1)
+        mean[:, window - 1:] = windows.mean(axis=-1)
+        std[:, window - 1:] = windows.std(axis=-1, ddof=1)
+    return mean, std
+
+
+def _last_significant(coefficients, band, max_lag):
+    # Highest lag in 1..max_lag whose coefficient lies outside the band, 0 if none does
+    outside = np.abs(coefficients[:, 1:max_lag + 1]) > band[:, None]
+    lags = np.arange(1, outside.shape[1] + 1)
+    return np.max(np.where(outside, lags, 0), axis=1, initial=0)
+
+
+def panel_features(panel, d=0, fs=1.0, config=None):
+    """
+    Extract ACF, PACF, periodogram peak, rolling statistics, candidate ARMA orders and a seasonality flag for
+    a whole panel of series with vectorized FFT operations, without plotting.
+
+    The candidate orders are the highest significant PACF lag (p) and ACF lag (q) within max_p and max_q, against
+    the 1.96 / sqrt(n) band. A series is flagged seasonal when its ACF has a significant local peak at the
+    seasonal lag.
+
+    Parameters:
+    - panel: pd.Series long-format panel or pd.DataFrame with one column per series (see panel_matrix()).
+    - d: int, order of differencing applied before the features are computed.
+    - fs: float, sampling frequency of the periodogram.
+    - config: dict, overrides for FEATURE_CONFIG.
+
+    Returns:
+    - dict: arrays keyed by name: series, n_obs, acf, pacf, frequencies, power, peak_frequency, peak_power,
+      rolling_mean, rolling_std, ar_order, ma_order and seasonal. Rows follow the order of series.
+    """
+    config = dict(FEATURE_CONFIG, **(config or {}))
+    keys, values, n_obs = panel_matrix(panel, d)
+    nlags = max(config['nlags'], config['max_p'], config['max_q'], config['season'] + 1)
+
+    acf = panel_acf(values, n_obs, nlags)
+    pacf = panel_pacf(acf)
+    frequencies, power = panel_periodogram(values, n_obs, fs)
+    peak = np.argmax(power, axis=1)
+    rolling_mean, rolling_std = rolling_stats(values, config['window'])
+
+    band = 1.96 / np.sqrt(np.maximum(n_obs, 1))
+    season = config['season']
+    seasonal = ((acf[:, season] > band) & (acf[:, season] > acf[:, season - 1])
+                & (acf[:, season] > acf[:, season + 1]))
+
+    return {
+        'series': np.asarray(keys, dtype=str),
+        'n_obs': n_obs,
+        'acf': acf,
+        'pacf': pacf,
+        'frequencies': frequencies,
+        'power': power,
+        'peak_frequency': frequencies[peak],
+        'peak_power': power[np.arange(len(keys)), peak],
+        'rolling_mean': rolling_mean,
+        'rolling_std': rolling_std,
+        'ar_order': _last_significant(pacf, band, config['max_p']),
+        'ma_order': _last_significant(acf, band, config['max_q']),
+        'seasonal': seasonal,
+    }
+
+
+def save_features(features, path):
+    """
+    Store the feature arrays of panel_features() in a compressed .npz file.
+    """
+    np.savez_compressed(path, **features)
+
+
+def load_features(path):
+    """
+    Load the feature arrays stored by save_features().
+
+    Returns:
+    - dict: arrays keyed by name, as returned by panel_features().
+    """
+    with np.load(path) as stored:
+        return {name: stored[name] for name in stored.files}
@@ -0,0 +1,308 @@
+# Standard library imports
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Third-party imports for data handling
+import numpy as np
+import pandas as pd
+
+# Third-party imports for plotting and visualization
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+from pandas.plotting import register_matplotlib_converters
+from scipy import stats
+from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
+import ruptures as rpt
+
+# Local imports
+from order_search import pool_context
+
+# 'show' opens every figure interactively, 'save' renders them headless into the output directory,
+# 'off' skips plotting entirely
+PLOT_MODES = ('show', 'save', 'off')
+
+
+class FigureRenderer:
+    """
+    Renders the diagnostic figures of the scripts, interactively or headless.
+
+    In 'save' mode the figures are drawn with the non-interactive Agg backend in a pool of worker processes
+    and written to directory, so rendering runs off the modelling critical path and never waits on a GUI
+    event loop. Call close() at the end of the run to wait for the pending figures.
+
+    Parameters:
+    - mode: str, one of PLOT_MODES.
+    - directory: str, output directory for 'save' mode.
+    - workers: int, number of rendering processes for 'save' mode.
+    - fmt: str, image format of the saved figures.
+    """
+
+    def __init__(self, mode='show', directory='visualisations', workers=2, fmt='jpg'):
+        if mode not in PLOT_MODES:
+            raise ValueError(f'mode must be one of {PLOT_MODES}, got {mode!r}')
+        self.mode = mode
+        self.directory = directory
+        self.fmt = fmt
+        self._pool = None
+        self._pending = []
+        if mode == 'save':
+            plt.switch_backend('Agg')
+            os.makedirs(directory, exist_ok=True)
+            self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=pool_context())
+
+    def render(self, name, plot_func, *args, **kwargs):
+        """
+        Draw a figure with plot_func(*args, **kwargs) and show it or save it as name.
+        """
+        if self.mode == 'off':
+            return
+        if self.mode == 'show':
+            plot_func(*args, **kwargs)
+            plt.show()
+            return
+        path = os.path.join(self.directory, f'{name}.{self.fmt}')
+        self._pending.append((name, self._pool.submit(render_to_file, path, plot_func, args, kwargs)))
+
+    def close(self):
+        """
+        Wait for the pending figures and report the ones that failed to render.
+
+        Returns:
+        - list: paths of the saved figures.
+        """
+        saved = []
+        for name, future in self._pending:
+            try:
+                saved.append(future.result())
+            except Exception as e:
+                print(f'Could not render figure {name}: {e}')
+        self._pending = []
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        return saved
+
+
+def render_to_file(path, plot_func, args, kwargs):
+    """
+    Worker entry point: draw a figure with the Agg backend and save it to path.
+    """
+    plt.switch_backend('Agg')
+    try:
+        plot_func(*args, **kwargs)
+        plt.savefig(path, bbox_inches='tight')
+    finally:
+        plt.close('all')
+    return path
+
+
+def plot_distribution(rate):
+    # Setting up the figure and axes for a 2x2 grid
+    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(nrows=2, ncols=2, figsize=(12, 10))
+
+    # Histogram
+    ax1.hist(rate, bins=30, alpha=0.75, color='blue')
+    ax1.set_title("Histogram of Rates")
+    ax1.set_xlabel("Rate")
+    ax1.set_ylabel("Frequency")
+
+    # Box Plot
+    ax2.boxplot(rate, vert=False)
+    ax2.set_title("Box Plot of Rates")
+    ax2.set_xlabel("Rate")
+
+    # Q-Q Plot
+    stats.probplot(rate, dist="norm", plot=ax3)
+    ax3.set_title("Q-Q Plot")
+
+    # Time Series Plot
+    dates = pd.date_range(start='1/1/2020', periods=len(rate), freq='D')
+    ax4.plot(dates, rate, marker='', linestyle='-', color='blue')
+    ax4.set_title("Time Series Plot of Rates")
+    ax4.set_xlabel("Date")
+    ax4.set_ylabel("Rate")
+
+    plt.tight_layout()  # Adjust layout to prevent overlap
+
+
+def plot_rolling_statistics(rate):
+    # Rolling mean and standard deviation
+    mean_rolling = rate.rolling(window=12).mean()
+    std_rolling = rate.rolling(window=12).std()
+
+    plt.figure(figsize=(12, 5))
+    plt.plot(rate.index, rate, label='Original')
+    plt.plot(mean_rolling.index, mean_rolling, color='crimson', label='Rolling Mean')
+    plt.plot(std_rolling.index, std_rolling, color='black', label='Rolling Std')
+    plt.title('Inflation Rates in Poland')
+    plt.grid(which='major', linestyle='--', alpha=0.5)
+
+    # Format the x-axis date labels
+    date_format = mdates.DateFormatter('%Y-%m-%d')
+    plt.gca().xaxis.set_major_formatter(date_format)
+    plt.legend(loc='best')
+
+    # Annotate the starting and ending points of the rolling mean
+    plt.annotate(f'{rate.index[0].strftime("%Y-%m-%d")}',
+                 xy=(rate.index[0], rate.iloc[0]),
+                 xytext=(rate.index[0], rate.iloc[0] + 2),
+                 arrowprops=dict(arrowstyle='->'))
+
+    plt.annotate(f'{rate.index[-1].strftime("%Y-%m-%d")}',
+                 xy=(rate.index[-1], rate.iloc[-1]),
+                 xytext=(rate.index[-1], rate.iloc[-1] + 2),
+                 arrowprops=dict(arrowstyle='->'))
+    plt.xticks(rotation=45)
+    plt.tight_layout()  # Adjust layout to prevent label cutoff
+
+
+def plot_decomposition(trend, seasonal, resid, observed):
+    fig, axes = plt.subplots(ncols=1, nrows=4, sharex=True, figsize=(12, 5))
+    fig.suptitle('Seasonal Decomposition')
+
+    trend.plot(ax=axes[0], legend=False)
+    axes[0].set_ylabel('Trend')
+    seasonal.plot(ax=axes[1], legend=False)
+    axes[1].set_ylabel('Seasonal')
+    resid.plot(ax=axes[2], legend=False)
+    axes[2].set_ylabel('Residual')
+    observed.plot(ax=axes[3], legend=False)
+    axes[3].set_ylabel('Original')
+
+
+def plot_acf_pacf(rate):
+    f, ax = plt.subplots(nrows=2, ncols=1, figsize=(12, 8))
+    plot_acf(rate, lags=20, ax=ax[0])
+    plot_pacf(rate, lags=20, ax=ax[1], method='ols')
+
+    ax[1].annotate('Strong correlation at lag = 1', xy=(1, 0.36), xycoords='data',
+                   xytext=(0.15, 0.7), textcoords='axes fraction',
+                   arrowprops=dict(color='red', shrink=0.05, width=1))
+
+    ax[1].annotate('Strong correlation at lag = 2', xy=(2.1, -0.5), xycoords='data',
+                   xytext=(0.25, 0.1), textcoords='axes fraction',
+                   arrowprops=dict(color='red', shrink=0.05, width=1))
+    plt.tight_layout()
+
+
+def plot_periodogram(frequencies, power):
+    # Plot the frequency vs. power periodogram for cyclic behavior
+    plt.figure()
+    plt.plot(frequencies, power)
+    plt.xlabel('Frequency')
+    plt.ylabel('Power')
+    plt.title('Frequency vs. Power Periodogram')
+
+
+def plot_transformation(diff_series):
+    # Register the converters for matplotlib
+    register_matplotlib_converters()
+
+    # Plot the transformed (differenced) series
+    fig = plt.figure(figsize=(16, 6))
+
+    ax1 = fig.add_subplot(1, 3, 1)
+    ax1.set_title('Transformed Series')
+    ax1.plot(diff_series, label='Differenced Series')
+    ax1.plot(diff_series.rolling(window=12).mean(), color='crimson', label='Rolling Mean')
+    ax1.plot(diff_series.rolling(window=12).std(), color='black', label='Rolling Std')
+    ax1.legend()
+
+    # Autocorrelation Plot
+    ax2 = fig.add_subplot(1, 3, 2)
+    plot_acf(diff_series, ax=ax2, lags=50, title='Autocorrelation')
+    ax2.axhline(y=-1.96 / np.sqrt(len(diff_series)), linestyle='--', color='gray')
+    ax2.axhline(y=1.96 / np.sqrt(len(diff_series)), linestyle='--', color='gray')
+    ax2.set_xlabel('Lags')
+
+    # Partial Autocorrelation Plot
+    ax3 = fig.add_subplot(1, 3, 3)
+    plot_pacf(diff_series, ax=ax3, lags=50, title="Partial Autocorrelation")
+    ax3.axhline(y=-1.96 / np.sqrt(len(diff_series)), linestyle='--', color='gray')
+    ax3.axhline(y=1.96 / np.sqrt(len(diff_series)), linestyle='--', color='gray')
+    ax3.set_xlabel('Lags')
+
+    plt.tight_layout()
+
+
+def plot_forecast(observed, forecast_values, forecast_ci, label='Forecast', title=None, color='green', alpha=0.2):
+    plt.figure(figsize=(12, 6))
+    plt.plot(observed.index, observed, label='Observed')
+    plt.plot(forecast_values.index, forecast_values, label=label)
+    plt.fill_between(forecast_ci.index,
+                     forecast_ci.iloc[:, 0],
+                     forecast_ci.iloc[:, 1], color=color, alpha=alpha)
+    plt.legend()
+    if title is not None:
+        plt.title(title)
+
+
+def plot_actual_vs_predicted(actual, predicted_mean, pred_ci):
+    # Plot the actual data and predictions
+    fig, ax = plt.subplots()
+    actual.plot(ax=ax)  # Actual data
+    predicted_mean.plot(ax=ax, style='r--')  # Predicted mean
+    ax.fill_between(pred_ci.index, pred_ci.iloc[:, 0], pred_ci.iloc[:, 1], color='pink',
+                    alpha=0.3)  # Confidence interval
+    ax.set_title('Inflation Rates in Poland: Actual vs Predicted')
+    ax.legend(['Actual', 'Predicted'])
+
+
+def plot_actual_fitted_predicted(actual, fitted, predicted_mean, pred_ci):
+    # Plot the actual data, fitted values, and predictions
+    fig, ax = plt.subplots(figsize=(14, 7))
+    actual.plot(ax=ax, label='Actual')
+    fitted.plot(ax=ax, color='red', label='Fitted')
+
+    # Predictions (as drawn by statsmodels' plot_predict)
+    predicted_mean.plot(ax=ax, label='forecast')
+    ax.fill_between(pred_ci.index, pred_ci.iloc[:, 0], pred_ci.iloc[:, 1], color='gray', alpha=0.5,
+                    label='95% confidence interval')
+    ax.set_title('Inflation Rates in Poland: Actual vs Fitted vs Predicted')
+    ax.legend(loc='best')
+
+
+def plot_residuals(residuals):
+    plt.figure(figsize=(14, 7))
+    plt.plot(residuals.index, residuals, label='Residuals')
+    plt.title('Residuals of the ARIMA Model')
+    plt.legend(loc='best')
+
+
+def plot_residual_density(residuals):
+    fig, ax = plt.subplots(figsize=(14, 7))
+    residuals.plot(kind='kde', ax=ax, title="Density of Residual Errors ")
+
+
+def plot_breakpoints(signal, breakpoints):
+    # Display results of the change point detection
+    rpt.display(signal, breakpoints)
+
+
+def plot_change_points(rate, change_points):
+    # Plot the time series
+    plt.figure(figsize=(14, 7))
+    plt.plot(rate.index, rate, label='Rate')
+
+    # Mark each change point with a vertical line
+    for cp in change_points:
+        plt.axvline(x=rate.index[cp], color='r', linestyle='--', label='Change Point' if cp == change_points[0] else "")
+
+    # Adding legend only once for Change Point
+    plt.legend()
+    plt.title('Time Series with Detected Change Points')
+
+
+def plot_penalty_path(path, penalty=None):
+    # Number of breaks of the optimal segmentation over the penalty range
+    plt.figure(figsize=(10, 5))
+    penalties = list(path['pen_min']) + [path['pen_max'].iloc[-1]]
+    n_breaks = list(path['n_breaks']) + [path['n_breaks'].iloc[-1]]
+    plt.step(penalties, n_breaks, where='post', label='Optimal segmentation')
+    plt.xscale('log')
+    if penalty is not None:
+        plt.axvline(x=penalty, color='r', linestyle='--', label=f'Penalty = {penalty}')
+    plt.xlabel('Penalty')
+    plt.ylabel('Number of breaks')
+    plt.title('PELT Breaks vs Penalty')
+    plt.legend()
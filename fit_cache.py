@@ -0,0 +1,274 @@
+# Standard library imports
+import hashlib
+import json
+import os
+
+# Third-party imports for data handling
+import numpy as np
+import pandas as pd
+
+# Third-party imports for statistical modeling
+import statsmodels
+import statsmodels.api as sm
+
+# Local imports
+from instrumentation import capture_warnings, deadline_callback, describe_warnings, fit_diagnostics
+from seeding import seed_start_params
+from serving import forecast_from_state, model_state
+
+
+class FitCache:
+    """
+    Content-addressed on-disk cache of fitted ARIMA/ARIMAX results.
+
+    Each entry is a small JSON file holding the estimated parameters and summary statistics of one fit,
+    named after a hash of the input series, order, exog matrix and model/fit options. The directory is
+    capped at max_bytes; the least recently used entries are evicted first.
+
+    Parameters:
+    - directory: str, where the entries are stored.
+    - max_bytes: int, size cap for the cache directory.
+    """
+
+    def __init__(self, directory='.fit_cache', max_bytes=50 * 1024 ** 2):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(endog, order, exog=None, model_kwargs=None, fit_kwargs=None):
+        """
+        Hash of everything that determines the outcome of a fit.
+        """
+        digest = hashlib.sha256()
+        digest.update(_hash_data(endog))
+        if exog is not None:
+            digest.update(_hash_data(exog))
+        options = {'order': list(order), 'model': model_kwargs or {}, 'fit': fit_kwargs or {},
+                   'statsmodels': statsmodels.__version__}
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key):
+        """
+        Return the cached entry for key, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            # Refresh the modification time, which orders entries for LRU eviction
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return entry
+
+    def put(self, key, entry):
+        """
+        Store entry under key and evict old entries if the cache is over its size cap.
+        """
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        # Atomic rename, so concurrent worker processes never read half-written entries
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the directory is below max_bytes.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        Remove every entry.
+        """
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.directory, name))
+
+
+def _hash_data(data):
+    # Hash values and index together, so the same numbers on different dates do not collide
+    if isinstance(data, (pd.Series, pd.DataFrame)):
+        digest = hashlib.sha256(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+        if isinstance(data, pd.DataFrame):
+            digest.update(json.dumps([str(c) for c in data.columns]).encode())
+        return digest.digest()
+    return hashlib.sha256(np.ascontiguousarray(data, dtype=float).tobytes()).digest()
+
+
+def _with_deadline(fit_kwargs, timeout):
+    # ARIMA.fit() hands method_kwargs on to the optimizer, which calls the callback after every iteration
+    if timeout is None:
+        return fit_kwargs
+    method_kwargs = dict(fit_kwargs.get('method_kwargs') or {}, callback=deadline_callback(timeout))
+    return dict(fit_kwargs, method_kwargs=method_kwargs)
+
+
+def summarize_results(results):
+    """
+    Reduce a fitted results object to the parameters and summary statistics kept in the cache.
+    """
+    iterations, converged = fit_diagnostics(results)
+    return {
+        'params': [float(value) for value in results.params],
+        'param_names': list(results.model.param_names),
+        'aic': float(results.aic),
+        'bic': float(results.bic),
+        'hqic': float(results.hqic),
+        'llf': float(results.llf),
+        'nobs': int(results.nobs),
+        'iterations': None if iterations is None else int(iterations),
+        'converged': None if converged is None else bool(converged),
+    }
+
+
+def fit_stats(endog, order, exog=None, model_kwargs=None, fit_kwargs=None, cache=None, seed=False,
+              neighbour=None, timeout=None):
+    """
+    Fit an ARIMA model, or load it from the cache, and return its summary statistics.
+
+    Parameters:
+    - endog: pd.Series, time series data.
+    - order: tuple, ARIMA model order (p, d, q).
+    - exog: pd.DataFrame or np.ndarray, exogenous regressors.
+    - model_kwargs: dict, extra ARIMA arguments.
+    - fit_kwargs: dict, extra fit() arguments.
+    - cache: FitCache, None disables caching.
+    - seed: bool, start the optimizer from the best of the default, Hannan-Rissanen and neighbour
+      starting values (see seeding.seed_start_params).
+    - neighbour: tuple, (order, params) of a fitted neighbouring order, used when seed is True.
+    - timeout: float, wall-clock budget in seconds; the fit raises instrumentation.FitTimeout when it
+      runs past it. Iteration caps go in fit_kwargs as {'method_kwargs': {'maxiter': n}}.
+
+    Returns:
+    - dict: params, param_names, aic, bic, hqic, llf, nobs, optimizer iterations and convergence flag,
+      plus the warnings raised by the fit, whether the entry came from the cache and the source of the
+      starting values.
+    """
+    model_kwargs = model_kwargs or {}
+    fit_kwargs = fit_kwargs or {}
+    key = None
+    if cache is not None:
+        # The starting values can change the optimum, so they are part of the key
+        key_fit_kwargs = fit_kwargs
+        if seed:
+            key_fit_kwargs = dict(fit_kwargs, seed=[neighbour[0], list(neighbour[1])] if neighbour else True)
+        key = cache.key(endog, order, exog, model_kwargs, key_fit_kwargs)
+        entry = cache.get(key)
+        if entry is not None:
+            return dict(entry, warnings=[], cached=True)
+
+    with capture_warnings() as caught:
+        model = sm.tsa.ARIMA(endog, order=order, exog=exog, **model_kwargs)
+        source = 'default'
+        if seed and 'start_params' not in fit_kwargs:
+            start_params, source = seed_start_params(model, order, neighbour)
+            fit_kwargs = dict(fit_kwargs, start_params=start_params)
+        # Only the summary statistics are kept, so the filter output is not stored and no smoother runs
+        results = model.fit(low_memory=True, **_with_deadline(fit_kwargs, timeout))
+    entry = dict(summarize_results(results), seed=source)
+    if cache is not None:
+        cache.put(key, entry)
+    return dict(entry, warnings=describe_warnings(caught), cached=False)
+
+
+def fit_model(endog, order, exog=None, model_kwargs=None, fit_kwargs=None, cache=None, timeout=None,
+              low_memory=False):
+    """
+    Return a full ARIMA results object, skipping estimation when the parameters are cached.
+
+    On a cache hit the model is only run through the Kalman smoother at the stored parameters, which
+    gives the same summary, fitted values and forecasts as fit() without the likelihood optimisation.
+    With low_memory the filter output is not stored and the smoother is skipped (statsmodels' low_memory
+    option): parameters, information criteria, residuals and the final state stay available, in-sample
+    prediction and get_forecast() intervals do not. Other arguments are the same as for fit_stats.
+    """
+    model_kwargs = model_kwargs or {}
+    fit_kwargs = fit_kwargs or {}
+    model = sm.tsa.ARIMA(endog, order=order, exog=exog, **model_kwargs)
+    run_kwargs = dict(_with_deadline(fit_kwargs, timeout), low_memory=low_memory)
+    if cache is None:
+        return model.fit(**run_kwargs)
+
+    key = cache.key(endog, order, exog, model_kwargs, fit_kwargs)
+    entry = cache.get(key)
+    if entry is not None:
+        if low_memory:
+            return model.filter(np.asarray(entry['params']), low_memory=True)
+        return model.smooth(np.asarray(entry['params']))
+
+    results = model.fit(**run_kwargs)
+    cache.put(key, summarize_results(results))
+    return results
+
+
+def residual_summary(residuals):
+    """
+    Summary statistics of a residual series: n, mean, std, MAE and RMSE.
+    """
+    residuals = np.asarray(residuals, dtype=float)
+    residuals = residuals[~np.isnan(residuals)]
+    return {
+        'n': int(len(residuals)),
+        'mean': float(np.mean(residuals)),
+        'std': float(np.std(residuals, ddof=1)) if len(residuals) > 1 else np.nan,
+        'mae': float(np.mean(np.abs(residuals))),
+        'rmse': float(np.sqrt(np.mean(np.square(residuals)))),
+    }
+
+
+def lean_results(results, steps=0, exog_forecast=None, alpha=0.05):
+    """
+    Reduce a results object to what the batch and backtest loops keep: parameters, information criteria,
+    optimizer diagnostics, the forecast and a residual summary. The data, filter output and covariance
+    matrices are released with the results object.
+
+    Parameters:
+    - results: statsmodels ARIMA results, e.g. from fit_model(..., low_memory=True).
+    - steps: int, forecast horizon; 0 skips the forecast.
+    - exog_forecast: pd.DataFrame or np.ndarray, future exogenous regressors for the forecast.
+    - alpha: float, significance level of the forecast intervals.
+
+    Returns:
+    - dict: summarize_results() fields plus 'forecast' (pd.DataFrame with mean, lower and upper, or None)
+      and 'residuals' (residual_summary()).
+    """
+    # The forecast comes from the final state, since get_forecast() has no intervals for low_memory results
+    forecast = forecast_from_state(model_state(results), steps, exog_forecast, alpha) if steps else None
+    return dict(summarize_results(results), forecast=forecast, residuals=residual_summary(results.resid))
+
+
+def fit_lean(endog, order, steps=0, exog=None, exog_forecast=None, alpha=0.05, **kwargs):
+    """
+    Fit (or load from the cache) an ARIMA model with low_memory and return only its lean_results().
+
+    Peak memory stays at one low-memory results object however many fits run. Other arguments are the
+    same as for fit_model.
+    """
+    results = fit_model(endog, order, exog=exog, low_memory=True, **kwargs)
+    return lean_results(results, steps, exog_forecast, alpha)
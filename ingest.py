@@ -0,0 +1,167 @@
+# Standard library imports
+import hashlib
+import json
+import os
+
+# Third-party imports for data handling
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (Parquet engine)
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+# Columns of the Eurostat prc_hicp_manr extract used by the pipeline, and how to read them
+HICP_COLUMNS = ['geo', 'coicop', 'TIME_PERIOD', 'OBS_VALUE']
+HICP_DTYPES = {'geo': 'category', 'coicop': 'category', 'TIME_PERIOD': 'string', 'OBS_VALUE': 'float64'}
+
+
+def read_hicp_panel(file_path, cache_dir=None, chunksize=500_000):
+    """
+    Read a long-format Eurostat prc_hicp_manr extract into a monthly panel.
+
+    Only the needed columns are parsed, with explicit dtypes and in chunks. With a cache_dir the cleaned
+    panel is stored in binary form (Parquet, or memory-mapped .npy files when pyarrow is not installed) and
+    later calls load it instead of the CSV, until the source file's mtime/size and content hash change.
+
+    Parameters:
+    - file_path: str, path to the CSV extract.
+    - cache_dir: str, directory of the binary cache. None always parses the CSV.
+    - chunksize: int, number of CSV rows parsed at a time.
+
+    Returns:
+    - pd.Series: 'Rate' indexed by (geo, coicop, Date), one value per month start.
+    """
+    if cache_dir is None:
+        return _parse_csv(file_path, chunksize)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    name = f'{os.path.basename(file_path)}.{hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()[:12]}'
+    cache_path = os.path.join(cache_dir, name)
+
+    meta = _read_meta(cache_path)
+    if meta is not None and _cache_is_fresh(file_path, cache_path, meta):
+        try:
+            return _load_cache(cache_path, meta)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    panel = _parse_csv(file_path, chunksize)
+    _write_cache(cache_path, panel, _source_signature(file_path))
+    return panel
+
+
+def iter_series(panel):
+    """
+    Yield ((geo, coicop), series) for every series in the panel, with a monthly DatetimeIndex.
+    """
+    for key, series in panel.groupby(level=['geo', 'coicop'], observed=True):
+        series = series.droplevel(['geo', 'coicop']).asfreq('MS')
+        yield key, series.loc[series.first_valid_index():series.last_valid_index()]
+
+
+def read_hicp_series(file_path, geo=None, coicop=None, cache_dir=None):
+    """
+    Read a single HICP series as the DataFrame used by the scripts: a monthly 'Date' index and a 'Rate' column.
+
+    geo and coicop select the series; they can be omitted when the extract holds a single series.
+    """
+    panel = read_hicp_panel(file_path, cache_dir=cache_dir)
+    series = {key: values for key, values in iter_series(panel)
+              if (geo is None or key[0] == geo) and (coicop is None or key[1] == coicop)}
+    if len(series) != 1:
+        raise ValueError(f'Expected exactly one series for geo={geo!r}, coicop={coicop!r}, '
+                         f'found {sorted(series)}')
+    data = next(iter(series.values())).rename('Rate').to_frame()
+    data.index.name = 'Date'
+    return data
+
+
+def _parse_csv(file_path, chunksize):
+    chunks = []
+    for chunk in pd.read_csv(file_path, usecols=HICP_COLUMNS, dtype=HICP_DTYPES, chunksize=chunksize):
+        try:
+            dates = pd.to_datetime(chunk['TIME_PERIOD'], format='%Y-%m')
+        except ValueError:
+            dates = pd.to_datetime(chunk['TIME_PERIOD'])
+        # Equivalent of resample('MS'): every observation is assigned to the start of its month
+        chunks.append(pd.DataFrame({'geo': chunk['geo'], 'coicop': chunk['coicop'],
+                                    'Date': dates.dt.to_period('M').dt.to_timestamp(),
+                                    'Rate': chunk['OBS_VALUE']}))
+    data = pd.concat(chunks, ignore_index=True)
+    data['geo'] = data['geo'].astype('category')
+    data['coicop'] = data['coicop'].astype('category')
+    return data.groupby(['geo', 'coicop', 'Date'], observed=True)['Rate'].mean()
+
+
+def _file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_signature(file_path):
+    stat = os.stat(file_path)
+    return {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha256': _file_hash(file_path)}
+
+
+def _cache_is_fresh(file_path, cache_path, meta):
+    stat = os.stat(file_path)
+    source = meta['source']
+    if source['mtime'] == stat.st_mtime and source['size'] == stat.st_size:
+        return True
+    if source['size'] != stat.st_size or source['sha256'] != _file_hash(file_path):
+        return False
+    # Touched but identical file: keep the cache and record the new mtime
+    meta['source'] = dict(source, mtime=stat.st_mtime)
+    _write_meta(cache_path, meta)
+    return True
+
+
+def _read_meta(cache_path):
+    try:
+        with open(f'{cache_path}.json') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_meta(cache_path, meta):
+    tmp_path = f'{cache_path}.json.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, f'{cache_path}.json')
+
+
+def _write_cache(cache_path, panel, source):
+    frame = panel.reset_index()
+    if HAS_PARQUET:
+        frame.to_parquet(f'{cache_path}.parquet', index=False)
+        meta = {'format': 'parquet', 'source': source}
+    else:
+        geo = frame['geo'].astype('category')
+        coicop = frame['coicop'].astype('category')
+        np.save(f'{cache_path}.geo.npy', geo.cat.codes.to_numpy(np.int32))
+        np.save(f'{cache_path}.coicop.npy', coicop.cat.codes.to_numpy(np.int32))
+        np.save(f'{cache_path}.date.npy', frame['Date'].to_numpy('datetime64[ns]'))
+        np.save(f'{cache_path}.rate.npy', frame['Rate'].to_numpy(np.float64))
+        meta = {'format': 'npy', 'source': source,
+                'geo': list(geo.cat.categories), 'coicop': list(coicop.cat.categories)}
+    _write_meta(cache_path, meta)
+
+
+def _load_cache(cache_path, meta):
+    if meta['format'] == 'parquet':
+        frame = pd.read_parquet(f'{cache_path}.parquet')
+        return frame.set_index(['geo', 'coicop', 'Date'])['Rate']
+
+    index = pd.MultiIndex.from_arrays([
+        pd.Categorical.from_codes(np.load(f'{cache_path}.geo.npy', mmap_mode='r'), meta['geo']),
+        pd.Categorical.from_codes(np.load(f'{cache_path}.coicop.npy', mmap_mode='r'), meta['coicop']),
+        pd.DatetimeIndex(np.load(f'{cache_path}.date.npy', mmap_mode='r')),
+    ], names=['geo', 'coicop', 'Date'])
+    return pd.Series(np.load(f'{cache_path}.rate.npy', mmap_mode='r'), index=index, name='Rate')
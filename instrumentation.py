@@ -0,0 +1,177 @@
+# Standard library imports
+import json
+import os
+import time
+import warnings
+from contextlib import contextmanager
+
+# Third-party imports for data handling
+import pandas as pd
+
+# Columns of the per-fit records
+FIT_COLUMNS = ['stage', 'order', 'fold', 'origin', 'kind', 'seed', 'seconds', 'iterations', 'converged',
+               'warnings', 'status', 'error']
+
+
+class FitTimeout(Exception):
+    """
+    Raised from the optimizer callback when a fit runs past its wall-clock budget.
+    """
+
+
+def deadline_callback(timeout):
+    """
+    Optimizer callback for statsmodels fit() that raises FitTimeout once timeout seconds have passed.
+
+    The callback runs after every optimizer iteration, so a fit overruns its budget by at most one iteration.
+    """
+    deadline = time.perf_counter() + timeout
+
+    def callback(*args):
+        if time.perf_counter() > deadline:
+            raise FitTimeout(f'fit exceeded its {timeout}s budget')
+    return callback
+
+
+def fit_status(converged):
+    """
+    Status of a finished fit: 'not_converged' when the optimizer stopped early (e.g. at maxiter), else 'ok'.
+    """
+    return 'not_converged' if converged is False else 'ok'
+
+
+@contextmanager
+def capture_warnings():
+    """
+    Record every warning raised inside the block, even when the calling script filters them out.
+    """
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        yield caught
+
+
+def describe_warnings(caught):
+    """
+    Turn recorded warnings into short 'Category: message' strings, without duplicates.
+    """
+    return list(dict.fromkeys(f'{w.category.__name__}: {w.message}' for w in caught))
+
+
+def fit_diagnostics(results):
+    """
+    Optimizer iterations and convergence flag of a fitted statsmodels results object.
+
+    Results rebuilt from the fit cache carry no optimizer output; both values are None for them. Lean
+    results (fit_cache.lean_results) carry the two values themselves.
+    """
+    if isinstance(results, dict):
+        return results.get('iterations'), results.get('converged')
+    retvals = getattr(results, 'mle_retvals', None) or {}
+    return retvals.get('iterations'), retvals.get('converged')
+
+
+class Recorder:
+    """
+    Collects wall time per pipeline stage and diagnostics per model fit.
+
+    Stages are timed with the stage() context manager. Fits are added from the order search tables
+    (add_fits) or timed directly with record_fit(). save() writes everything to JSON and CSV.
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.fits = []
+        self._open = []
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Time the enclosed block as stage name; fits recorded inside it are attributed to it.
+        """
+        record = {'stage': name, 'seconds': None, 'n_fits': 0, 'status': 'ok', 'error': None}
+        n_fits = len(self.fits)
+        self._open.append(name)
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record['status'] = 'failed'
+            record['error'] = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            record['n_fits'] = len(self.fits) - n_fits
+            self._open.pop()
+            self.stages.append(record)
+
+    def add_fits(self, rows, stage=None):
+        """
+        Add per-fit rows (dicts with a subset of FIT_COLUMNS) to the current or given stage.
+        """
+        stage = stage or (self._open[-1] if self._open else None)
+        for row in rows:
+            record = {column: row.get(column) for column in FIT_COLUMNS}
+            record['stage'] = stage
+            if isinstance(record['warnings'], list):
+                record['warnings'] = '; '.join(record['warnings'])
+            self.fits.append(record)
+
+    def record_fit(self, fit_func, endog, order, info=None, **kwargs):
+        """
+        Call fit_func(endog, order, **kwargs), record its wall time, optimizer iterations, convergence,
+        warnings and exception, and return its result. Exceptions are recorded and re-raised; the status
+        is 'ok', 'not_converged', 'timeout' or 'failed'.
+        """
+        row = dict(info or {}, order=order, status='ok')
+        results = None
+        start = time.perf_counter()
+        with capture_warnings() as caught:
+            try:
+                results = fit_func(endog, order, **kwargs)
+            except Exception as e:
+                row['status'] = 'timeout' if isinstance(e, FitTimeout) else 'failed'
+                row['error'] = f'{type(e).__name__}: {e}'
+                raise
+            finally:
+                row['seconds'] = time.perf_counter() - start
+                row['warnings'] = describe_warnings(caught)
+                if results is not None:
+                    row['iterations'], row['converged'] = fit_diagnostics(results)
+                    row['status'] = fit_status(row['converged'])
+                    row.setdefault('kind', 'fit' if row['iterations'] is not None else 'cached')
+                self.add_fits([row])
+        return results
+
+    def summary(self):
+        """
+        One row per stage with its wall time, number of fits, failed, timed-out and non-converged fits and
+        fits with warnings.
+        """
+        stages = pd.DataFrame(self.stages, columns=['stage', 'seconds', 'n_fits', 'status', 'error'])
+        fits = pd.DataFrame(self.fits, columns=FIT_COLUMNS)
+        counts = fits.groupby('stage').agg(failed_fits=('status', lambda s: (s == 'failed').sum()),
+                                           timeout_fits=('status', lambda s: (s == 'timeout').sum()),
+                                           not_converged_fits=('status', lambda s: (s == 'not_converged').sum()),
+                                           warned_fits=('warnings', lambda s: (s.fillna('') != '').sum()),
+                                           fit_seconds=('seconds', 'sum'))
+        summary = stages.join(counts, on='stage')
+        summary[list(counts.columns)] = summary[list(counts.columns)].fillna(0)
+        return summary
+
+    def save(self, directory='instrumentation', prefix='run'):
+        """
+        Write the stage and fit records to <prefix>.json and <prefix>_stages.csv / <prefix>_fits.csv.
+
+        Returns:
+        - list: paths of the written files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        json_path = os.path.join(directory, f'{prefix}.json')
+        with open(json_path, 'w') as f:
+            json.dump({'stages': self.stages, 'fits': self.fits}, f, indent=2, default=str)
+
+        stages_path = os.path.join(directory, f'{prefix}_stages.csv')
+        fits_path = os.path.join(directory, f'{prefix}_fits.csv')
+        pd.DataFrame(self.stages).to_csv(stages_path, index=False)
+        pd.DataFrame(self.fits, columns=FIT_COLUMNS).to_csv(fits_path, index=False)
+        return [json_path, stages_path, fits_path]
@@ -0,0 +1,500 @@
+# Standard library imports
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Third-party imports for data handling
+import numpy as np
+import pandas as pd
+
+# Third-party imports for statistical modeling
+from sklearn.model_selection import TimeSeriesSplit
+
+# Local imports
+from fit_cache import fit_stats
+from instrumentation import FitTimeout, fit_status
+from structural_breaks import break_dummies
+
+# Model options used by the order grids in ARIMA.py and ARIMAX_structural_breaks.py
+MODEL_KWARGS = {'enforce_stationarity': False, 'enforce_invertibility': False}
+
+# Per-fit statuses whose information criteria are usable; 'timeout' and 'failed' fits have none
+USABLE_STATUSES = ('ok', 'not_converged')
+
+# Order in which the statuses of an order's fits are reported, worst first
+STATUS_SEVERITY = ('failed', 'timeout', 'not_converged', 'ok')
+
+
+def make_pdq(p=range(0, 3), d=1, q=range(0, 7)):
+    """
+    Generate all possible combinations of p, d, and q (with d fixed).
+    """
+    return list(itertools.product(p, [d], q))
+
+
+def pool_context():
+    # The scripts run top to bottom without a __main__ guard, so workers must be forked:
+    # a spawned worker would re-import the calling script and run it again.
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def run_jobs(func, jobs, workers=None, progress=None):
+    """
+    Apply func to every job, spreading the jobs over a process pool.
+
+    Parameters:
+    - func: callable, module-level function taking a single job.
+    - jobs: list, job arguments (must be picklable).
+    - workers: int, number of worker processes. None uses every core, 1 runs in-process.
+    - progress: callable, called as progress(done, total, result) each time a job finishes.
+
+    Returns:
+    - list: func(job) for each job, in job order.
+    """
+    jobs = list(jobs)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    results = [None] * len(jobs)
+    if workers <= 1:
+        for i, job in enumerate(jobs):
+            results[i] = func(job)
+            if progress is not None:
+                progress(i + 1, len(jobs), results[i])
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()) as pool:
+        futures = {pool.submit(func, job): i for i, job in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            if progress is not None:
+                progress(done, len(jobs), results[futures[future]])
+    return results
+
+
+def fit_order(job, seed=False, neighbour=None):
+    """
+    Fit a single ARIMA model (or load it from the fit cache) and return its information criteria.
+
+    Parameters:
+    - job: tuple, (order, fold, endog, exog, model_kwargs, cache, budget). fold is None for the full-sample
+      fit. budget is None or a dict with 'timeout' (seconds) and/or 'maxiter' (optimizer iterations).
+    - seed: bool, choose the starting values with seeding.seed_start_params.
+    - neighbour: tuple, (order, params) of a fitted neighbouring order offered as starting values.
+
+    Returns:
+    - dict: order, fold, aic, bic, params, status ('ok', 'not_converged', 'timeout' or 'failed'), error
+      message, and the fit diagnostics (kind, seconds, iterations, converged, warnings, seed).
+    """
+    order, fold, endog, exog, model_kwargs, cache, budget = job
+    budget = budget or {}
+    fit_kwargs = {'method_kwargs': {'maxiter': budget['maxiter']}} if budget.get('maxiter') else None
+    row = {'order': order, 'fold': fold, 'aic': np.nan, 'bic': np.nan, 'params': None, 'status': 'ok',
+           'error': None, 'kind': 'fit', 'iterations': None, 'converged': None, 'warnings': [], 'seed': None}
+    start = time.perf_counter()
+    try:
+        stats = fit_stats(endog, order, exog=exog, model_kwargs=model_kwargs, fit_kwargs=fit_kwargs, cache=cache,
+                          seed=seed, neighbour=neighbour, timeout=budget.get('timeout'))
+        row['aic'] = stats['aic']
+        row['bic'] = stats['bic']
+        row['params'] = stats['params']
+        row['kind'] = 'cached' if stats['cached'] else 'fit'
+        row['iterations'] = stats.get('iterations')
+        row['converged'] = stats.get('converged')
+        row['warnings'] = stats['warnings']
+        row['seed'] = stats.get('seed')
+        row['status'] = fit_status(row['converged'])
+    except FitTimeout as e:
+        row['status'] = 'timeout'
+        row['error'] = str(e)
+    except Exception as e:
+        row['status'] = 'failed'
+        row['error'] = str(e)
+    row['seconds'] = time.perf_counter() - start
+    return row
+
+
+def fit_chain(chain):
+    """
+    Fit a chain of neighbouring orders on the same data in sequence, each one seeded with the optimum of
+    the previous successful fit, e.g. (2,1,4) -> (2,1,5) -> (2,1,6).
+
+    Parameters:
+    - chain: list, fit_order jobs sharing the data, in chain order.
+
+    Returns:
+    - list: fit_order rows, in chain order.
+    """
+    rows = []
+    neighbour = None
+    for job in chain:
+        row = fit_order(job, seed=True, neighbour=neighbour)
+        if row['status'] in USABLE_STATUSES:
+            neighbour = (row['order'], row['params'])
+        rows.append(row)
+    return rows
+
+
+def run_fits(jobs, workers=None, warm_start=False, groups=None):
+    """
+    Run fit_order jobs in parallel. With warm_start, jobs sharing p, d and fold are chained along q
+    (see fit_chain) and the chains run in parallel instead.
+
+    Parameters:
+    - jobs: list, fit_order jobs.
+    - workers: int, number of worker processes.
+    - warm_start: bool, chain the fits.
+    - groups: list, one label per job; only jobs with the same label are chained (e.g. jobs with different
+      exog matrices). None puts every job in one group.
+
+    Returns:
+    - list: fit_order rows, in job order.
+    """
+    if not warm_start:
+        return run_jobs(fit_order, jobs, workers)
+
+    if groups is None:
+        groups = [None] * len(jobs)
+    chains = {}
+    for i, (job, group) in enumerate(zip(jobs, groups)):
+        (p, d, q), fold = job[0], job[1]
+        chains.setdefault((group, p, d, fold), []).append((q, i))
+    chains = [sorted(chain) for chain in chains.values()]
+    results = run_jobs(fit_chain, [[jobs[i] for _, i in chain] for chain in chains], workers)
+
+    rows = [None] * len(jobs)
+    for chain, chain_rows in zip(chains, results):
+        for (_, i), row in zip(chain, chain_rows):
+            rows[i] = row
+    return rows
+
+
+def order_status(fits):
+    """
+    Status of an order from the rows of its fits: the worst fit status and the error of the first fit
+    with that status.
+    """
+    statuses = [fit['status'] for fit in fits]
+    for status in STATUS_SEVERITY:
+        if status in statuses:
+            error = next(fit['error'] for fit in fits if fit['status'] == status)
+            return {'status': status, 'error': error}
+    return {'status': 'ok', 'error': None}
+
+
+def search_orders(series, pdq, n_splits=5, cv_series=None, exog=None, full_fit=True, workers=None,
+                  model_kwargs=None, cache=None, recorder=None, warm_start=False, budget=None):
+    """
+    Fit every (order, fold) combination once, in parallel, and collect the results in one table.
+
+    Parameters:
+    - series: pd.Series, data used for the full-sample AIC/BIC fits.
+    - pdq: list, candidate (p, d, q) orders.
+    - n_splits: int, number of TimeSeriesSplit folds for the CV AIC. 0 skips cross-validation.
+    - cv_series: pd.Series, data split into folds. Defaults to series.
+    - exog: pd.DataFrame, exogenous regressors aligned with cv_series (and series).
+    - full_fit: bool, whether to fit each order on the full series for AIC/BIC.
+    - workers: int, number of worker processes. None uses every core.
+    - model_kwargs: dict, extra ARIMA arguments. Defaults to MODEL_KWARGS.
+    - cache: FitCache, on-disk cache of fitted results. None disables caching.
+    - recorder: Recorder, receives the diagnostics of every (order, fold) fit.
+    - warm_start: bool, seed every fit with cheap pre-estimates and the optimum of its neighbour along q
+      (see run_fits).
+    - budget: dict, per-fit limits: 'timeout' in seconds and/or 'maxiter'. Timed-out fits count as failed
+      for their order; fits stopped at maxiter keep their criteria and are reported as 'not_converged'.
+
+    Returns:
+    - pd.DataFrame: one row per order with aic, bic, cv_aic (mean over folds), n_fits, status (the worst
+      fit status of the order) and error.
+    """
+    if model_kwargs is None:
+        model_kwargs = MODEL_KWARGS
+    jobs = order_jobs(series, pdq, n_splits, cv_series, exog, full_fit, model_kwargs, cache, budget)
+    fits = run_fits(jobs, workers, warm_start)
+    if recorder is not None:
+        recorder.add_fits(fits)
+    return order_table(pdq, fits)
+
+
+def order_jobs(series, pdq, n_splits=5, cv_series=None, exog=None, full_fit=True, model_kwargs=None, cache=None,
+               budget=None):
+    """
+    fit_order jobs for every (order, fold) combination of search_orders (same arguments).
+    """
+    if cv_series is None:
+        cv_series = series
+
+    folds = []
+    if n_splits:
+        folds = list(TimeSeriesSplit(n_splits=n_splits).split(cv_series))
+
+    jobs = []
+    for param in pdq:
+        if full_fit:
+            full_exog = None if exog is None else exog.loc[series.index]
+            jobs.append((param, None, series, full_exog, model_kwargs, cache, budget))
+        for fold, (train_index, _) in enumerate(folds):
+            fold_exog = None if exog is None else exog.iloc[train_index]
+            jobs.append((param, fold, cv_series.iloc[train_index], fold_exog, model_kwargs, cache, budget))
+    return jobs
+
+
+def order_table(pdq, fits):
+    """
+    Aggregate fit_order rows into one row per order with aic, bic, cv_aic, n_fits, status and error.
+    """
+    rows = []
+    for param in pdq:
+        order_fits = [fit for fit in fits if fit['order'] == param]
+        full = [fit for fit in order_fits if fit['fold'] is None]
+        cv = [fit for fit in order_fits if fit['fold'] is not None]
+        cv_ok = bool(cv) and all(fit['status'] in USABLE_STATUSES for fit in cv)
+        rows.append(dict({
+            'order': param,
+            'aic': full[0]['aic'] if full else np.nan,
+            'bic': full[0]['bic'] if full else np.nan,
+            # A single failed fold disqualifies the order, as in the original TimeSeriesSplit loop
+            'cv_aic': np.mean([fit['aic'] for fit in cv]) if cv_ok else np.nan,
+            'n_fits': len(order_fits),
+        }, **order_status(order_fits)))
+    return pd.DataFrame(rows, columns=['order', 'aic', 'bic', 'cv_aic', 'n_fits', 'status', 'error'])
+
+
+def search_break_orders(series, break_sets, pdq, n_splits=0, full_fit=True, workers=None, model_kwargs=None,
+                        cache=None, recorder=None, warm_start=False, budget=None):
+    """
+    Joint search over candidate break sets and ARIMA orders for an ARIMAX model with break dummies.
+
+    The dummy matrix of each break set is built once and shared by all its (order, fold) fits, and the fits
+    of every break set run in a single process pool. With a fit cache, a break set and order seen in an
+    earlier run is not fitted again.
+
+    Parameters:
+    - series: pd.Series, time series data with datetime index.
+    - break_sets: dict, name -> list of break dates (the first date of each new regime).
+    - pdq: list, candidate (p, d, q) orders.
+    - n_splits, full_fit, workers, model_kwargs, cache, recorder, warm_start, budget: as for search_orders.
+
+    Returns:
+    - pd.DataFrame: one row per (break set, order) with breaks (the name), n_breaks, order, aic, bic,
+      cv_aic, n_fits, status and error.
+    """
+    if model_kwargs is None:
+        model_kwargs = MODEL_KWARGS
+
+    jobs = []
+    groups = []
+    for name, break_dates in break_sets.items():
+        exog = break_dummies(series.index, break_dates)
+        set_jobs = order_jobs(series, pdq, n_splits, None, exog, full_fit, model_kwargs, cache, budget)
+        jobs.extend(set_jobs)
+        groups.extend([name] * len(set_jobs))
+
+    fits = run_fits(jobs, workers, warm_start, groups)
+    if recorder is not None:
+        recorder.add_fits(fits)
+
+    tables = []
+    for name, break_dates in break_sets.items():
+        table = order_table(pdq, [fit for fit, group in zip(fits, groups) if group == name])
+        table.insert(0, 'n_breaks', len(break_dates))
+        table.insert(0, 'breaks', name)
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True)
+
+
+def halving_search(series, pdq, n_splits=5, exog=None, eta=2, min_folds=1, workers=None, model_kwargs=None,
+                   cache=None, recorder=None, warm_start=False, budget=None):
+    """
+    Successive-halving TimeSeriesSplit cross-validation.
+
+    All candidates are first fitted on the min_folds smallest (cheapest) folds. After each rung only the
+    best 1/eta of them, by mean AIC over the folds seen so far, are promoted and fitted on eta times as
+    many folds, until the survivors have been scored on all n_splits folds. A failed fold eliminates the
+    order, as in search_orders.
+
+    Parameters:
+    - series: pd.Series, data split into folds.
+    - pdq: list, candidate (p, d, q) orders.
+    - n_splits: int, number of TimeSeriesSplit folds.
+    - exog: pd.DataFrame, exogenous regressors aligned with series.
+    - eta: int, reduction factor between rungs.
+    - min_folds: int, number of folds in the first rung.
+    - workers, model_kwargs, cache, recorder, warm_start, budget: as for search_orders.
+
+    Returns:
+    - pd.DataFrame: one row per order with cv_aic (mean over all folds, NaN for eliminated orders), the
+      last rung it reached, n_fits (the number of folds it was fitted on), status and error.
+    """
+    if model_kwargs is None:
+        model_kwargs = MODEL_KWARGS
+    folds = list(TimeSeriesSplit(n_splits=n_splits).split(series))
+
+    fits = {}
+    survivors = list(pdq)
+    rungs = {order: 0 for order in pdq}
+    n_folds = min(min_folds, n_splits)
+    rung = 0
+    while True:
+        jobs = []
+        for order in survivors:
+            rungs[order] = rung
+            for fold in range(n_folds):
+                if (order, fold) not in fits:
+                    train_index = folds[fold][0]
+                    fold_exog = None if exog is None else exog.iloc[train_index]
+                    jobs.append((order, fold, series.iloc[train_index], fold_exog, model_kwargs, cache, budget))
+        rung_fits = run_fits(jobs, workers, warm_start)
+        if recorder is not None:
+            recorder.add_fits(rung_fits)
+        fits.update({(fit['order'], fit['fold']): fit for fit in rung_fits})
+
+        scores = {}
+        for order in survivors:
+            order_fits = [fits[(order, fold)] for fold in range(n_folds)]
+            if all(fit['status'] in USABLE_STATUSES for fit in order_fits):
+                scores[order] = np.mean([fit['aic'] for fit in order_fits])
+        if n_folds == n_splits:
+            break
+        n_keep = max(1, int(np.ceil(len(survivors) / eta)))
+        survivors = sorted(scores, key=scores.get)[:n_keep]
+        if not survivors:
+            break
+        n_folds = min(n_folds * eta, n_splits)
+        rung += 1
+
+    rows = []
+    for order in pdq:
+        order_fits = [fit for fit in fits.values() if fit['order'] == order]
+        rows.append(dict({
+            'order': order,
+            'cv_aic': scores.get(order, np.nan) if n_folds == n_splits else np.nan,
+            'rung': rungs[order],
+            'n_fits': len(order_fits),
+        }, **order_status(order_fits)))
+    return pd.DataFrame(rows)
+
+
+def best_order(table, criterion='aic'):
+    """
+    Return the order with the lowest value of criterion ('aic', 'bic' or 'cv_aic') and that value.
+    For a search_break_orders table, use best_break_order.
+    """
+    scores = table[criterion]
+    if scores.isna().all():
+        return None, float('inf')
+    best = scores.idxmin()
+    return table.loc[best, 'order'], scores[best]
+
+
+def neighbour_orders(order, max_p=5, max_q=5):
+    """
+    Orders one step away from order: p and/or q changed by one, d kept, within [0, max_p] x [0, max_q].
+    """
+    p, d, q = order
+    neighbours = []
+    for dp, dq in [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1), (-1, 1), (1, -1)]:
+        if 0 <= p + dp <= max_p and 0 <= q + dq <= max_q:
+            neighbours.append((p + dp, d, q + dq))
+    return neighbours
+
+
+def stepwise_search(series, d=1, max_p=5, max_q=5, criterion='aic', n_splits=5, cv_series=None, exog=None,
+                    max_steps=50, workers=None, model_kwargs=None, cache=None, recorder=None, warm_start=False,
+                    budget=None, known=None):
+    """
+    Hyndman-Khandakar style stepwise order search.
+
+    Starts from (2, d, 2), (0, d, 0), (1, d, 0) and (0, d, 1), then repeatedly fits the unvisited
+    neighbours of the current best order (p and/or q changed by one) and moves to the best of them.
+    The search stops as soon as no neighbour improves the criterion, or after max_steps moves. The
+    fits of each step run in parallel through search_orders.
+
+    Parameters:
+    - series: pd.Series, data used for the full-sample AIC/BIC fits.
+    - d: int, order of differencing.
+    - max_p, max_q: int, largest AR and MA orders considered.
+    - criterion: str, 'aic', 'bic' or 'cv_aic'.
+    - n_splits: int, number of TimeSeriesSplit folds, only used when criterion is 'cv_aic'.
+    - cv_series, exog, workers, model_kwargs, cache, recorder, warm_start, budget: as for search_orders.
+    - max_steps: int, maximum number of moves away from the best starting order.
+    - known: pd.DataFrame, search_orders table of the same series, criterion and folds (e.g. the exhaustive grid).
+      Visited orders found in it are taken from it instead of being fitted again.
+
+    Returns:
+    - pd.DataFrame: the search_orders table of every visited order, with the step at which it was visited and
+      whether its row was reused from known. n_fits counts the fits of a standalone run either way.
+    """
+    cv = criterion == 'cv_aic'
+    candidates = [(2, d, 2), (0, d, 0), (1, d, 0), (0, d, 1)]
+    candidates = [order for order in candidates if order[0] <= max_p and order[2] <= max_q]
+
+    tables = []
+    visited = set()
+    best, best_value = None, float('inf')
+    for step in range(max_steps + 1):
+        candidates = [order for order in dict.fromkeys(candidates) if order not in visited]
+        if not candidates:
+            break
+        visited.update(candidates)
+        known_orders = set() if known is None else set(known['order'])
+        fresh = [order for order in candidates if order not in known_orders]
+        parts = []
+        if fresh:
+            parts.append(search_orders(series, fresh, n_splits=n_splits if cv else 0, cv_series=cv_series,
+                                       exog=exog, full_fit=not cv, workers=workers, model_kwargs=model_kwargs,
+                                       cache=cache, recorder=recorder, warm_start=warm_start,
+                                       budget=budget).assign(reused=False))
+        if len(fresh) < len(candidates):
+            parts.append(known[known['order'].map(lambda order: order in candidates)].assign(reused=True))
+        table = pd.concat(parts, ignore_index=True)
+        table['step'] = step
+        tables.append(table)
+
+        order, value = best_order(table, criterion)
+        if order is None or value >= best_value:
+            break
+        best, best_value = order, value
+        candidates = neighbour_orders(best, max_p, max_q)
+
+    return pd.concat(tables, ignore_index=True)
+
+
+def compare_searches(stepwise_table, grid_table, criterion='aic'):
+    """
+    Compare the order chosen by a stepwise search with the exhaustive grid result.
+
+    Returns:
+    - dict: chosen order, criterion value, number of orders and of fits of both searches, whether they agree, and
+      how far the stepwise value is above the grid optimum.
+    """
+    stepwise_order, stepwise_value = best_order(stepwise_table, criterion)
+    grid_order, grid_value = best_order(grid_table, criterion)
+    return {
+        'criterion': criterion,
+        'stepwise_order': stepwise_order,
+        'stepwise_value': float(stepwise_value),
+        'stepwise_orders': len(stepwise_table),
+        'stepwise_fits': int(stepwise_table['n_fits'].sum()),
+        'grid_order': grid_order,
+        'grid_value': float(grid_value),
+        'grid_orders': len(grid_table),
+        'grid_fits': int(grid_table['n_fits'].sum()),
+        'same_order': stepwise_order == grid_order,
+        'gap': float(stepwise_value - grid_value),
+    }
+
+
+def best_break_order(table, criterion='aic'):
+    """
+    Return the break set name, order and criterion value of the best row of a search_break_orders table.
+    """
+    scores = table[criterion]
+    if scores.isna().all():
+        return None, None, float('inf')
+    best = scores.idxmin()
+    return table.loc[best, 'breaks'], table.loc[best, 'order'], scores[best]
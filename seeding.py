@@ -0,0 +1,95 @@
+# Third-party imports for data handling
+import numpy as np
+
+# Third-party imports for statistical modeling
+from statsmodels.tsa.arima.estimators.hannan_rissanen import hannan_rissanen
+
+
+def hannan_rissanen_params(endog, order, exog=None):
+    """
+    Cheap Hannan-Rissanen estimate of the ARIMA parameters, in the layout of statsmodels' ARIMA
+    (exog coefficients, AR, MA, sigma2).
+
+    The series (and exog) are differenced d times; the exog coefficients come from OLS on the
+    differenced data and the ARMA part from Hannan-Rissanen on the regression residuals.
+
+    Parameters:
+    - endog: pd.Series or np.ndarray, time series data.
+    - order: tuple, ARIMA model order (p, d, q).
+    - exog: pd.DataFrame or np.ndarray, exogenous regressors.
+
+    Returns:
+    - np.ndarray: starting parameters, or None when the estimate cannot be computed (e.g. too few
+      observations).
+    """
+    p, d, q = order
+    y = np.diff(np.asarray(endog, dtype=float), n=d)
+    beta = np.array([])
+    if exog is not None:
+        x = np.diff(np.asarray(exog, dtype=float).reshape(len(endog), -1), n=d, axis=0)
+        beta = np.linalg.lstsq(x, y, rcond=None)[0]
+        y = y - x @ beta
+    try:
+        estimate, _ = hannan_rissanen(y, ar_order=p, ma_order=q, demean=False)
+    except Exception:
+        return None
+    params = np.r_[beta, estimate.ar_params, estimate.ma_params, estimate.sigma2]
+    return params if np.all(np.isfinite(params)) else None
+
+
+def neighbour_params(params, from_order, to_order, n_exog=0):
+    """
+    Map the optimum of a neighbouring order onto to_order, e.g. (2, 1, 5) -> (2, 1, 6).
+
+    Shared lags keep their estimates, added lags start at zero and dropped lags are discarded.
+
+    Parameters:
+    - params: array-like, fitted parameters of from_order (exog, AR, MA, sigma2).
+    - from_order, to_order: tuple, (p, d, q) orders.
+    - n_exog: int, number of exogenous regressors.
+
+    Returns:
+    - np.ndarray: starting parameters for to_order.
+    """
+    params = np.asarray(params, dtype=float)
+    from_p, _, from_q = from_order
+    to_p, _, to_q = to_order
+    ar = params[n_exog:n_exog + from_p]
+    ma = params[n_exog + from_p:n_exog + from_p + from_q]
+    return np.r_[params[:n_exog],
+                 ar[:to_p], np.zeros(max(to_p - from_p, 0)),
+                 ma[:to_q], np.zeros(max(to_q - from_q, 0)),
+                 params[-1]]
+
+
+def seed_start_params(model, order, neighbour=None):
+    """
+    Choose starting parameters for model.fit() from the default statsmodels start, the Hannan-Rissanen
+    estimate and, if given, the optimum of a neighbouring order: whichever has the highest log-likelihood.
+
+    Parameters:
+    - model: statsmodels ARIMA model (not yet fitted).
+    - order: tuple, (p, d, q) order of model.
+    - neighbour: tuple, (order, params) of an already fitted neighbouring order.
+
+    Returns:
+    - tuple: (np.ndarray starting parameters, str source: 'default', 'hannan_rissanen' or 'neighbour').
+    """
+    n_exog = model.k_exog
+    candidates = {'default': np.asarray(model.start_params)}
+    exog = model.data.orig_exog if n_exog else None
+    estimate = hannan_rissanen_params(model.data.orig_endog, order, exog)
+    if estimate is not None:
+        candidates['hannan_rissanen'] = estimate
+    if neighbour is not None:
+        candidates['neighbour'] = neighbour_params(neighbour[1], neighbour[0], order, n_exog)
+
+    best, best_llf = 'default', -np.inf
+    for source, params in candidates.items():
+        if len(params) != len(model.param_names):
+            continue
+        with np.errstate(all='ignore'):
+            llf = model.loglike(params)
+        if np.isfinite(llf) and llf > best_llf:
+            best, best_llf = source, llf
+    return candidates[best], best
@@ -0,0 +1,216 @@
+# Standard library imports
+import argparse
+import json
+import os
+
+# Third-party imports for data handling
+import numpy as np
+import pandas as pd
+
+# Third-party imports for statistical modeling
+from scipy.stats import norm
+
+# State-space matrices of the fitted model that drive the forecast recursion
+STATE_MATRICES = ['design', 'obs_cov', 'transition', 'state_intercept', 'selection', 'state_cov']
+
+
+def model_state(results):
+    """
+    Extract what is needed to forecast from a fitted ARIMA(X) model without re-estimating it: the time-invariant
+    state-space matrices, the regression coefficients and the one-step-ahead predicted state and its covariance
+    after the last observation. Works for results fitted with low_memory=True as well.
+
+    Parameters:
+    - results: statsmodels ARIMA results (from fit(), filter(), smooth() or fit_model()).
+
+    Returns:
+    - dict: the arrays keyed by name, plus 'meta' with the order, sample size, names and trend settings.
+    """
+    model = results.model
+    filtered = results.filter_results
+    state = {name: np.asarray(getattr(filtered, name))[..., -1] for name in STATE_MATRICES}
+
+    # ARIMA puts trend terms and exog into the observation intercept as a regression on
+    # [trend columns, exog]; their coefficients lead the parameter vector
+    n_regressors = 0 if model.exog is None else model.exog.shape[1]
+    state['regression_params'] = np.asarray(results.params)[:n_regressors]
+    state['predicted_state'] = filtered.predicted_state[:, -1]
+    state['predicted_state_cov'] = filtered.predicted_state_cov[:, :, -1]
+
+    index = model._index
+    state['meta'] = {
+        'order': list(model.order),
+        'nobs': int(model.nobs),
+        'endog_name': model.endog_names,
+        'exog_names': model.exog_names[model.k_trend:] if n_regressors else [],
+        'trend_terms': [int(term) for term in model._spec_arima.trend_terms],
+        'trend_offset': int(model.trend_offset),
+        'last_date': str(index[-1]) if isinstance(index, pd.DatetimeIndex) else None,
+        'freq': index.freqstr if isinstance(index, pd.DatetimeIndex) else None,
+    }
+    return state
+
+
+def export_state(results, path):
+    """
+    Save the model state of a fitted ARIMA(X) model (see model_state()) to an .npz file.
+
+    Everything is stored as plain arrays (the metadata as a JSON string), so loading it needs neither pickle
+    nor statsmodels.
+
+    Parameters:
+    - results: statsmodels ARIMA results (from fit(), filter(), smooth() or fit_model()).
+    - path: str, .npz file to write. Missing directories are created.
+
+    Returns:
+    - str: path of the written file.
+    """
+    state = model_state(results)
+    meta = state.pop('meta')
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    np.savez(path, meta=json.dumps(meta), **state)
+    return path
+
+
+def load_state(path):
+    """
+    Load a model state saved by export_state().
+
+    Returns:
+    - dict: the arrays keyed by name, plus 'meta' with the decoded metadata.
+    """
+    with np.load(path) as stored:
+        state = {name: stored[name] for name in stored.files if name != 'meta'}
+        state['meta'] = json.loads(str(stored['meta']))
+    return state
+
+
+def _forecast_index(meta, steps):
+    if meta['last_date'] is None:
+        return pd.RangeIndex(meta['nobs'], meta['nobs'] + steps)
+    return pd.date_range(meta['last_date'], periods=steps + 1, freq=meta['freq'])[1:]
+
+
+def _intercept(state, steps, exog):
+    # Observation intercept over the horizon: trend terms and exog times their coefficients, for a
+    # (n_paths, steps, n_exog) stack of exog paths
+    meta = state['meta']
+    n_exog = len(meta['exog_names'])
+    if n_exog and exog is None:
+        raise ValueError(f'the model was fitted with exog {meta["exog_names"]}; future values are required')
+    time = np.arange(meta['trend_offset'] + meta['nobs'], meta['trend_offset'] + meta['nobs'] + steps)
+    trend = time[:, None] ** np.asarray(meta['trend_terms'], dtype=float)
+    n_paths = 1 if exog is None else len(exog)
+    regressors = [np.broadcast_to(trend, (n_paths,) + trend.shape)]
+    if n_exog:
+        exog = np.asarray(exog, dtype=float)
+        if exog.shape[1:] != (steps, n_exog):
+            raise ValueError(f'expected future exog of shape ({steps}, {n_exog}) per path, got {exog.shape[1:]}')
+        regressors.append(exog)
+    return np.concatenate(regressors, axis=-1) @ state['regression_params']
+
+
+def _prediction_path(state, steps):
+    # Kalman prediction recursion from the predicted state: the mean of the state part of the observation and
+    # the forecast variance, neither of which depends on the exog path
+    design, transition = state['design'], state['transition']
+    state_intercept = state['state_intercept']
+    obs_cov = state['obs_cov']
+    selected_cov = state['selection'] @ state['state_cov'] @ state['selection'].T
+    a, P = state['predicted_state'], state['predicted_state_cov']
+
+    mean = np.empty(steps)
+    variance = np.empty(steps)
+    for h in range(steps):
+        mean[h] = (design @ a)[0]
+        variance[h] = (design @ P @ design.T + obs_cov)[0, 0]
+        a = transition @ a + state_intercept
+        P = transition @ P @ transition.T + selected_cov
+    return mean, variance
+
+
+def forecast_from_state(state, steps, exog=None, alpha=0.05):
+    """
+    Forecast from a model state with the Kalman prediction recursion, without re-estimation.
+
+    Gives the same means and confidence intervals as results.get_forecast(steps, exog).
+
+    Parameters:
+    - state: dict, as returned by model_state() or load_state().
+    - steps: int, forecast horizon.
+    - exog: pd.DataFrame or np.ndarray, (steps, n_exog) future exogenous regressors. Required when the model
+      was fitted with exog.
+    - alpha: float, significance level of the confidence intervals.
+
+    Returns:
+    - pd.DataFrame: 'mean', 'lower' and 'upper' per forecast date.
+    """
+    paths = None if exog is None else np.asarray(exog, dtype=float).reshape(1, steps, -1)
+    mean, variance = _prediction_path(state, steps)
+    mean = mean + _intercept(state, steps, paths)[0]
+    half_width = norm.ppf(1 - alpha / 2) * np.sqrt(variance)
+    return pd.DataFrame({'mean': mean, 'lower': mean - half_width, 'upper': mean + half_width},
+                        index=_forecast_index(state['meta'], steps))
+
+
+def scenario_forecasts(state, scenarios, alpha=0.05):
+    """
+    Forecast many future exog paths (scenarios) from one model state in a single pass.
+
+    The state recursion and the forecast variance do not depend on the exog, so they are computed once; each
+    scenario only shifts the mean by its regression intercept. Every scenario gives the same means and
+    intervals as results.get_forecast(steps, exog=scenario).
+
+    Parameters:
+    - state: dict, as returned by model_state() or load_state() for a model fitted with exog.
+    - scenarios: dict of name -> (steps, n_exog) pd.DataFrame or np.ndarray, or a (n_scenarios, steps, n_exog)
+      np.ndarray (scenarios are then numbered from 0).
+    - alpha: float, significance level of the confidence intervals.
+
+    Returns:
+    - pd.DataFrame: 'mean', 'lower' and 'upper' indexed by (scenario, forecast date).
+    """
+    if isinstance(scenarios, dict):
+        names = list(scenarios)
+        paths = np.stack([np.asarray(path, dtype=float) for path in scenarios.values()])
+    else:
+        paths = np.asarray(scenarios, dtype=float)
+        names = list(range(len(paths)))
+    if paths.ndim != 3:
+        raise ValueError(f'scenarios must stack into (n_scenarios, steps, n_exog), got shape {paths.shape}')
+    steps = paths.shape[1]
+
+    mean, variance = _prediction_path(state, steps)
+    means = mean + _intercept(state, steps, paths)
+    half_width = norm.ppf(1 - alpha / 2) * np.sqrt(variance)
+    index = pd.MultiIndex.from_product([names, _forecast_index(state['meta'], steps)], names=['scenario', 'date'])
+    return pd.DataFrame({'mean': means.ravel(), 'lower': (means - half_width).ravel(),
+                         'upper': (means + half_width).ravel()}, index=index)
+
+
+def serve_forecast(path, steps, exog=None, alpha=0.05):
+    """
+    Load a saved model state and forecast from it: the entry point for dashboard requests.
+
+    Arguments are those of load_state() and forecast_from_state().
+    """
+    return forecast_from_state(load_state(path), steps, exog=exog, alpha=alpha)
+
+
+def serve_scenarios(path, scenarios, alpha=0.05):
+    """
+    Load a saved model state and forecast every scenario from it (see scenario_forecasts()).
+    """
+    return scenario_forecasts(load_state(path), scenarios, alpha=alpha)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Forecast from a saved ARIMA model state without refitting.')
+    parser.add_argument('state_path', help='.npz model state written by export_state()')
+    parser.add_argument('--steps', type=int, default=6, help='forecast horizon')
+    parser.add_argument('--alpha', type=float, default=0.05, help='significance level of the intervals')
+    args = parser.parse_args()
+
+    print(serve_forecast(args.state_path, args.steps, alpha=args.alpha).to_string())
@@ -0,0 +1,133 @@
+# Standard library imports
+import warnings
+
+# Third-party imports for data handling
+import numpy as np
+import pandas as pd
+
+# Third-party imports for statistical modeling
+from statsmodels.tools.sm_exceptions import InterpolationWarning
+from statsmodels.tsa.stattools import adfuller, kpss
+
+# Local imports
+from order_search import run_jobs
+
+# Columns of the tidy stationarity-test table
+TEST_COLUMNS = ['series', 'd', 'test', 'statistic', 'p_value', 'lags', 'n_obs', 'decision', 'error']
+
+
+def _test_row(name, d, test, func, values, alpha):
+    """
+    Run one stationarity test and describe its outcome as a row of the tidy table.
+
+    A test that raises (e.g. too few observations left after differencing) gets decision 'failed'.
+    """
+    row = {'series': name, 'd': d, 'test': test, 'statistic': np.nan, 'p_value': np.nan, 'lags': None,
+           'n_obs': len(values), 'decision': 'failed', 'error': None}
+    try:
+        with warnings.catch_warnings():
+            # KPSS p-values are clipped to the table range; the boundary value is still a valid decision
+            warnings.simplefilter('ignore', InterpolationWarning)
+            warnings.simplefilter('ignore', FutureWarning)
+            result = func(values)
+    except Exception as e:
+        row['error'] = f'{type(e).__name__}: {e}'
+        return row
+
+    row['statistic'], row['p_value'], row['lags'] = float(result[0]), float(result[1]), int(result[2])
+    # ADF: the null is a unit root; KPSS: the null is stationarity
+    stationary = row['p_value'] < alpha if test == 'adf' else row['p_value'] >= alpha
+    row['decision'] = 'stationary' if stationary else 'non_stationary'
+    return row
+
+
+def stationarity_tests(series, max_d=2, alpha=0.05, name=None, stop_early=False):
+    """
+    Run the ADF and KPSS tests on a series differenced 0..max_d times, without printing anything.
+
+    Parameters:
+    - series: pd.Series or np.ndarray, time series data.
+    - max_d: int, highest order of differencing to test.
+    - alpha: float, significance level of both tests.
+    - name: hashable, series label for the 'series' column. None uses series.name.
+    - stop_early: bool, stop at the first d where both tests agree on stationarity.
+
+    Returns:
+    - list: one dict per (d, test) with series, d, test, statistic, p_value, lags, n_obs, decision
+      ('stationary', 'non_stationary' or 'failed') and error.
+    """
+    if name is None:
+        name = getattr(series, 'name', None)
+    values = np.asarray(series, dtype=float)
+    values = values[~np.isnan(values)]
+
+    rows = []
+    for d in range(max_d + 1):
+        diffed = np.diff(values, n=d)
+        adf_row = _test_row(name, d, 'adf', lambda x: adfuller(x, regression='c', autolag='AIC'), diffed, alpha)
+        kpss_row = _test_row(name, d, 'kpss', lambda x: kpss(x, nlags='auto'), diffed, alpha)
+        rows += [adf_row, kpss_row]
+        if stop_early and adf_row['decision'] == kpss_row['decision'] == 'stationary':
+            break
+    return rows
+
+
+def choose_d(table, max_d=2):
+    """
+    Suggest the order of differencing for each series of a stationarity-test table.
+
+    The suggestion is the smallest d for which both the ADF test (unit root rejected) and the KPSS test
+    (stationarity not rejected) call the differenced series stationary, or max_d if none does.
+
+    Parameters:
+    - table: pd.DataFrame, rows as returned by stationarity_tests().
+    - max_d: int, fallback order of differencing.
+
+    Returns:
+    - pd.Series: suggested d indexed by series.
+    """
+    table = pd.DataFrame(table, columns=TEST_COLUMNS)
+    stationary = table.assign(stationary=table['decision'] == 'stationary')
+    both = (stationary.groupby(['series', 'd'], sort=False, dropna=False)['stationary']
+            .agg(lambda s: s.all() and len(s) == 2))
+    suggested = {}
+    for name, group in both.groupby(level='series', sort=False, dropna=False):
+        passed = group[group].index.get_level_values('d')
+        suggested[name] = int(passed.min()) if len(passed) else max_d
+    return pd.Series(suggested, name='d', dtype=int)
+
+
+def _battery_job(job):
+    name, series, max_d, alpha = job
+    return stationarity_tests(series, max_d, alpha, name=name)
+
+
+def test_battery(panel, max_d=2, alpha=0.05, workers=None, progress=None):
+    """
+    Run ADF and KPSS at differencing orders 0..max_d on many series across a process pool.
+
+    Parameters:
+    - panel: pd.DataFrame (one column per series) or dict of name -> pd.Series.
+    - max_d: int, highest order of differencing to test.
+    - alpha: float, significance level of both tests.
+    - workers: int, number of worker processes. None uses every core, 1 runs in-process.
+    - progress: callable, called as progress(done, total, rows) each time a series finishes.
+
+    Returns:
+    - tuple: (pd.DataFrame tidy test table with TEST_COLUMNS, pd.Series suggested d indexed by series).
+    """
+    jobs = [(name, series.dropna(), max_d, alpha) for name, series in panel.items()]
+    results = run_jobs(_battery_job, jobs, workers, progress=progress)
+    table = pd.DataFrame([row for rows in results for row in rows], columns=TEST_COLUMNS)
+    return table, choose_d(table, max_d)
+
+
+def suggest_d(series, max_d=2, alpha=0.05):
+    """
+    Suggest the order of differencing for a series.
+
+    Returns the smallest d for which the differenced series is stationary according to both the ADF test
+    (unit root rejected) and the KPSS test (stationarity not rejected), or max_d if none is.
+    """
+    rows = stationarity_tests(series, max_d, alpha, name=0, stop_early=True)
+    return int(choose_d(rows, max_d).iloc[0])
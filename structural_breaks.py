@@ -0,0 +1,482 @@
+# Standard library imports
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+# Third-party imports for data handling
+import numpy as np
+import pandas as pd
+
+# Third-party imports for statistical modeling
+import ruptures as rpt
+from ruptures.base import BaseCost
+from ruptures.costs import cost_factory
+
+# Most segment costs a CachedCost keeps, least recently used dropped first (about 100 bytes each)
+COST_CACHE_SIZE = 500_000
+
+
+class CachedCost(BaseCost):
+    """
+    Ruptures segment cost that memoizes error(start, end) of a wrapped cost.
+
+    PELT runs for different penalties on the same signal evaluate largely the same segments; sharing one
+    CachedCost between them computes each segment cost once. The memo is bounded: beyond max_size
+    segments the least recently used costs are dropped (and recomputed if needed again), so memory stays
+    flat however long the signal and however many penalties a penalty path runs.
+
+    Parameters:
+    - model: str, ruptures cost model ('l1', 'l2', 'rbf', ...).
+    - min_size: int, minimum segment length of the wrapped cost.
+    - max_size: int, most segment costs kept.
+    """
+
+    model = 'cached'
+
+    def __init__(self, model='l1', min_size=2, max_size=COST_CACHE_SIZE):
+        self.cost = cost_factory(model=model)
+        self.cost.min_size = min_size
+        self.min_size = min_size
+        self.max_size = max_size
+        self.costs = OrderedDict()
+        self.signal = None
+
+    def fit(self, signal):
+        """
+        Fit the wrapped cost; the memoized costs are kept while the signal is unchanged.
+        """
+        signal = np.asarray(signal)
+        if self.signal is None or self.signal.shape != signal.shape or not np.array_equal(self.signal, signal):
+            self.cost.fit(signal)
+            self.costs = OrderedDict()
+            self.signal = signal.copy()
+        return self
+
+    def error(self, start, end):
+        """
+        Cost of the segment signal[start:end].
+        """
+        key = (start, end)
+        if key in self.costs:
+            self.costs.move_to_end(key)
+            return self.costs[key]
+        value = self.costs[key] = self.cost.error(start, end)
+        if len(self.costs) > self.max_size:
+            self.costs.popitem(last=False)
+        return value
+
+
+# Built break design matrices, keyed by (index, break dates, steps, dtype); oldest entries are dropped first
+_DESIGN_CACHE = OrderedDict()
+DESIGN_CACHE_SIZE = 256
+
+
+def break_design(index, break_dates, steps=0, dtype=np.int8):
+    """
+    In-sample and future step-dummy matrices for structural breaks, built in one vectorized comparison.
+
+    Column break_{i} is 1 from the i-th break date onwards. Both matrices come from a single
+    (observations + steps) x breaks comparison of row positions against break positions, so future
+    rows are correct also for breaks dated after the end of the sample. Results are cached per
+    (index dates, break set, steps) and their arrays are read-only; the data frame itself is never touched.
+
+    Parameters:
+    - index: pd.DatetimeIndex, regular dates of the series.
+    - break_dates: list, break dates (the first date of each new regime).
+    - steps: int, number of future periods.
+    - dtype: numpy dtype of the dummies, e.g. np.int8 or bool.
+
+    Returns:
+    - tuple: (pd.DataFrame in-sample dummies indexed like the series, pd.DataFrame future dummies indexed by
+      the next steps dates).
+    """
+    break_dates = tuple(pd.Timestamp(date) for date in break_dates)
+    # With a frequency the endpoints and length fix every date; without one, indices sharing them can still
+    # differ in between, so the dates themselves are hashed
+    dates = index.freqstr
+    if dates is None:
+        dates = hashlib.sha1(np.ascontiguousarray(index.asi8).tobytes()).hexdigest()
+    key = (index[0] if len(index) else None, index[-1] if len(index) else None, len(index), str(index.dtype), dates,
+           break_dates, steps, np.dtype(dtype).str)
+    if key in _DESIGN_CACHE:
+        _DESIGN_CACHE.move_to_end(key)
+        return _DESIGN_CACHE[key]
+
+    future = index[:0]
+    if steps:
+        freq = index.freq or pd.infer_freq(index)
+        future = pd.date_range(index[-1], periods=steps + 1, freq=freq)[1:]
+    positions = index.append(future).searchsorted(pd.DatetimeIndex(break_dates))
+    values = np.arange(len(index) + steps)[:, None] >= positions[None, :]
+    values = values.astype(dtype, copy=False)
+    values.flags.writeable = False
+
+    columns = [f'break_{i + 1}' for i in range(len(break_dates))]
+    design = (pd.DataFrame(values[:len(index)], index=index, columns=columns, copy=False),
+              pd.DataFrame(values[len(index):], index=future, columns=columns, copy=False))
+    _DESIGN_CACHE[key] = design
+    if len(_DESIGN_CACHE) > DESIGN_CACHE_SIZE:
+        _DESIGN_CACHE.popitem(last=False)
+    return design
+
+
+def break_dummies(index, break_dates):
+    """
+    In-sample step dummies for structural breaks (see break_design).
+    """
+    return break_design(index, break_dates)[0]
+
+
+def candidate_break_sets(path, index, penalties):
+    """
+    Break dates of the penalty-path segmentations optimal at each of the given penalties, without duplicates.
+
+    Returns:
+    - dict: 'pen=<penalty>' -> list of break dates.
+    """
+    break_sets = {}
+    seen = set()
+    for pen in penalties:
+        change_points = tuple(cp for cp in breaks_for_penalty(path, pen) if cp < len(index))
+        if change_points not in seen:
+            seen.add(change_points)
+            break_sets[f'pen={pen}'] = list(index[list(change_points)])
+    return break_sets
+
+
+def pelt(cost, n_samples, pen, min_size=2, jump=5):
+    """
+    PELT segmentation of a fitted ruptures cost, with the recursion of rpt.Pelt: the same candidate grid
+    (multiples of jump from min_size on, plus n_samples), the same admissible point added per step
+    (jump * floor((bkp - min_size) / jump)), the same summation order and first-minimum tie-break, and the
+    same pruning (keep t while F(t) + C(t, bkp) + pen <= F(bkp) + pen). The one deliberate difference: rpt.Pelt
+    pairs admissible points with the subproblems of the points that have a partition, which misaligns when some
+    admissible point has none (jump < min_size); here each point is pruned on its own value.
+    pelt_matches_ruptures() checks the breakpoints against rpt.Pelt.
+
+    rpt.Pelt copies the whole partition of every candidate at every step; here each candidate only keeps
+    its optimal penalised cost and a back-pointer, which makes repeated runs on the penalty path cheap.
+
+    Parameters:
+    - cost: fitted ruptures cost (e.g. CachedCost).
+    - n_samples: int, length of the signal.
+    - pen: float, penalty per segment.
+    - min_size, jump: int, as for rpt.Pelt.
+
+    Returns:
+    - list: breakpoints, ending with n_samples.
+    """
+    total = {0: 0.0}
+    previous = {0: 0}
+    admissible = []
+    ind = [k for k in range(0, n_samples, jump) if k >= min_size] + [n_samples]
+    for bkp in ind:
+        admissible.append(jump * ((bkp - min_size) // jump))
+        candidates = [t for t in admissible if t in total]
+        if not candidates:
+            continue
+        # Same association as rpt.Pelt (penalised segment cost first), so ties resolve identically
+        values = [total[t] + (cost.error(t, bkp) + pen) for t in candidates]
+        best = min(range(len(values)), key=values.__getitem__)
+        total[bkp] = values[best]
+        previous[bkp] = candidates[best]
+        admissible = [t for t, value in zip(candidates, values) if value <= total[bkp] + pen]
+
+    breakpoints = []
+    bkp = n_samples
+    while bkp > 0:
+        breakpoints.append(bkp)
+        bkp = previous[bkp]
+    return sorted(breakpoints)
+
+
+def penalty_path(signal, pen_min=1, pen_max=100, model='l1', min_size=2, jump=5, max_runs=100):
+    """
+    Optimal PELT segmentations for every penalty in [pen_min, pen_max] (CROPS, Haynes et al. 2017).
+
+    PELT is run at both ends of the range and then only at the penalties where the optimal segmentations
+    of two neighbouring runs have equal penalised cost, until every number of breaks in between is found.
+    All runs share one CachedCost, so each segment cost is computed once, and use the lightweight pelt().
+
+    Parameters:
+    - signal: np.ndarray, the series.
+    - pen_min, pen_max: float, penalty range.
+    - model: str, ruptures cost model.
+    - min_size, jump: int, PELT settings (as for rpt.Pelt).
+    - max_runs: int, upper limit on the number of PELT runs.
+
+    Returns:
+    - pd.DataFrame: one row per distinct segmentation, ordered by decreasing number of breaks, with
+      n_breaks, cost (unpenalised sum of segment costs), pen_min and pen_max (the penalty interval over
+      which the segmentation is optimal) and breakpoints (in ruptures format, ending with len(signal)).
+    """
+    signal = np.asarray(signal)
+    cost = CachedCost(model, min_size).fit(signal)
+
+    runs = {}
+
+    def run(pen):
+        if pen not in runs:
+            breakpoints = pelt(cost, len(signal), pen, min_size, jump)
+            runs[pen] = (len(breakpoints) - 1, cost.sum_of_costs(breakpoints), breakpoints)
+        return runs[pen]
+
+    intervals = [(pen_min, pen_max)]
+    while intervals and len(runs) < max_runs:
+        low, high = intervals.pop()
+        n_low, cost_low, _ = run(low)
+        n_high, cost_high, _ = run(high)
+        if n_low <= n_high + 1:
+            continue
+        pen = _crossing((n_low, cost_low), (n_high, cost_high))
+        if not low < pen < high:
+            continue
+        n_mid, _, _ = run(pen)
+        if n_mid != n_high:
+            intervals.extend([(low, pen), (pen, high)])
+
+    # Keep the cheapest segmentation per number of breaks, then only those on the lower convex hull of
+    # cost against number of breaks: the others are not optimal for any penalty
+    best = {}
+    for n_breaks, total, breakpoints in runs.values():
+        if n_breaks not in best or total < best[n_breaks][1]:
+            best[n_breaks] = (n_breaks, total, breakpoints)
+    hull = []
+    for point in sorted(best.values(), key=lambda point: -point[0]):
+        while len(hull) >= 2 and _crossing(hull[-2], hull[-1]) >= _crossing(hull[-1], point):
+            hull.pop()
+        hull.append(point)
+
+    rows = []
+    for i, (n_breaks, total, breakpoints) in enumerate(hull):
+        rows.append({
+            'n_breaks': n_breaks,
+            'cost': total,
+            'pen_min': pen_min if i == 0 else max(_crossing(hull[i - 1], hull[i]), pen_min),
+            'pen_max': pen_max if i == len(hull) - 1 else min(_crossing(hull[i], hull[i + 1]), pen_max),
+            'breakpoints': breakpoints,
+        })
+    # Segmentations that are only optimal at a single tie point are dropped
+    rows = [row for row in rows if row['pen_max'] > row['pen_min']] or rows
+    return pd.DataFrame(rows, columns=['n_breaks', 'cost', 'pen_min', 'pen_max', 'breakpoints'])
+
+
+def _crossing(more, fewer):
+    # Penalty at which two segmentations (n_breaks, cost, ...) have the same penalised cost
+    return (fewer[1] - more[1]) / (more[0] - fewer[0])
+
+
+def breaks_for_penalty(path, pen):
+    """
+    Breakpoints of the segmentation in a penalty path that is optimal at pen; on a tie, the one with
+    fewer breaks.
+
+    The path keeps one segmentation per number of breaks, so where several segmentations share the optimal
+    penalised cost (common for the L1 cost on rounded rates) it may return a different one than rpt.Pelt,
+    with the same cost.
+    """
+    penalised = path['cost'] + pen * path['n_breaks']
+    optimal = path[np.isclose(penalised, penalised.min())]
+    return optimal.loc[optimal['n_breaks'].idxmin(), 'breakpoints']
+
+
+def pelt_matches_ruptures(signal, penalties, model='l1', min_size=2, jump=5, path=None):
+    """
+    Check pelt() (and optionally a penalty path) against rpt.Pelt(model, min_size, jump).predict(pen).
+
+    Parameters:
+    - signal: np.ndarray, the series.
+    - penalties: list, penalties to compare at.
+    - model, min_size, jump: PELT settings.
+    - path: pd.DataFrame, penalty_path() of the signal with the same settings, also compared through
+      breaks_for_penalty(). None skips it.
+
+    Returns:
+    - pd.DataFrame: one row per penalty with the number of breaks of rpt.Pelt and pelt(), whether their
+      breakpoints are identical, and for the path whether its segmentation is identical or has the same
+      penalised cost.
+    """
+    signal = np.asarray(signal)
+    reference = rpt.Pelt(model=model, min_size=min_size, jump=jump).fit(signal)
+    cost = CachedCost(model, min_size).fit(signal)
+    rows = []
+    for pen in penalties:
+        expected = reference.predict(pen)
+        breakpoints = pelt(cost, len(signal), pen, min_size, jump)
+        row = {'pen': pen, 'n_breaks_ruptures': len(expected) - 1, 'n_breaks_pelt': len(breakpoints) - 1,
+               'pelt_identical': breakpoints == expected}
+        if path is not None:
+            from_path = breaks_for_penalty(path, pen)
+            penalised = [cost.sum_of_costs(bkps) + pen * (len(bkps) - 1) for bkps in (from_path, expected)]
+            row['path_identical'] = from_path == expected
+            row['path_same_cost'] = bool(np.isclose(*penalised))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+class OnlineBreakDetector:
+    """
+    Incremental two-sided CUSUM detector of level shifts for monthly updates.
+
+    The detector keeps only constant-size state: running mean and variance of the current segment (since
+    the last break), the positive and negative CUSUM statistics on the standardised deviations from that
+    mean, and the running sums of the observations since each CUSUM last left zero. Every update costs the
+    same whatever the length of the history. When a CUSUM exceeds threshold, a break is recorded at the
+    first observation of the excursion and the new segment starts from the observations since then.
+    The state, including the list of break dates, is saved to and loaded from JSON between runs, together
+    with the identity of the series it was built from (see matches()).
+
+    Parameters:
+    - threshold: float, alarm level of the CUSUM statistics, in segment standard deviations.
+    - drift: float, allowance subtracted at every step, in segment standard deviations.
+    - min_size: int, observations a new segment needs before detection starts; at least two are always
+      needed for its standard deviation.
+    - source: dict, identity of the series, e.g. {'series': input file and series label, 'first_date': ...}.
+    """
+
+    def __init__(self, threshold=8.0, drift=2.0, min_size=12, source=None):
+        self.threshold = threshold
+        self.drift = drift
+        self.min_size = min_size
+        self.source = source
+        self.break_dates = []
+        self.last_date = None
+        self._reset_segment([])
+
+    def _reset_segment(self, values):
+        # Segment statistics (Welford) and both CUSUM excursions
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        for value in values:
+            self._add(value)
+        self.cusum = {'up': 0.0, 'down': 0.0}
+        self.excursion = {'up': None, 'down': None}
+
+    def _add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    @staticmethod
+    def series_source(series, name=None):
+        """
+        Identity of a series as stored in the detector state: a label (e.g. the input file and geo) and the
+        first date of the series.
+        """
+        return {'series': name if name is not None else series.name,
+                'first_date': str(pd.Timestamp(series.index[0]).date())}
+
+    def matches(self, series, name=None):
+        """
+        Whether the state was built from this series (same label and first date), so update_series() can
+        continue it.
+        """
+        return self.source == self.series_source(series, name)
+
+    @classmethod
+    def from_history(cls, series, break_dates=(), name=None, **kwargs):
+        """
+        Start a detector from a series and the breaks already found in it (e.g. by PELT): the statistics
+        of the segment after the last break are computed once; earlier data is not needed afterwards.
+        name labels the series in the saved state (None uses series.name).
+        """
+        detector = cls(source=cls.series_source(series, name), **kwargs)
+        detector.break_dates = [str(pd.Timestamp(date).date()) for date in break_dates]
+        segment = series
+        if detector.break_dates:
+            segment = series[series.index >= pd.Timestamp(detector.break_dates[-1])]
+        detector._reset_segment(segment.dropna().values)
+        detector.last_date = str(pd.Timestamp(series.index[-1]).date())
+        return detector
+
+    def update(self, date, value):
+        """
+        Process one new observation.
+
+        Returns:
+        - str: the date of a newly detected break, or None.
+        """
+        date = str(pd.Timestamp(date).date())
+        if self.last_date is not None and date <= self.last_date:
+            return None
+        self.last_date = date
+        if np.isnan(value):
+            return None
+        if self.n < max(self.min_size, 2):
+            self._add(value)
+            return None
+
+        sigma = max(np.sqrt(self.m2 / (self.n - 1)), 1e-8)
+        z = (value - self.mean) / sigma
+        for side, step in (('up', z), ('down', -z)):
+            self.cusum[side] = max(0.0, self.cusum[side] + step - self.drift)
+            if self.cusum[side] == 0:
+                self.excursion[side] = None
+            elif self.excursion[side] is None:
+                self.excursion[side] = {'start': date, 'n': 1, 'sum': value, 'sumsq': value ** 2}
+            else:
+                excursion = self.excursion[side]
+                excursion['n'] += 1
+                excursion['sum'] += value
+                excursion['sumsq'] += value ** 2
+
+        for side in ('up', 'down'):
+            if self.cusum[side] > self.threshold:
+                excursion = self.excursion[side]
+                self.break_dates.append(excursion['start'])
+                # The new segment starts with the observations of the excursion
+                self.cusum = {'up': 0.0, 'down': 0.0}
+                self.excursion = {'up': None, 'down': None}
+                self.n = excursion['n']
+                self.mean = excursion['sum'] / excursion['n']
+                self.m2 = max(excursion['sumsq'] - excursion['n'] * self.mean ** 2, 0.0)
+                return excursion['start']
+
+        self._add(value)
+        return None
+
+    def update_series(self, series):
+        """
+        Process the observations of series dated after the last processed one.
+
+        Returns:
+        - list: dates of the newly detected breaks.
+        """
+        new = series[series.index > pd.Timestamp(self.last_date)] if self.last_date else series
+        found = [self.update(date, value) for date, value in new.items()]
+        return [date for date in found if date is not None]
+
+    def to_dict(self):
+        return {'threshold': self.threshold, 'drift': self.drift, 'min_size': self.min_size, 'source': self.source,
+                'break_dates': self.break_dates, 'last_date': self.last_date, 'n': self.n, 'mean': self.mean,
+                'm2': self.m2, 'cusum': self.cusum, 'excursion': self.excursion}
+
+    @classmethod
+    def from_dict(cls, state):
+        detector = cls(state['threshold'], state['drift'], state['min_size'], state.get('source'))
+        for name in ('break_dates', 'last_date', 'n', 'mean', 'm2', 'cusum', 'excursion'):
+            setattr(detector, name, state[name])
+        return detector
+
+    def save(self, path):
+        """
+        Write the detector state to a JSON file.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a detector state written by save().
+        """
+        with open(path) as f:
+            return cls.from_dict(json.load(f))